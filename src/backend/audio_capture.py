@@ -0,0 +1,128 @@
+"""Callback-mode microphone capture decoupled from the network.
+
+PortAudio calls ``Capture.callback`` on its own thread with each block of
+input; it only copies the samples into a preallocated ``PcmRing`` and
+notes when they arrived, so it can never be held up by the network. A
+sender thread drains the ring in ``chunk``-sized frames and hands them to
+``send`` (encode + TCP or UDP). If the network stalls, audio piles up in
+the ring instead of overflowing the device; once the backlog exceeds
+``max_backlog_ms`` the oldest audio is skipped, since talking over a
+delay is worse than a gap.
+
+``stats()`` reports device input overflows, ring overruns, skipped
+audio, the current buffered milliseconds and capture-to-send time per
+frame (from the callback delivering a frame's last sample to ``send``
+returning).
+"""
+import threading
+import time
+from collections import deque
+
+import numpy as np
+
+from audio_playback import PcmRing, PA_CONTINUE, PA_INPUT_OVERFLOW
+
+CAPTURE_BUFFER_MS = 2000  # Ring size
+MAX_BACKLOG_MS = 500  # Older audio is skipped once this much is waiting
+LATENCY_HISTORY = 500  # Frames of capture-to-send time kept for percentiles
+STATS_INTERVAL = 10.0  # Seconds between status lines from the sender thread
+
+
+class Capture:
+    """Input callback into a ring, drained by a network sender thread."""
+
+    def __init__(self, rate: int, chunk: int, send, capacity_ms: int = CAPTURE_BUFFER_MS,
+                 max_backlog_ms: int = MAX_BACKLOG_MS):
+        self.rate = rate
+        self.chunk = chunk
+        self.send = send  # (pcm bytes) -> None, may block on the network
+        self.ring = PcmRing(rate * capacity_ms // 1000)
+        self.max_backlog = rate * max_backlog_ms // 1000
+        self.arrivals = deque()  # (ring write total after a callback, monotonic time)
+        self.ready = threading.Event()
+        self.running = False
+        self.error = None
+        self.callbacks = 0
+        self.device_overflows = 0  # Reported by PortAudio itself
+        self.frames_sent = 0
+        self.skipped_samples = 0
+        self.latencies = deque(maxlen=LATENCY_HISTORY)  # Seconds, capture to sent
+        self._frame = np.zeros(chunk, dtype=np.int16)
+        self._thread = None
+
+    def callback(self, in_data, frame_count, time_info, status):
+        """``stream_callback`` for ``PyAudio.open(input=True)``."""
+        if status & PA_INPUT_OVERFLOW:
+            self.device_overflows += 1
+        self.ring.write(np.frombuffer(in_data, dtype="<i2"))
+        self.arrivals.append((self.ring.written, time.monotonic()))
+        self.callbacks += 1
+        self.ready.set()
+        return None, PA_CONTINUE
+
+    def start(self):
+        self.running = True
+        self._thread = threading.Thread(target=self._run, name="mic-sender", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self.running = False
+        self.ready.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+
+    def _arrival_of(self, end: int) -> float | None:
+        """When the callback delivering sample ``end - 1`` ran; forgets older callbacks."""
+        while self.arrivals and self.arrivals[0][0] < end:
+            self.arrivals.popleft()
+        return self.arrivals[0][1] if self.arrivals else None
+
+    def _run(self):
+        next_report = time.monotonic() + STATS_INTERVAL
+        while self.running:
+            self.ready.wait(timeout=0.5)
+            self.ready.clear()
+            while self.running and self.ring.available() >= self.chunk:
+                backlog = self.ring.available() - self.max_backlog
+                if backlog > 0:
+                    # Keep whole frames: skip the oldest backlog rounded up to a frame
+                    self.skipped_samples += self.ring.skip(-(-backlog // self.chunk) * self.chunk)
+                    continue
+                self.ring.read_into(self._frame)
+                captured_at = self._arrival_of(self.ring.consumed)
+                try:
+                    self.send(self._frame.tobytes())
+                except Exception as e:
+                    self.error = e
+                    self.running = False
+                    print(f"❌ Sending audio failed: {e}")
+                    return
+                self.frames_sent += 1
+                if captured_at is not None:
+                    self.latencies.append(time.monotonic() - captured_at)
+            if time.monotonic() >= next_report:
+                next_report = time.monotonic() + STATS_INTERVAL
+                stats = self.stats()
+                print(f"📊 buffered {stats['buffered_ms']} ms, capture→send p50 {stats['capture_to_send_p50_ms']} ms "
+                      f"p99 {stats['capture_to_send_p99_ms']} ms, overflows {stats['device_overflows']}, "
+                      f"skipped {stats['skipped_ms']} ms")
+
+    def stats(self) -> dict:
+        latencies = sorted(self.latencies)
+        ms = 1000 / self.rate
+
+        def percentile(p):
+            return round(latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000, 2) if latencies else None
+
+        return {
+            "buffered_ms": round(self.ring.available() * ms),
+            "callbacks": self.callbacks,
+            "frames_sent": self.frames_sent,
+            "device_overflows": self.device_overflows,
+            "ring_overruns": self.ring.overruns,
+            "overrun_ms": round(self.ring.overrun_samples * ms),
+            "skipped_ms": round(self.skipped_samples * ms),
+            "capture_to_send_p50_ms": percentile(0.5),
+            "capture_to_send_p99_ms": percentile(0.99),
+            "capture_to_send_max_ms": round(latencies[-1] * 1000, 2) if latencies else None,
+        }
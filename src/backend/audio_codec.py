@@ -0,0 +1,389 @@
+"""Audio compression for the mic sender / stream receiver pair.
+
+Raw 16-bit mono PCM at 44.1 kHz is ~706 kbps per talker. Here the
+sender re-frames the capture into 20 ms packets and encodes them with:
+
+    opus   48 kHz, 32 kbps      ~21x smaller  (needs opuslib + libopus)
+    ulaw   G.711 at 8 kHz       ~11x smaller  (NumPy only)
+    alaw   G.711 at 8 kHz       ~11x smaller  (NumPy only)
+    pcm    unchanged            for debugging
+
+On connect the sender offers the codecs it has, best first, and the
+receiver answers with the first one it can decode. Packets follow as a
+2-byte length and the payload. Decoders return 16-bit PCM at the
+playback rate, so the PyAudio output side is unchanged.
+
+``GUARD_AUDIO_CODEC`` limits either side to one codec.
+"""
+import os
+import struct
+
+import numpy as np
+
+try:
+    import opuslib
+except Exception:  # Not installed, or libopus itself is missing: G.711 is used instead
+    opuslib = None
+
+FRAME_MS = 20  # Packet duration; one of the frame sizes Opus accepts
+OPUS_RATE = 48000
+OPUS_BITRATE = 32000
+G711_RATE = 8000
+NEGOTIATE_TIMEOUT = 5.0  # Seconds the sender waits for the receiver's answer
+
+CODEC_IDS = {"pcm": 0, "ulaw": 1, "alaw": 2, "opus": 3}
+CODEC_NAMES = {codec_id: name for name, codec_id in CODEC_IDS.items()}
+PREFERENCE = ["opus", "ulaw", "alaw", "pcm"]
+
+MAGIC = b"GVA1"
+OFFER = struct.Struct("!4sIB")  # magic, capture rate, number of codec ids that follow
+ANSWER = struct.Struct("!4sB")  # magic, chosen codec id
+NO_CODEC = 0xFF
+LENGTH = struct.Struct("!H")
+
+
+class CodecError(Exception):
+    pass
+
+
+# --------------------------
+# G.711 (tables built once, vectorized lookups per frame)
+# --------------------------
+
+ULAW_BIAS = 0x84
+ULAW_CLIP = 8159  # 14-bit magnitude
+ULAW_SEGMENT_ENDS = np.array([0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF, 0x1FFF])
+ALAW_SEGMENT_ENDS = np.array([0x1F, 0x3F, 0x7F, 0xFF, 0x1FF, 0x3FF, 0x7FF, 0xFFF])
+
+
+def _ulaw_encode(pcm: np.ndarray) -> np.ndarray:
+    x = pcm.astype(np.int32) >> 2
+    mask = np.where(x >= 0, 0xFF, 0x7F)
+    x = np.minimum(np.abs(x), ULAW_CLIP) + (ULAW_BIAS >> 2)
+    segment = np.searchsorted(ULAW_SEGMENT_ENDS, x)
+    value = (np.minimum(segment, 7) << 4) | ((x >> (segment + 1)) & 0x0F)
+    value = np.where(segment >= 8, 0x7F, value)
+    return (value ^ mask).astype(np.uint8)
+
+
+def _ulaw_decode(code: np.ndarray) -> np.ndarray:
+    u = ~code.astype(np.int32) & 0xFF
+    exponent = (u >> 4) & 0x07
+    x = (((u & 0x0F) << 3) + ULAW_BIAS << exponent) - ULAW_BIAS
+    return np.where(u & 0x80, -x, x).astype(np.int16)
+
+
+def _alaw_encode(pcm: np.ndarray) -> np.ndarray:
+    x = pcm.astype(np.int32) >> 3
+    mask = np.where(x >= 0, 0xD5, 0x55)
+    x = np.where(x >= 0, x, -x - 1)
+    segment = np.searchsorted(ALAW_SEGMENT_ENDS, x)
+    shift = np.where(segment < 2, 1, segment)
+    value = (np.minimum(segment, 7) << 4) | ((x >> shift) & 0x0F)
+    value = np.where(segment >= 8, 0x7F, value)
+    return (value ^ mask).astype(np.uint8)
+
+
+def _alaw_decode(code: np.ndarray) -> np.ndarray:
+    a = code.astype(np.int32) ^ 0x55
+    segment = (a & 0x70) >> 4
+    t = (a & 0x0F) << 4
+    t = np.where(segment == 0, t + 8, (t + 0x108) << np.maximum(segment - 1, 0))
+    return np.where(a & 0x80, t, -t).astype(np.int16)
+
+
+_ALL_SAMPLES = np.arange(-32768, 32768, dtype=np.int32).astype(np.int16)
+_ALL_CODES = np.arange(256, dtype=np.uint8)
+# Encode tables are indexed by the sample's bit pattern as uint16
+G711_TABLES = {
+    "ulaw": (np.roll(_ulaw_encode(_ALL_SAMPLES), -32768), _ulaw_decode(_ALL_CODES)),
+    "alaw": (np.roll(_alaw_encode(_ALL_SAMPLES), -32768), _alaw_decode(_ALL_CODES)),
+}
+
+
+# --------------------------
+# Resampling
+# --------------------------
+
+def lowpass(cutoff: float, taps: int) -> np.ndarray:
+    """Windowed-sinc FIR; ``cutoff`` is a fraction of the sample rate."""
+    n = np.arange(taps) - (taps - 1) / 2
+    h = np.sinc(2 * cutoff * n) * np.hamming(taps)
+    return h / h.sum()
+
+
+class Resampler:
+    """Streaming linear-interpolation resampler, low-passed when downsampling."""
+
+    def __init__(self, source_rate: int, target_rate: int, taps: int = 63):
+        self.source_rate = source_rate
+        self.target_rate = target_rate
+        self.step = source_rate / target_rate
+        self.filter = lowpass(0.45 * target_rate / source_rate, taps) if target_rate < source_rate else None
+        self.history = np.zeros(taps - 1) if self.filter is not None else None
+        self.position = 0.0  # Next output time, in input samples from the start of the next chunk
+        self.last = 0.0  # Final input sample of the previous chunk
+
+    def process(self, samples: np.ndarray) -> np.ndarray:
+        if self.source_rate == self.target_rate or not len(samples):
+            return samples
+        x = samples.astype(np.float64)
+        if self.filter is not None:
+            padded = np.concatenate([self.history, x])
+            self.history = padded[len(x):]
+            x = np.convolve(padded, self.filter, mode="valid")
+        end = len(x) - 1
+        if self.position > end:
+            self.position -= len(x)
+            self.last = x[-1]
+            return np.empty(0)
+        count = int((end - self.position) // self.step) + 1
+        times = self.position + self.step * np.arange(count)
+        # Index 0 holds the previous chunk's last sample, i.e. time -1
+        out = np.interp(times + 1, np.arange(len(x) + 1), np.concatenate([[self.last], x]))
+        self.position = times[-1] + self.step - len(x)
+        self.last = x[-1]
+        return out
+
+
+def to_int16(samples: np.ndarray) -> np.ndarray:
+    if samples.dtype == np.int16:
+        return samples
+    return np.clip(np.rint(samples), -32768, 32767).astype(np.int16)
+
+
+# --------------------------
+# Codecs
+# --------------------------
+
+class PcmCodec:
+    name = "pcm"
+
+    def __init__(self, rate: int):
+        self.rate = rate
+
+    def encode_frame(self, frame: np.ndarray) -> bytes:
+        return frame.astype("<i2").tobytes()
+
+    def decode_frame(self, packet: bytes) -> np.ndarray:
+        return np.frombuffer(packet, dtype="<i2")
+
+
+class G711Codec:
+    rate = G711_RATE
+
+    def __init__(self, name: str):
+        self.name = name
+        self.encode_table, self.decode_table = G711_TABLES[name]
+
+    def encode_frame(self, frame: np.ndarray) -> bytes:
+        return self.encode_table[frame.view(np.uint16)].tobytes()
+
+    def decode_frame(self, packet: bytes) -> np.ndarray:
+        return self.decode_table[np.frombuffer(packet, dtype=np.uint8)]
+
+
+class OpusCodec:
+    name = "opus"
+    rate = OPUS_RATE
+
+    def __init__(self):
+        self.frame_samples = self.rate * FRAME_MS // 1000
+        self._encoder = None
+        self._decoder = None
+
+    def encode_frame(self, frame: np.ndarray) -> bytes:
+        if self._encoder is None:
+            self._encoder = opuslib.Encoder(self.rate, 1, opuslib.APPLICATION_VOIP)
+            self._encoder.bitrate = OPUS_BITRATE
+        return self._encoder.encode(frame.astype("<i2").tobytes(), self.frame_samples)
+
+    def decode_frame(self, packet: bytes) -> np.ndarray:
+        if self._decoder is None:
+            self._decoder = opuslib.Decoder(self.rate, 1)
+        return np.frombuffer(self._decoder.decode(packet, self.frame_samples), dtype="<i2")
+
+    def conceal_frame(self) -> np.ndarray:
+        # An empty packet makes libopus run its packet loss concealment
+        return self.decode_frame(b"")
+
+
+def available_codecs() -> list[str]:
+    """Codecs this side can use, best first, honouring ``GUARD_AUDIO_CODEC``."""
+    codecs = [name for name in PREFERENCE if name != "opus" or opuslib is not None]
+    forced = os.environ.get("GUARD_AUDIO_CODEC", "").strip().lower()
+    if forced:
+        if forced not in codecs:
+            raise CodecError(f"GUARD_AUDIO_CODEC={forced} is not available here (have {', '.join(codecs)})")
+        return [forced]
+    return codecs
+
+
+def create_codec(name: str, rate: int):
+    if name == "pcm":
+        return PcmCodec(rate)
+    if name in G711_TABLES:
+        return G711Codec(name)
+    if name == "opus" and opuslib is not None:
+        return OpusCodec()
+    raise CodecError(f"Unsupported codec {name!r}")
+
+
+class Encoder:
+    """16-bit PCM at the capture rate in, ``FRAME_MS`` packets out."""
+
+    def __init__(self, codec_name: str, rate: int):
+        self.codec = create_codec(codec_name, rate)
+        self.rate = rate
+        self.resampler = Resampler(rate, self.codec.rate)
+        self.frame_samples = self.codec.rate * FRAME_MS // 1000
+        self.pending = np.empty(0, dtype=np.int16)
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self.packets = 0
+
+    def encode(self, pcm: bytes) -> list[bytes]:
+        self.bytes_in += len(pcm)
+        samples = to_int16(self.resampler.process(np.frombuffer(pcm, dtype="<i2")))
+        self.pending = np.concatenate([self.pending, samples])
+        packets = []
+        while len(self.pending) >= self.frame_samples:
+            frame, self.pending = self.pending[:self.frame_samples], self.pending[self.frame_samples:]
+            packets.append(self.codec.encode_frame(frame))
+        self.packets += len(packets)
+        self.bytes_out += sum(len(p) + LENGTH.size for p in packets)
+        return packets
+
+    def stats(self) -> dict:
+        seconds = self.bytes_in / 2 / self.rate
+        return {
+            "codec": self.codec.name,
+            "packets": self.packets,
+            "input_kbps": round(self.bytes_in * 8 / seconds / 1000, 1) if seconds else None,
+            "output_kbps": round(self.bytes_out * 8 / seconds / 1000, 1) if seconds else None,
+            "ratio": round(self.bytes_in / self.bytes_out, 1) if self.bytes_out else None,
+        }
+
+
+class Decoder:
+    """Packets in, 16-bit PCM bytes at the playback rate out."""
+
+    def __init__(self, codec_name: str, rate: int):
+        self.codec = create_codec(codec_name, rate)
+        self.rate = rate
+        self.resampler = Resampler(self.codec.rate, rate)
+        self.frame_samples = self.codec.rate * FRAME_MS // 1000
+        self.last = np.zeros(self.frame_samples, dtype=np.int16)
+        self.missing = 0  # Consecutive frames concealed
+
+    def _output(self, samples: np.ndarray) -> bytes:
+        return to_int16(self.resampler.process(samples)).astype("<i2").tobytes()
+
+    def decode(self, packet: bytes) -> bytes:
+        self.last = self.codec.decode_frame(packet)
+        self.missing = 0
+        return self._output(self.last)
+
+    def conceal(self) -> bytes:
+        """Stand-in for one lost frame: Opus PLC, else the last frame fading out."""
+        self.missing += 1
+        plc = getattr(self.codec, "conceal_frame", None)
+        if plc is not None:
+            return self._output(plc())
+        # Halve the level per consecutive loss so a long gap decays to silence
+        return self._output(self.last * 0.5 ** self.missing)
+
+
+# --------------------------
+# Stream header and packet framing
+# --------------------------
+
+def recv_exact(sock, size: int) -> bytes | None:
+    """Read exactly ``size`` bytes; None if the peer closed first."""
+    buffer = bytearray()
+    while len(buffer) < size:
+        chunk = sock.recv(size - len(buffer))
+        if not chunk:
+            return None
+        buffer += chunk
+    return bytes(buffer)
+
+
+def offer_message(rate: int, codecs: list[str]) -> bytes:
+    return OFFER.pack(MAGIC, rate, len(codecs)) + bytes(CODEC_IDS[name] for name in codecs)
+
+
+def parse_offer(message: bytes) -> tuple[int, list[str]]:
+    """Capture rate and offered codec names from a complete offer."""
+    if len(message) < OFFER.size:
+        raise CodecError("Truncated codec offer")
+    magic, sender_rate, count = OFFER.unpack_from(message)
+    if magic != MAGIC:
+        raise CodecError("Sender did not start with a codec offer (is it an older raw-PCM sender?)")
+    codec_ids = message[OFFER.size:OFFER.size + count]
+    return sender_rate, [CODEC_NAMES[codec_id] for codec_id in codec_ids if codec_id in CODEC_NAMES]
+
+
+def choose_codec(sender_rate: int, offered: list[str], rate: int) -> str:
+    ours = available_codecs()
+    chosen = next((name for name in offered if name in ours), None)
+    if chosen is None:
+        raise CodecError(f"No codec in common: sender offered {offered}, we have {ours}")
+    if chosen == "pcm" and sender_rate != rate:
+        raise CodecError(f"Raw PCM at {sender_rate} Hz cannot be played at {rate} Hz")
+    return chosen
+
+
+def answer_message(codec_name: str | None) -> bytes:
+    return ANSWER.pack(MAGIC, NO_CODEC if codec_name is None else CODEC_IDS[codec_name])
+
+
+def parse_answer(message: bytes | None, codecs: list[str]) -> str:
+    if message is None or len(message) < ANSWER.size:
+        raise CodecError("Receiver closed the connection during codec negotiation")
+    magic, codec_id = ANSWER.unpack_from(message)
+    if magic != MAGIC or codec_id not in CODEC_NAMES:
+        raise CodecError(f"Receiver has no codec in common with {', '.join(codecs)}")
+    return CODEC_NAMES[codec_id]
+
+
+def offer(sock, rate: int) -> Encoder:
+    """Sender side: offer our codecs and build an encoder for the one chosen."""
+    codecs = available_codecs()
+    sock.sendall(offer_message(rate, codecs))
+    previous_timeout = sock.gettimeout()
+    sock.settimeout(NEGOTIATE_TIMEOUT)
+    try:
+        answer = recv_exact(sock, ANSWER.size)
+    except TimeoutError:
+        raise CodecError("Receiver did not answer the codec offer (is it an older raw-PCM receiver?)")
+    finally:
+        sock.settimeout(previous_timeout)
+    return Encoder(parse_answer(answer, codecs), rate)
+
+
+def answer(conn, rate: int) -> Decoder:
+    """Receiver side: read the sender's offer, pick a codec, build its decoder."""
+    header = recv_exact(conn, OFFER.size)
+    if header is None:
+        raise CodecError("Sender closed the connection before its codec offer")
+    codec_ids = recv_exact(conn, header[-1]) or b""
+    sender_rate, offered = parse_offer(header + codec_ids)
+    try:
+        chosen = choose_codec(sender_rate, offered, rate)
+    except CodecError:
+        conn.sendall(answer_message(None))
+        raise
+    conn.sendall(answer_message(chosen))
+    return Decoder(chosen, rate)
+
+
+def send_packet(sock, packet: bytes):
+    sock.sendall(LENGTH.pack(len(packet)) + packet)
+
+
+def recv_packet(sock) -> bytes | None:
+    header = recv_exact(sock, LENGTH.size)
+    if header is None:
+        return None
+    return recv_exact(sock, LENGTH.unpack(header)[0])
@@ -0,0 +1,274 @@
+"""System volume control with a backend detected once and kept.
+
+Detection tries, in order: a persistent PulseAudio/PipeWire connection
+(``pulsectl``), ``pactl``, ``wpctl``, an in-process ALSA mixer
+(``alsaaudio``) and finally ``amixer`` with the first control that
+answers. The working backend is cached and only re-detected when it
+fails, so ``/volume`` no longer probes every tool on each request.
+"""
+import asyncio
+import re
+import shutil
+import threading
+
+from command_runner import run_command
+
+# Audio tools answer quickly; anything slower than this is hung
+AUDIO_COMMAND_TIMEOUT = 2.0
+
+PERCENT_RE = re.compile(r"(\d+)%")
+
+
+def get_mixer():
+    """Try to return an ALSA mixer object if python-alsaaudio is available.
+    Raises ImportError if module is missing so callers can fallback.
+    """
+    import alsaaudio  # may raise ImportError
+    try:
+        return alsaaudio.Mixer('PCM', cardindex=0)
+    except Exception:
+        try:
+            return alsaaudio.Mixer('Master', cardindex=0)
+        except Exception:
+            mixers = alsaaudio.mixers()
+            if mixers:
+                return alsaaudio.Mixer(mixers[0])
+            raise Exception("No audio mixers found")
+
+
+def amixer_try_controls() -> list[str]:
+    return [
+        "PCM",
+        "Master",
+        "Speaker",
+        "Headphone",
+        "Digital",
+    ]
+
+
+class PulseBackend:
+    """Persistent PulseAudio (or pipewire-pulse) connection via pulsectl.
+
+    pulsectl blocks on the daemon's socket, so every call runs in a worker
+    thread under ``AUDIO_COMMAND_TIMEOUT``; a wedged daemon then times out
+    and the backend is re-detected instead of freezing the event loop.
+    """
+
+    name = "pulse"
+
+    def __init__(self, pulse):
+        self.pulse = pulse
+
+    @classmethod
+    async def create(cls) -> "PulseBackend":
+        """Connect in a worker thread too; the handshake blocks like any other call."""
+        import pulsectl  # may raise ImportError
+
+        def connect():
+            # threading_lock: calls arrive from worker threads
+            pulse = pulsectl.Pulse("guard-backend", connect=False, threading_lock=True)
+            pulse.connect(timeout=AUDIO_COMMAND_TIMEOUT)
+            return pulse
+
+        return cls(await asyncio.wait_for(asyncio.to_thread(connect), timeout=AUDIO_COMMAND_TIMEOUT))
+
+    def _default_sink(self):
+        return self.pulse.get_sink_by_name(self.pulse.server_info().default_sink_name)
+
+    def _get_volume(self) -> int:
+        return int(round(self.pulse.volume_get_all_chans(self._default_sink()) * 100))
+
+    def _set_volume(self, level: int):
+        self.pulse.volume_set_all_chans(self._default_sink(), level / 100.0)
+
+    async def _call(self, func, *args):
+        return await asyncio.wait_for(asyncio.to_thread(func, *args), timeout=AUDIO_COMMAND_TIMEOUT)
+
+    async def get_volume(self) -> int | None:
+        return await self._call(self._get_volume)
+
+    async def set_volume(self, level: int) -> bool:
+        await self._call(self._set_volume, level)
+        return True
+
+    def describe(self) -> dict:
+        return {"mixer": "pulse", "card": "system"}
+
+    def close(self):
+        # A thread may still be stuck in a timed-out call holding the lock
+        threading.Thread(target=self.pulse.close, name="pulse-close", daemon=True).start()
+
+
+class AlsaMixerBackend:
+    """In-process ALSA mixer via python-alsaaudio."""
+
+    name = "alsaaudio"
+
+    def __init__(self):
+        self.mixer = get_mixer()
+
+    async def get_volume(self) -> int | None:
+        if hasattr(self.mixer, "handleevents"):
+            self.mixer.handleevents()  # Pick up changes made by other programs
+        try:
+            volumes = self.mixer.getvolume()
+        except AttributeError:
+            volumes = [self.mixer.getvol()[0]]
+        return int(volumes[0])
+
+    async def set_volume(self, level: int) -> bool:
+        try:
+            self.mixer.setvolume(level)
+        except AttributeError:
+            self.mixer.setvol(level)
+        return True
+
+    def describe(self) -> dict:
+        return {
+            "mixer": getattr(self.mixer, "mixer", lambda: "unknown")(),
+            "card": getattr(self.mixer, "cardname", lambda: "unknown")(),
+        }
+
+    def close(self):
+        self.mixer.close()
+
+
+class CommandBackend:
+    """A volume tool driven through the shared command runner."""
+
+    def __init__(self, name, get_cmd, set_cmd, mixer=None):
+        self.name = name
+        self.get_cmd = get_cmd
+        self.set_cmd = set_cmd  # level -> argv
+        self.mixer = mixer or name
+
+    async def get_volume(self) -> int | None:
+        result = await run_command(self.get_cmd, timeout=AUDIO_COMMAND_TIMEOUT)
+        if result.ok:
+            match = PERCENT_RE.search(result.stdout)
+            if match:
+                return int(match.group(1))
+        return None
+
+    async def set_volume(self, level: int) -> bool:
+        result = await run_command(self.set_cmd(level), timeout=AUDIO_COMMAND_TIMEOUT)
+        return result.ok
+
+    def describe(self) -> dict:
+        return {"mixer": self.mixer, "card": "system"}
+
+    def close(self):
+        pass
+
+
+def pactl_backend():
+    # Example: Volume: front-left: 32768 /  50% / -18.06 dB, ...
+    return CommandBackend(
+        "pactl",
+        ["pactl", "get-sink-volume", "@DEFAULT_SINK@"],
+        lambda level: ["pactl", "set-sink-volume", "@DEFAULT_SINK@", f"{level}%"],
+    )
+
+
+def wpctl_backend():
+    # Output like: Volume: 0.50 [50%]
+    return CommandBackend(
+        "wpctl",
+        ["wpctl", "get-volume", "@DEFAULT_AUDIO_SINK@"],
+        lambda level: ["wpctl", "set-volume", "@DEFAULT_AUDIO_SINK@", str(max(0.0, min(1.0, level / 100.0)))],
+    )
+
+
+def amixer_backend(control):
+    return CommandBackend(
+        "amixer",
+        ["amixer", "get", control],
+        lambda level: ["amixer", "set", control, f"{level}%"],
+        mixer=control,
+    )
+
+
+class AudioControl:
+    """Detects the working volume backend once and keeps using it."""
+
+    def __init__(self):
+        self.backend = None
+        self.detections = 0
+        self.failures = 0
+        self._lock = asyncio.Lock()
+
+    async def _candidates(self):
+        """Yield backends in preference order, skipping tools that are missing."""
+        try:
+            yield await PulseBackend.create()
+        except Exception:
+            pass
+        if shutil.which("pactl"):
+            yield pactl_backend()
+        if shutil.which("wpctl"):
+            yield wpctl_backend()
+        try:
+            yield AlsaMixerBackend()
+        except Exception:
+            pass
+        if shutil.which("amixer"):
+            for control in amixer_try_controls():
+                yield amixer_backend(control)
+
+    async def detect(self):
+        """Pick the first backend that can read the volume."""
+        async with self._lock:
+            if self.backend is not None:
+                self.backend.close()
+                self.backend = None
+            self.detections += 1
+            async for candidate in self._candidates():
+                try:
+                    if await candidate.get_volume() is not None:
+                        self.backend = candidate
+                        print(f"Audio control backend: {candidate.name} ({candidate.describe()['mixer']})")
+                        return candidate
+                except Exception:
+                    pass
+                candidate.close()
+            print("No audio control backend available")
+            return None
+
+    async def _with_backend(self, operation):
+        """Run ``operation(backend)``, re-detecting once if the cached backend fails."""
+        backend = self.backend or await self.detect()
+        if backend is not None:
+            try:
+                result = await operation(backend)
+                if result is not None and result is not False:
+                    return backend, result
+            except Exception as e:
+                # Includes timeouts: a hung backend is demoted like a failing one
+                print(f"Audio backend {backend.name} failed: {str(e) or type(e).__name__}")
+            self.failures += 1
+            backend = await self.detect()
+            if backend is not None:
+                return backend, await operation(backend)
+        raise Exception("No audio control available (pulse/pactl/wpctl/alsaaudio/amixer missing)")
+
+    async def get_volume(self) -> dict:
+        backend, volume = await self._with_backend(lambda b: b.get_volume())
+        if volume is None:
+            raise Exception(f"Could not read volume from {backend.name}")
+        return {"volume": int(volume), **backend.describe()}
+
+    async def set_volume(self, level: int) -> bool:
+        _, ok = await self._with_backend(lambda b: b.set_volume(level))
+        return bool(ok)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend.name if self.backend else None,
+            **(self.backend.describe() if self.backend else {}),
+            "detections": self.detections,
+            "failures": self.failures,
+        }
+
+
+# Global instance
+audio_control = AudioControl()
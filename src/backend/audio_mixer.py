@@ -0,0 +1,266 @@
+"""Multi-talker audio receiver: any number of senders mixed into one output.
+
+``MixingReceiver`` accepts mic senders over TCP (``audio_codec`` framing)
+and UDP (``audio_udp`` datagrams) on the same port number. Each sender is
+a ``Talker`` with its own decoder and a short buffer of decoded PCM. Every
+``FRAME_MS`` frame takes one frame from every talker that has audio,
+sums them in place in a float32 frame, applies a peak limiter (instant
+attack, slow release ramped within the frame so recovery doesn't click)
+and writes the result to the ``Playback`` ring, which the device drains
+from its callback. Frames are mixed whenever the ring falls below its
+target, so the device clock paces mixing. Per talker that is one vector
+add per frame, so cost stays linear and small.
+
+Talkers can come and go at any time; a sender that reconnects is just a
+new talker, and the receiver no longer exits when someone hangs up.
+"""
+import asyncio
+import time
+
+import numpy as np
+
+import audio_codec
+from audio_codec import FRAME_MS, CODEC_IDS, MAGIC, CodecError
+from audio_playback import Playback
+from audio_udp import AUDIO, AUDIO_TYPE, JitterBuffer
+
+TCP_PREBUFFER_MS = 60  # Decoded audio held before a TCP talker starts playing
+MAX_TALKER_MS = 250  # Oldest audio dropped beyond this, so a burst can't add delay
+UDP_TALKER_TIMEOUT = 10.0  # Seconds without datagrams before a UDP talker is dropped
+LIMIT = 32000.0  # Limiter ceiling, just under int16 full scale
+RELEASE_PER_FRAME = 0.02  # Limiter gain recovery per frame (~1 s from 0 to 1)
+
+
+class Talker:
+    """One sender's decoder and decoded-audio buffer at the output rate."""
+
+    def __init__(self, name: str, transport: str, decoder: audio_codec.Decoder, frame_samples: int):
+        self.name = name
+        self.transport = transport
+        self.decoder = decoder
+        self.frame_samples = frame_samples
+        self.jitter = JitterBuffer() if transport == "udp" else None
+        self.last_heard = time.monotonic()
+        self.buffer = np.empty(0, dtype=np.int16)
+        # UDP is already de-jittered; one extra frame absorbs resampler rounding
+        prebuffer_ms = TCP_PREBUFFER_MS if transport == "tcp" else 2 * FRAME_MS
+        self.prebuffer = max(frame_samples, frame_samples * prebuffer_ms // FRAME_MS)
+        self.max_samples = frame_samples * MAX_TALKER_MS // FRAME_MS
+        self.playing = False
+        self.frames = 0
+        self.underruns = 0
+        self.overruns = 0  # Frames of audio dropped for being too far behind
+
+    def feed(self, pcm: bytes):
+        self.last_heard = time.monotonic()
+        self.buffer = np.concatenate([self.buffer, np.frombuffer(pcm, dtype="<i2")])
+        excess = len(self.buffer) - self.max_samples
+        if excess > 0:
+            self.buffer = self.buffer[excess:]
+            self.overruns += 1
+
+    def take(self) -> np.ndarray | None:
+        """One frame, or None while (re)buffering."""
+        n = self.frame_samples
+        if not self.playing:
+            if len(self.buffer) < self.prebuffer:
+                return None
+            self.playing = True
+        if len(self.buffer) < n:
+            self.playing = False
+            self.underruns += 1
+            return None
+        frame, self.buffer = self.buffer[:n], self.buffer[n:]
+        self.frames += 1
+        return frame
+
+    def stats(self) -> dict:
+        stats = {
+            "transport": self.transport,
+            "codec": self.decoder.codec.name,
+            "buffered_ms": round(len(self.buffer) / self.decoder.rate * 1000),
+            "frames": self.frames,
+            "underruns": self.underruns,
+            "overruns": self.overruns,
+        }
+        if self.jitter is not None:
+            stats["jitter"] = self.jitter.stats()
+        return stats
+
+
+class UdpTalkers(asyncio.DatagramProtocol):
+    """Answers codec offers and routes audio datagrams to their talker."""
+
+    def __init__(self, receiver: "MixingReceiver"):
+        self.receiver = receiver
+        self.transport = None
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+    def datagram_received(self, data: bytes, address):
+        name = f"{address[0]}:{address[1]}"
+        if data.startswith(MAGIC):
+            try:
+                sender_rate, offered = audio_codec.parse_offer(data)
+                chosen = audio_codec.choose_codec(sender_rate, offered, self.receiver.rate)
+            except CodecError as e:
+                print(f"❌ Codec offer from {name}: {e}")
+                self.transport.sendto(audio_codec.answer_message(None), address)
+                return
+            # Senders re-offer every few seconds; only a new sender or codec starts a fresh stream
+            talker = self.receiver.talkers.get(name)
+            if talker is None or talker.jitter is None or talker.decoder.codec.name != chosen:
+                self.receiver.add_talker(name, "udp", audio_codec.Decoder(chosen, self.receiver.rate))
+            self.transport.sendto(audio_codec.answer_message(chosen), address)
+        elif len(data) > AUDIO.size and data[0] == AUDIO_TYPE:
+            talker = self.receiver.talkers.get(name)
+            _, codec_id, seq, timestamp = AUDIO.unpack_from(data)
+            if talker is None or talker.jitter is None or codec_id != CODEC_IDS[talker.decoder.codec.name]:
+                self.receiver.ignored += 1
+                return
+            talker.last_heard = time.monotonic()
+            talker.jitter.push(seq, timestamp, data[AUDIO.size:])
+
+
+class MixingReceiver:
+    """Serves any number of senders and mixes them on a fixed frame clock."""
+
+    def __init__(self, port: int, rate: int, playback: Playback, host: str = "0.0.0.0"):
+        self.port = port
+        self.host = host
+        self.rate = rate
+        self.frame_samples = playback.frame_samples
+        self.playback = playback
+        self.talkers = {}  # "ip:port" -> Talker
+        self.ignored = 0
+        self.gain = 1.0
+        self.ticks = 0
+        self.clipped = 0  # Samples still over full scale after the limiter
+        self.mix_time = 0.0
+        self._mix = np.zeros(self.frame_samples, dtype=np.float32)
+        self._silence = bytes(2 * self.frame_samples)
+
+    def add_talker(self, name: str, transport: str, decoder: audio_codec.Decoder) -> Talker:
+        talker = Talker(name, transport, decoder, self.frame_samples)
+        replaced = self.talkers.get(name) is not None
+        self.talkers[name] = talker
+        if not replaced:
+            print(f"🔗 Talker {name} joined ({transport}, {decoder.codec.name}); {len(self.talkers)} connected")
+        return talker
+
+    def remove_talker(self, name: str, talker: Talker | None = None):
+        if talker is not None and self.talkers.get(name) is not talker:
+            return  # Already replaced by a newer stream from the same address
+        if self.talkers.pop(name, None) is not None:
+            print(f"👋 Talker {name} left; {len(self.talkers)} connected")
+
+    # --------------------------
+    # TCP senders
+    # --------------------------
+
+    async def _handle_tcp(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        peer = writer.get_extra_info("peername")
+        name = f"{peer[0]}:{peer[1]}"
+        talker = None
+        try:
+            header = await reader.readexactly(audio_codec.OFFER.size)
+            sender_rate, offered = audio_codec.parse_offer(header + await reader.readexactly(header[-1]))
+            try:
+                chosen = audio_codec.choose_codec(sender_rate, offered, self.rate)
+            except CodecError:
+                writer.write(audio_codec.answer_message(None))
+                raise
+            writer.write(audio_codec.answer_message(chosen))
+            await writer.drain()
+            talker = self.add_talker(name, "tcp", audio_codec.Decoder(chosen, self.rate))
+            while True:
+                length = audio_codec.LENGTH.unpack(await reader.readexactly(audio_codec.LENGTH.size))[0]
+                talker.feed(talker.decoder.decode(await reader.readexactly(length)))
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        except CodecError as e:
+            print(f"❌ Talker {name}: {e}")
+        finally:
+            if talker is not None:
+                self.remove_talker(name, talker)
+            writer.close()
+
+    # --------------------------
+    # Mixing
+    # --------------------------
+
+    def mix(self) -> bytes:
+        """Mix one frame from every talker that has audio."""
+        start = time.perf_counter()
+        now = time.monotonic()
+        mix = self._mix
+        mix.fill(0)
+        voices = 0
+        for name, talker in list(self.talkers.items()):
+            if talker.jitter is not None:
+                if now - talker.last_heard > UDP_TALKER_TIMEOUT:
+                    self.remove_talker(name, talker)
+                    continue
+                state, payload = talker.jitter.pop()
+                if state == "frame":
+                    talker.feed(talker.decoder.decode(payload))
+                elif state == "lost":
+                    talker.feed(talker.decoder.conceal())
+            frame = talker.take()
+            if frame is not None:
+                np.add(mix, frame, out=mix)
+                voices += 1
+        if not voices:
+            self.gain = min(1.0, self.gain + RELEASE_PER_FRAME)
+            self.mix_time += time.perf_counter() - start
+            return self._silence
+
+        # Peak limiter: drop to the needed gain at once, recover slowly
+        peak = float(np.abs(mix).max())
+        target = min(1.0, LIMIT / peak) if peak else 1.0
+        if target < self.gain:
+            mix *= target
+            self.gain = target
+        elif self.gain < 1.0:
+            # Ramp up within the frame; every sample stays at or under the target
+            gain = min(target, self.gain + RELEASE_PER_FRAME)
+            mix *= np.linspace(self.gain, gain, len(mix), dtype=np.float32)
+            self.gain = gain
+        over = np.abs(mix) > 32767
+        if over.any():
+            self.clipped += int(over.sum())
+            np.clip(mix, -32768, 32767, out=mix)
+        pcm = mix.astype("<i2").tobytes()
+        self.mix_time += time.perf_counter() - start
+        return pcm
+
+    async def _clock(self):
+        # Top the ring up to its target, then check again within half a frame
+        while True:
+            while self.playback.needs_frames():
+                self.playback.write(self.mix())
+                self.ticks += 1
+            await asyncio.sleep(FRAME_MS / 2000)
+
+    async def serve(self):
+        loop = asyncio.get_running_loop()
+        server = await asyncio.start_server(self._handle_tcp, self.host, self.port)
+        udp, _ = await loop.create_datagram_endpoint(lambda: UdpTalkers(self), local_addr=(self.host, self.port))
+        print(f"🎧 Waiting for incoming audio on port {self.port} (TCP and UDP)...")
+        try:
+            async with server:
+                await self._clock()
+        finally:
+            udp.close()
+
+    def stats(self) -> dict:
+        return {
+            "talkers": {name: talker.stats() for name, talker in self.talkers.items()},
+            "ticks": self.ticks,
+            "mix_us": round(self.mix_time / self.ticks * 1e6, 1) if self.ticks else None,
+            "gain": round(self.gain, 3),
+            "clipped": self.clipped,
+            "ignored": self.ignored,
+            "playback": self.playback.stats(),
+        }
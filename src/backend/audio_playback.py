@@ -0,0 +1,128 @@
+"""Decoupled playback: a sample ring drained by the audio device callback.
+
+The network side (the mixer) writes whole 16-bit frames into ``PcmRing``;
+PortAudio pulls from it in callback mode on its own thread at the device
+rate. Neither side waits on the other: a late producer shows up as an
+underrun (the device gets zeros for the missing part), a producer that
+gets too far ahead as an overrun (newest samples dropped). The producer
+keeps the ring near ``target_ms`` by checking ``buffered()``, so the
+device clock paces the whole pipeline and the depth stays stable.
+
+The ring is single-producer / single-consumer: the producer only moves
+``written`` and the consumer only moves ``consumed``, each after its
+copy, so no lock is taken on the audio thread.
+"""
+import time
+from collections import deque
+
+import numpy as np
+
+# PortAudio callback values (pyaudio.paContinue, pyaudio.paInputOverflow, pyaudio.paOutputUnderflow)
+PA_CONTINUE = 0
+PA_INPUT_OVERFLOW = 0x2
+PA_OUTPUT_UNDERFLOW = 0x4
+
+DEPTH_HISTORY = 250  # Callbacks of buffer depth kept for stats
+
+
+class PcmRing:
+    """Fixed-size ring of int16 samples for one producer and one consumer."""
+
+    def __init__(self, capacity: int):
+        self.data = np.zeros(capacity, dtype=np.int16)
+        self.capacity = capacity
+        self.written = 0  # Total samples written; only the producer changes it
+        self.consumed = 0  # Total samples read; only the consumer changes it
+        self.overruns = 0
+        self.overrun_samples = 0
+        self.underruns = 0
+        self.underrun_samples = 0
+
+    def available(self) -> int:
+        return self.written - self.consumed
+
+    def write(self, samples: np.ndarray) -> int:
+        free = self.capacity - (self.written - self.consumed)
+        n = min(len(samples), free)
+        if n < len(samples):
+            self.overruns += 1
+            self.overrun_samples += len(samples) - n
+        start = self.written % self.capacity
+        first = min(n, self.capacity - start)
+        self.data[start:start + first] = samples[:first]
+        self.data[:n - first] = samples[first:n]
+        self.written += n  # Publish only after the copy
+        return n
+
+    def read_into(self, out: np.ndarray) -> int:
+        n = min(len(out), self.written - self.consumed)
+        start = self.consumed % self.capacity
+        first = min(n, self.capacity - start)
+        out[:first] = self.data[start:start + first]
+        out[first:n] = self.data[:n - first]
+        if n < len(out):
+            out[n:] = 0
+            self.underruns += 1
+            self.underrun_samples += len(out) - n
+        self.consumed += n
+        return n
+
+    def skip(self, n: int) -> int:
+        """Consumer side: discard up to ``n`` of the oldest samples."""
+        n = min(n, self.written - self.consumed)
+        self.consumed += n
+        return n
+
+
+class Playback:
+    """Ring plus the PortAudio output callback that drains it."""
+
+    def __init__(self, rate: int, frame_samples: int, target_ms: int = 60, capacity_ms: int = 500):
+        self.rate = rate
+        self.frame_samples = frame_samples
+        self.target = rate * target_ms // 1000
+        self.ring = PcmRing(rate * capacity_ms // 1000)
+        self.callbacks = 0
+        self.device_underflows = 0  # Reported by PortAudio itself
+        self.callback_time = 0.0
+        self.depths = deque(maxlen=DEPTH_HISTORY)
+        self._out = np.zeros(frame_samples, dtype=np.int16)
+
+    def buffered(self) -> int:
+        return self.ring.available()
+
+    def needs_frames(self) -> bool:
+        return self.ring.available() < self.target
+
+    def write(self, pcm: bytes):
+        self.ring.write(np.frombuffer(pcm, dtype="<i2"))
+
+    def callback(self, in_data, frame_count, time_info, status):
+        """``stream_callback`` for ``PyAudio.open(output=True)``."""
+        start = time.perf_counter()
+        if status & PA_OUTPUT_UNDERFLOW:
+            self.device_underflows += 1
+        if len(self._out) != frame_count:
+            self._out = np.zeros(frame_count, dtype=np.int16)
+        self.depths.append(self.ring.available())
+        self.ring.read_into(self._out)
+        self.callbacks += 1
+        self.callback_time += time.perf_counter() - start
+        return self._out.tobytes(), PA_CONTINUE
+
+    def stats(self) -> dict:
+        depths = list(self.depths)
+        ms = 1000 / self.rate
+        return {
+            "target_ms": round(self.target * ms),
+            "depth_ms": round(self.ring.available() * ms),
+            "depth_min_ms": round(min(depths) * ms) if depths else None,
+            "depth_mean_ms": round(sum(depths) / len(depths) * ms) if depths else None,
+            "depth_max_ms": round(max(depths) * ms) if depths else None,
+            "underruns": self.ring.underruns,
+            "underrun_ms": round(self.ring.underrun_samples * ms),
+            "overruns": self.ring.overruns,
+            "overrun_ms": round(self.ring.overrun_samples * ms),
+            "device_underflows": self.device_underflows,
+            "callback_us": round(self.callback_time / self.callbacks * 1e6, 1) if self.callbacks else None,
+        }
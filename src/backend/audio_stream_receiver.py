@@ -1,39 +1,34 @@
+import asyncio
 import pyaudio
-import socket
+
+from audio_codec import FRAME_MS
+from audio_mixer import MixingReceiver
+from audio_playback import Playback
 
 # Audio Config
-CHUNK = 1024
 FORMAT = pyaudio.paInt16
 CHANNELS = 1
 RATE = 44100
+PLAYBACK_BUFFER_MS = 60  # Mixed audio kept queued for the device
 
-# Listening config
+# Listening config (TCP and UDP senders, any number at once)
 PORT = 12345
 
-# Setup socket
-sock = socket.socket()
-sock.bind(("0.0.0.0", PORT))
-sock.listen(1)
-print(f"🎧 Waiting for incoming audio on port {PORT}...")
-
-conn, addr = sock.accept()
-print(f"🔗 Connected by {addr}")
-
-# Setup audio output
+# Setup audio output: the device pulls frames from the playback ring in its own thread
+playback = Playback(RATE, RATE * FRAME_MS // 1000, target_ms=PLAYBACK_BUFFER_MS)
 p = pyaudio.PyAudio()
-stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, output=True)
+stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, output=True,
+                frames_per_buffer=playback.frame_samples, stream_callback=playback.callback)
+
+receiver = MixingReceiver(PORT, RATE, playback)
 
 try:
-    while True:
-        data = conn.recv(CHUNK)
-        if not data:
-            break
-        stream.write(data)
+    stream.start_stream()
+    asyncio.run(receiver.serve())
 except KeyboardInterrupt:
     print("🛑 Stopped.")
 finally:
+    print(f"📊 {receiver.stats()}")
     stream.stop_stream()
     stream.close()
     p.terminate()
-    conn.close()
-    sock.close()
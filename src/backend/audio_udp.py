@@ -0,0 +1,389 @@
+"""UDP transport for the mic sender / stream receiver pair.
+
+Over TCP one lost Wi-Fi packet holds back everything behind it and the
+delay never comes back down. Here every 20 ms codec packet is its own
+datagram carrying a sequence number and a media timestamp (milliseconds
+of audio since the stream started, as in RTP). The receiver keeps them
+in a ``JitterBuffer`` that:
+
+* reorders frames by sequence number and drops ones whose slot already
+  played, or duplicates
+* sizes its playout delay from the RFC 3550 interarrival jitter
+  estimate, between ``MIN_DELAY_MS`` and ``MAX_DELAY_MS``
+* conceals a frame that is not there when due (Opus PLC, or a fading
+  repeat for G.711); playout waits a frame for it, which grows the
+  delay after an underrun, and skips it once the buffer has refilled
+* drops the oldest frames when it holds more than the target plus
+  ``TRIM_SLACK_FRAMES``, so delay stays bounded after a burst
+
+The codec offer/answer from ``audio_codec`` is sent as datagrams too,
+retried until the receiver answers, and offered again every
+``OFFER_INTERVAL`` while sending so a receiver that restarted picks the
+stream back up. A repeated offer from the current sender only gets an
+answer; a different sender or codec starts a fresh stream.
+
+``LossyChannel`` drops and delays outgoing datagrams for testing
+(``GUARD_AUDIO_LOSS``, ``GUARD_AUDIO_DELAY_MS``,
+``GUARD_AUDIO_JITTER_MS``, or a fixed ``seed`` for repeatable runs).
+"""
+import heapq
+import math
+import os
+import random
+import socket
+import struct
+import threading
+import time
+
+import audio_codec
+from audio_codec import FRAME_MS, CODEC_IDS, CODEC_NAMES, MAGIC
+
+AUDIO = struct.Struct("!BBHI")  # type, codec id, sequence, media timestamp (ms)
+AUDIO_TYPE = 1
+MAX_DATAGRAM = 1500
+
+MIN_DELAY_MS = 40
+MAX_DELAY_MS = 300
+TRIM_SLACK_FRAMES = 3  # Frames over the target tolerated before trimming
+MAX_CONCEALED = 5  # Consecutive empty slots before going idle (talker stopped)
+OFFER_RETRY = 0.5  # Seconds between codec offers while waiting for an answer
+OFFER_INTERVAL = 2.0  # Seconds between codec offers once answered, while sending
+
+
+# --------------------------
+# Jitter buffer
+# --------------------------
+
+class JitterBuffer:
+    """Reorders frames and releases one per ``pop()`` at the playout rate."""
+
+    def __init__(self, frame_ms: int = FRAME_MS):
+        self.frame_ms = frame_ms
+        self.lock = threading.Lock()
+        self.reset()
+        self.received = 0
+        self.late = 0  # Arrived after their slot was played
+        self.duplicates = 0
+        self.lost = 0  # Given up on once the buffer refilled past them
+        self.underruns = 0  # Slots concealed while waiting for the frame due
+        self.trimmed = 0  # Dropped to bring the delay back down
+
+    def reset(self):
+        self.frames = {}  # extended sequence -> payload
+        self.highest = None  # Highest extended sequence seen
+        self.next_seq = None  # Next slot to play; None while idle
+        self.playing = False
+        self.empty_slots = 0
+        self.jitter = 0.0  # ms, RFC 3550 estimate
+        self._transit = None
+
+    def _extend(self, seq: int) -> int:
+        """Unwrap a 16-bit sequence number against the highest one seen."""
+        if self.highest is None:
+            return seq
+        delta = (seq - self.highest) & 0xFFFF
+        if delta >= 0x8000:
+            delta -= 0x10000
+        return self.highest + delta
+
+    def target_frames(self) -> int:
+        delay = min(MAX_DELAY_MS, max(MIN_DELAY_MS, self.frame_ms + 3 * self.jitter))
+        return math.ceil(delay / self.frame_ms)
+
+    def push(self, seq: int, timestamp: int, payload: bytes, arrival: float | None = None):
+        arrival_ms = (time.monotonic() if arrival is None else arrival) * 1000
+        with self.lock:
+            self.received += 1
+            seq = self._extend(seq)
+            if self.next_seq is not None and seq < self.next_seq:
+                self.late += 1
+                return
+            if seq in self.frames:
+                self.duplicates += 1
+                return
+            self.frames[seq] = payload
+            if self.highest is None or seq > self.highest:
+                self.highest = seq
+            # Interarrival jitter: how much the transit time varies
+            transit = arrival_ms - timestamp
+            if self._transit is not None:
+                self.jitter += (abs(transit - self._transit) - self.jitter) / 16
+            self._transit = transit
+
+    def pop(self) -> tuple[str, bytes | None]:
+        """Next slot: ("frame", payload), ("lost", None) to conceal, or ("idle", None)."""
+        with self.lock:
+            if not self.playing:
+                if not self.frames or len(self.frames) < self.target_frames():
+                    return "idle", None
+                self.playing = True
+                self.next_seq = min(self.frames)
+                self.empty_slots = 0
+            while len(self.frames) > self.target_frames() + TRIM_SLACK_FRAMES:
+                oldest = min(self.frames)
+                del self.frames[oldest]
+                self.trimmed += 1
+                self.next_seq = max(self.next_seq, oldest + 1)
+            payload = self.frames.pop(self.next_seq, None)
+            if payload is not None:
+                self.next_seq += 1
+                self.empty_slots = 0
+                return "frame", payload
+            if len(self.frames) >= self.target_frames():
+                # Enough later frames are waiting: this one is lost, move on
+                self.next_seq += 1
+                self.lost += 1
+                return "lost", None
+            # Conceal but keep waiting for this frame, adding one frame of delay
+            self.underruns += 1
+            self.empty_slots += 1
+            if not self.frames and self.empty_slots > MAX_CONCEALED:
+                # Talker went quiet: rebuffer before playing the next burst
+                self.playing = False
+                return "idle", None
+            return "lost", None
+
+    def stats(self) -> dict:
+        with self.lock:
+            return {
+                "received": self.received,
+                "late": self.late,
+                "duplicates": self.duplicates,
+                "lost": self.lost,
+                "underruns": self.underruns,
+                "trimmed": self.trimmed,
+                "depth": len(self.frames),
+                "jitter_ms": round(self.jitter, 1),
+                "target_ms": self.target_frames() * self.frame_ms,
+            }
+
+
+# --------------------------
+# Loss / delay injector
+# --------------------------
+
+class LossyChannel:
+    """``sendto`` that drops and delays datagrams; pass-through when all are zero."""
+
+    def __init__(self, sock, loss: float = 0.0, delay_ms: float = 0.0, jitter_ms: float = 0.0,
+                 seed: int | None = None):
+        self.sock = sock
+        self.loss = loss
+        self.delay_ms = delay_ms
+        self.jitter_ms = jitter_ms
+        self.random = random.Random(seed)  # Seeded for repeatable runs
+        self.sent = 0
+        self.dropped = 0
+        self._queue = []  # (due, order, data, address)
+        self._order = 0
+        self._ready = threading.Condition()
+        self._thread = None
+
+    @classmethod
+    def from_env(cls, sock):
+        return cls(
+            sock,
+            loss=float(os.environ.get("GUARD_AUDIO_LOSS", 0)),
+            delay_ms=float(os.environ.get("GUARD_AUDIO_DELAY_MS", 0)),
+            jitter_ms=float(os.environ.get("GUARD_AUDIO_JITTER_MS", 0)),
+        )
+
+    @property
+    def active(self) -> bool:
+        return bool(self.loss or self.delay_ms or self.jitter_ms)
+
+    def impair(self) -> float | None:
+        """Fate of the next datagram: its delay in seconds, or None if dropped."""
+        if self.random.random() < self.loss:
+            self.dropped += 1
+            return None
+        # Independent random delays also reorder datagrams, as Wi-Fi retries do
+        return (self.delay_ms + self.random.uniform(0, self.jitter_ms)) / 1000
+
+    def sendto(self, data: bytes, address):
+        self.sent += 1
+        if not self.active:
+            self.sock.sendto(data, address)
+            return
+        delay = self.impair()
+        if delay is None:
+            return
+        due = time.monotonic() + delay
+        with self._ready:
+            heapq.heappush(self._queue, (due, self._order, data, address))
+            self._order += 1
+            self._ready.notify()
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._deliver, name="lossy-channel", daemon=True)
+            self._thread.start()
+
+    def _deliver(self):
+        while True:
+            with self._ready:
+                while not self._queue or self._queue[0][0] > time.monotonic():
+                    self._ready.wait(self._queue[0][0] - time.monotonic() if self._queue else None)
+                _, _, data, address = heapq.heappop(self._queue)
+            try:
+                self.sock.sendto(data, address)
+            except OSError:
+                pass
+
+
+# --------------------------
+# Sender and receiver
+# --------------------------
+
+class UdpSender:
+    """Encodes capture chunks and sends one datagram per codec packet."""
+
+    def __init__(self, address, rate: int):
+        self.address = address
+        self.rate = rate
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.channel = LossyChannel.from_env(self.sock)
+        self.encoder = None
+        self.seq = 0
+        self.codecs = None
+        self.offer = None
+        self.next_offer = 0.0  # monotonic time of the next re-offer
+        self.offers = 0
+        self.answers = 0
+
+    def negotiate(self, timeout: float = audio_codec.NEGOTIATE_TIMEOUT) -> str:
+        self.codecs = audio_codec.available_codecs()
+        self.offer = audio_codec.offer_message(self.rate, self.codecs)
+        self.sock.settimeout(OFFER_RETRY)
+        deadline = time.monotonic() + timeout
+        try:
+            while time.monotonic() < deadline:
+                self._send_offer()
+                try:
+                    reply, _ = self.sock.recvfrom(MAX_DATAGRAM)
+                except TimeoutError:
+                    continue
+                if reply.startswith(MAGIC):
+                    self._answered(reply)
+                    return self.encoder.codec.name
+        finally:
+            self.sock.settimeout(None)
+        raise audio_codec.CodecError(f"No answer to the codec offer from {self.address[0]}:{self.address[1]}")
+
+    def _send_offer(self):
+        self.sock.sendto(self.offer, self.address)  # Not through the injector
+        self.offers += 1
+        self.next_offer = time.monotonic() + OFFER_RETRY  # Pushed back once answered
+
+    def _answered(self, reply: bytes):
+        codec = audio_codec.parse_answer(reply, self.codecs)
+        if self.encoder is None or codec != self.encoder.codec.name:
+            if self.encoder is not None:
+                print(f"🔁 Receiver switched codec to {codec}")
+            self.encoder = audio_codec.Encoder(codec, self.rate)
+        self.answers += 1
+        self.next_offer = time.monotonic() + OFFER_INTERVAL
+
+    def _reoffer(self):
+        """Pick up pending answers and offer again when due."""
+        while True:
+            try:
+                reply, _ = self.sock.recvfrom(MAX_DATAGRAM, socket.MSG_DONTWAIT)
+            except OSError:  # Nothing waiting
+                break
+            if reply.startswith(MAGIC):
+                self._answered(reply)
+        if time.monotonic() >= self.next_offer:
+            self._send_offer()
+
+    def send(self, pcm: bytes):
+        self._reoffer()
+        codec_id = CODEC_IDS[self.encoder.codec.name]
+        for packet in self.encoder.encode(pcm):
+            timestamp = self.seq * FRAME_MS
+            header = AUDIO.pack(AUDIO_TYPE, codec_id, self.seq & 0xFFFF, timestamp & 0xFFFFFFFF)
+            self.channel.sendto(header + packet, self.address)
+            self.seq += 1
+
+    def close(self):
+        self.sock.close()
+
+
+class UdpReceiver:
+    """Answers codec offers and feeds audio datagrams into a jitter buffer.
+
+    ``read()`` returns one frame of 16-bit PCM at ``rate`` per call and is
+    meant to be called by the playback loop, which the device paces.
+    """
+
+    def __init__(self, port: int, rate: int, host: str = "0.0.0.0"):
+        self.rate = rate
+        self.sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self.sock.bind((host, port))
+        self.jitter = JitterBuffer()
+        self.decoder = None
+        self.peer = None
+        self.codec_id = None
+        self.ignored = 0  # Datagrams from someone other than the negotiated sender
+        self.silence = bytes(2 * (rate * FRAME_MS // 1000))
+        self._thread = None
+        self._running = False
+
+    def start(self):
+        self._running = True
+        self._thread = threading.Thread(target=self._receive, name="udp-audio-receive", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        self.sock.close()
+
+    def _receive(self):
+        while self._running:
+            try:
+                data, address = self.sock.recvfrom(MAX_DATAGRAM)
+            except OSError:
+                break
+            arrival = time.monotonic()
+            if data.startswith(MAGIC):
+                self._handle_offer(data, address)
+            elif len(data) > AUDIO.size and data[0] == AUDIO_TYPE:
+                kind, codec_id, seq, timestamp = AUDIO.unpack_from(data)
+                if address != self.peer or codec_id != self.codec_id:
+                    self.ignored += 1
+                    continue
+                self.jitter.push(seq, timestamp, data[AUDIO.size:], arrival)
+
+    def _handle_offer(self, data: bytes, address):
+        try:
+            sender_rate, offered = audio_codec.parse_offer(data)
+            chosen = audio_codec.choose_codec(sender_rate, offered, self.rate)
+        except audio_codec.CodecError as e:
+            print(f"❌ Codec offer from {address[0]}: {e}")
+            self.sock.sendto(audio_codec.answer_message(None), address)
+            return
+        if address != self.peer or CODEC_IDS[chosen] != self.codec_id:
+            # New sender, or the old one restarted: start a fresh stream
+            with self.jitter.lock:
+                self.decoder = audio_codec.Decoder(chosen, self.rate)
+                self.jitter.reset()
+            self.peer = address
+            self.codec_id = CODEC_IDS[chosen]
+            print(f"🔗 UDP audio from {address[0]}:{address[1]} ({chosen})")
+        self.sock.sendto(audio_codec.answer_message(chosen), address)
+
+    def read(self) -> bytes:
+        state, payload = self.jitter.pop()
+        decoder = self.decoder
+        if decoder is None or state == "idle":
+            return self.silence
+        if state == "lost":
+            return decoder.conceal()
+        return decoder.decode(payload)
+
+    def stats(self) -> dict:
+        return {
+            "peer": f"{self.peer[0]}:{self.peer[1]}" if self.peer else None,
+            "codec": CODEC_NAMES.get(self.codec_id),
+            "ignored": self.ignored,
+            **self.jitter.stats(),
+        }
+
@@ -0,0 +1,161 @@
+"""Display brightness through the kernel's backlight class.
+
+The ``/sys/class/backlight/*`` device is found once, ``max_brightness``
+is cached and ``brightness`` is read and written through file
+descriptors that stay open, so the hot path never forks. When sysfs is
+missing or not writable, ``screen_brightness_control`` and then
+``brightnessctl`` are used as before.
+"""
+import asyncio
+import os
+import shutil
+
+from command_runner import run_command
+
+BACKLIGHT_ROOT = "/sys/class/backlight"
+DISPLAY_COMMAND_TIMEOUT = 2.0  # Seconds before a brightnessctl call is considered hung
+
+# Preferred backlight types, as documented for the sysfs backlight class
+TYPE_PREFERENCE = {"firmware": 0, "platform": 1, "raw": 2}
+
+
+class BacklightControl:
+    """Brightness in percent, via sysfs when possible."""
+
+    def __init__(self, root: str = BACKLIGHT_ROOT):
+        self.root = root
+        self.device = None
+        self.max_brightness = None
+        self._read_fd = None
+        self._write_fd = None
+        self._detected = False
+
+    @property
+    def readable(self) -> bool:
+        return self._read_fd is not None
+
+    @property
+    def writable(self) -> bool:
+        return self._write_fd is not None
+
+    def detect(self):
+        """Find the backlight device and open its brightness file once."""
+        self.close()
+        self._detected = True
+        try:
+            names = os.listdir(self.root)
+        except OSError:
+            return None
+
+        candidates = []
+        for name in names:
+            path = os.path.join(self.root, name)
+            try:
+                with open(os.path.join(path, "type")) as f:
+                    kind = f.read().strip()
+            except OSError:
+                kind = "raw"
+            candidates.append((TYPE_PREFERENCE.get(kind, len(TYPE_PREFERENCE)), name, path))
+
+        for _, name, path in sorted(candidates):
+            try:
+                with open(os.path.join(path, "max_brightness")) as f:
+                    max_brightness = int(f.read().strip())
+                if max_brightness <= 0:
+                    continue
+                brightness_path = os.path.join(path, "brightness")
+                self._read_fd = os.open(brightness_path, os.O_RDONLY)
+                if os.access(brightness_path, os.W_OK):
+                    self._write_fd = os.open(brightness_path, os.O_WRONLY)
+            except (OSError, ValueError) as e:
+                print(f"Skipping backlight {name}: {e}")
+                self.close()
+                continue
+            self.device = name
+            self.max_brightness = max_brightness
+            print(f"Backlight: {name} (max {max_brightness}, {'writable' if self.writable else 'read-only'})")
+            return name
+        return None
+
+    def close(self):
+        for fd in (self._read_fd, self._write_fd):
+            if fd is not None:
+                os.close(fd)
+        self._read_fd = self._write_fd = None
+        self.device = None
+        self.max_brightness = None
+
+    def _ensure_detected(self):
+        if not self._detected:
+            self.detect()
+
+    def read_sysfs(self) -> int:
+        raw = int(os.pread(self._read_fd, 32, 0).strip() or 0)
+        return int(round(raw * 100 / self.max_brightness))
+
+    def write_sysfs(self, level: int):
+        raw = int(round(level * self.max_brightness / 100))
+        os.pwrite(self._write_fd, str(raw).encode(), 0)
+
+    async def get_percent(self) -> int:
+        self._ensure_detected()
+        if self.readable:
+            try:
+                return self.read_sysfs()
+            except OSError as e:
+                print(f"Backlight read failed, re-detecting: {e}")
+                self.detect()
+                if self.readable:
+                    return self.read_sysfs()
+
+        # Try to import and use screen_brightness_control
+        try:
+            import screen_brightness_control as sbc
+            return (await asyncio.to_thread(sbc.get_brightness, display=0))[0]
+        except ImportError:
+            # Fallback: brightnessctl if available
+            if shutil.which("brightnessctl"):
+                result = await run_command(["brightnessctl", "get"], timeout=DISPLAY_COMMAND_TIMEOUT)
+                if result.ok:
+                    # brightnessctl outputs current value and requires max to compute percent
+                    cur = int(result.stdout.strip() or 0)
+                    max_res = await run_command(["brightnessctl", "max"], timeout=DISPLAY_COMMAND_TIMEOUT)
+                    max_v = int(max_res.stdout.strip() or 1)
+                    return int(round(cur * 100 / max_v))
+            raise LookupError("screen_brightness_control/brightnessctl not available")
+
+    async def set_percent(self, level: int) -> bool:
+        """Set the display brightness; raises with the reason on failure."""
+        self._ensure_detected()
+        if self.writable:
+            try:
+                self.write_sysfs(level)
+                return True
+            except OSError as e:
+                print(f"Backlight write failed, falling back: {e}")
+
+        # Try to import and use screen_brightness_control
+        try:
+            import screen_brightness_control as sbc
+            await asyncio.to_thread(sbc.set_brightness, level)
+            return True
+        except ImportError:
+            # Fallback: brightnessctl if available
+            if shutil.which("brightnessctl"):
+                result = await run_command(["brightnessctl", "set", f"{level}%"], timeout=DISPLAY_COMMAND_TIMEOUT)
+                if result.ok:
+                    return True
+                raise Exception(result.stderr or "brightnessctl failed")
+            raise Exception("screen_brightness_control and brightnessctl not available")
+
+    def stats(self) -> dict:
+        return {
+            "device": self.device,
+            "max_brightness": self.max_brightness,
+            "readable": self.readable,
+            "writable": self.writable,
+        }
+
+
+# Global instance
+backlight = BacklightControl()
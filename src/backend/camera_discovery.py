@@ -0,0 +1,377 @@
+"""Active camera discovery and a MAC -> IP binding cache.
+
+Waiting for the kernel to learn a camera's address by chance leaves the
+status at "Camera detected but no IP" after every reboot. Discovery
+instead sweeps the camera interface's subnet with ARP requests and, at
+the same time, multicasts an ONVIF WS-Discovery probe; everything that
+answers within one round-trip window is cached by MAC with an expiry,
+so a camera lookup is a dict hit.
+
+The ARP sweep uses a raw ``AF_PACKET`` socket when the process has
+``CAP_NET_RAW``. Without it, a zero-length UDP datagram is sent to every
+host instead, which makes the kernel ARP for them, and the neighbour
+table is read once the window closes.
+"""
+import asyncio
+import fcntl
+import ipaddress
+import os
+import re
+import socket
+import struct
+import time
+import uuid
+
+DISCOVERY_WINDOW = 1.0  # Seconds to collect ARP and WS-Discovery replies
+DISCOVERY_INTERVAL = 300.0  # Seconds between background sweeps
+BINDING_TTL = 2 * DISCOVERY_INTERVAL  # Bindings survive one missed sweep
+MIN_REDISCOVERY_INTERVAL = 10.0  # Cache misses can't trigger sweeps more often than this
+MAX_SWEEP_HOSTS = 1024  # Larger subnets are only swept around our own /24
+
+PROC_NET_ARP = "/proc/net/arp"
+ARP_FLAG_INCOMPLETE = 0x0
+SYS_CLASS_NET = "/sys/class/net"
+
+ETH_P_ARP = 0x0806
+ARP_REQUEST = 1
+ARP_REPLY = 2
+BROADCAST_MAC = b"\xff" * 6
+SIOCGIFADDR = 0x8915
+SIOCGIFNETMASK = 0x891B
+
+WSD_ADDRESS = ("239.255.255.250", 3702)
+WSD_PROBE = (
+    '<?xml version="1.0" encoding="UTF-8"?>'
+    '<e:Envelope xmlns:e="http://www.w3.org/2003/05/soap-envelope"'
+    ' xmlns:w="http://schemas.xmlsoap.org/ws/2004/08/addressing"'
+    ' xmlns:d="http://schemas.xmlsoap.org/ws/2005/04/discovery"'
+    ' xmlns:dn="http://www.onvif.org/ver10/network/wsdl">'
+    '<e:Header>'
+    '<w:MessageID>uuid:{message_id}</w:MessageID>'
+    '<w:To e:mustUnderstand="true">urn:schemas-xmlsoap-org:ws:2005:04:discovery</w:To>'
+    '<w:Action e:mustUnderstand="true">http://schemas.xmlsoap.org/ws/2005/04/discovery/Probe</w:Action>'
+    '</e:Header>'
+    '<e:Body><d:Probe><d:Types>dn:NetworkVideoTransmitter</d:Types></d:Probe></e:Body>'
+    '</e:Envelope>'
+)
+XADDRS_RE = re.compile(r"<(?:\w+:)?XAddrs>([^<]*)</(?:\w+:)?XAddrs>")
+RELATES_TO_RE = re.compile(r"<(?:\w+:)?RelatesTo[^>]*>\s*uuid:([^<\s]+)\s*<")
+
+
+def read_arp_table() -> dict:
+    """Return resolved neighbours from /proc/net/arp as ``{mac: (ip, device)}``."""
+    neighbours = {}
+    try:
+        with open(PROC_NET_ARP) as f:
+            next(f, None)  # Header
+            for line in f:
+                fields = line.split()
+                if len(fields) < 6:
+                    continue
+                ip, _, flags, mac, _, device = fields[:6]
+                if int(flags, 16) == ARP_FLAG_INCOMPLETE:
+                    continue
+                neighbours[mac.lower()] = (ip, device)
+    except (OSError, ValueError) as e:
+        print(f"Error reading ARP table: {e}")
+    return neighbours
+
+
+def interface_address(interface: str) -> ipaddress.IPv4Interface | None:
+    """IPv4 address and netmask of ``interface``, or None if it has none."""
+    request = struct.pack("256s", interface.encode()[:15])
+    try:
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as s:
+            address = fcntl.ioctl(s.fileno(), SIOCGIFADDR, request)[20:24]
+            netmask = fcntl.ioctl(s.fileno(), SIOCGIFNETMASK, request)[20:24]
+    except OSError:
+        return None
+    return ipaddress.IPv4Interface(f"{socket.inet_ntoa(address)}/{socket.inet_ntoa(netmask)}")
+
+
+def interface_mac(interface: str) -> bytes | None:
+    try:
+        with open(os.path.join(SYS_CLASS_NET, interface, "address")) as f:
+            return bytes.fromhex(f.read().strip().replace(":", ""))
+    except (OSError, ValueError):
+        return None
+
+
+def sweep_targets(address: ipaddress.IPv4Interface) -> list[ipaddress.IPv4Address]:
+    network = address.network
+    if network.num_addresses > MAX_SWEEP_HOSTS:
+        network = ipaddress.ip_network(f"{address.ip}/24", strict=False)
+    return [host for host in network.hosts() if host != address.ip]
+
+
+def arp_request_frame(own_mac: bytes, own_ip: bytes, target_ip: bytes) -> bytes:
+    ethernet = BROADCAST_MAC + own_mac + struct.pack("!H", ETH_P_ARP)
+    arp = struct.pack("!HHBBH", 1, 0x0800, 6, 4, ARP_REQUEST) + own_mac + own_ip + b"\x00" * 6 + target_ip
+    return ethernet + arp
+
+
+def parse_arp_reply(frame: bytes) -> tuple[str, str] | None:
+    """Return ``(mac, ip)`` of the sender if ``frame`` is an ARP reply."""
+    if len(frame) < 42 or frame[12:14] != b"\x08\x06":
+        return None
+    if struct.unpack("!H", frame[20:22])[0] != ARP_REPLY:
+        return None
+    return frame[22:28].hex(":"), socket.inet_ntoa(frame[28:32])
+
+
+class WSDiscoveryProtocol(asyncio.DatagramProtocol):
+    """Collects ProbeMatch answers to one WS-Discovery probe."""
+
+    def __init__(self, message_id: str):
+        self.message_id = message_id
+        self.matches = {}  # ip -> XAddrs
+
+    def datagram_received(self, data, addr):
+        text = data.decode("utf-8", "replace")
+        relates = RELATES_TO_RE.search(text)
+        if relates and relates.group(1) != self.message_id:
+            return  # Answer to someone else's probe
+        xaddrs = XADDRS_RE.search(text)
+        self.matches[addr[0]] = xaddrs.group(1).split() if xaddrs else []
+
+    def error_received(self, exc):
+        pass
+
+
+class CameraDiscovery:
+    """Finds cameras on their interfaces and remembers where they are."""
+
+    def __init__(self, on_update=None):
+        self.on_update = on_update  # async (set of changed MACs) -> None
+        self.bindings = {}  # mac -> {"ip", "interface", "source", "seen", "expires", "xaddrs"}
+        self.interfaces = []
+        self.sweeps = 0
+        self.last_sweep = None
+        self.last_duration = None
+        self.raw_arp = None  # Whether AF_PACKET was usable on the last sweep
+        self._sweep_task = None
+        self._task = None
+
+    # --------------------------
+    # Cache
+    # --------------------------
+
+    def lookup(self, mac: str) -> str | None:
+        """IP bound to ``mac``, or None if unknown or expired."""
+        binding = self.bindings.get(mac.lower())
+        if binding is None or binding["expires"] < time.monotonic():
+            return None
+        return binding["ip"]
+
+    def _bind(self, mac: str, ip: str, interface: str, source: str, xaddrs=None) -> bool:
+        """Record a binding; returns True if it is new or the address changed."""
+        mac = mac.lower()
+        now = time.monotonic()
+        previous = self.bindings.get(mac)
+        self.bindings[mac] = {
+            "ip": ip,
+            "interface": interface,
+            "source": source,
+            "seen": time.time(),
+            "expires": now + BINDING_TTL,
+            "xaddrs": xaddrs if xaddrs is not None else (previous or {}).get("xaddrs", []),
+        }
+        return previous is None or previous["ip"] != ip or previous["expires"] < now
+
+    def observe_arp_table(self, arp_table: dict) -> set:
+        """Fold passively learnt neighbours into the cache."""
+        return {
+            mac for mac, (ip, device) in arp_table.items()
+            if self._bind(mac, ip, device, "arp-table")
+        }
+
+    # --------------------------
+    # Discovery
+    # --------------------------
+
+    async def _raw_arp_sweep(self, interface: str, address, targets) -> dict:
+        own_mac = interface_mac(interface)
+        if own_mac is None:
+            raise OSError(f"No MAC address for {interface}")
+        sock = socket.socket(socket.AF_PACKET, socket.SOCK_RAW, socket.htons(ETH_P_ARP))
+        try:
+            sock.bind((interface, ETH_P_ARP))
+            sock.setblocking(False)
+            loop = asyncio.get_running_loop()
+            own_ip = address.ip.packed
+            for target in targets:
+                await loop.sock_sendall(sock, arp_request_frame(own_mac, own_ip, target.packed))
+
+            found = {}
+            wanted = {str(target) for target in targets}
+            deadline = loop.time() + DISCOVERY_WINDOW
+            while len(found) < len(wanted):
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    frame = await asyncio.wait_for(loop.sock_recv(sock, 128), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                reply = parse_arp_reply(frame)
+                if reply and reply[1] in wanted:
+                    found[reply[0]] = reply[1]
+            return found
+        finally:
+            sock.close()
+
+    async def _kernel_arp_sweep(self, interface: str, targets) -> dict:
+        """Unprivileged sweep: let the kernel ARP, then read its neighbour table."""
+        with socket.socket(socket.AF_INET, socket.SOCK_DGRAM) as sock:
+            sock.setblocking(False)
+            try:
+                sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, interface.encode())
+            except OSError:
+                pass  # Needs CAP_NET_RAW too; the route picks the same interface anyway
+            for target in targets:
+                try:
+                    sock.sendto(b"", (str(target), 9))  # discard port
+                except OSError:
+                    pass  # EHOSTUNREACH from earlier failed lookups, full buffers
+            await asyncio.sleep(DISCOVERY_WINDOW)
+        return {mac: ip for mac, (ip, device) in read_arp_table().items() if device == interface}
+
+    async def _arp_sweep(self, interface: str, address) -> dict:
+        targets = sweep_targets(address)
+        if self.raw_arp is not False:
+            try:
+                found = await self._raw_arp_sweep(interface, address, targets)
+                self.raw_arp = True
+                return found
+            except (AttributeError, PermissionError):
+                self.raw_arp = False
+                print("Raw ARP sweep not permitted, letting the kernel resolve instead")
+            except OSError as e:
+                print(f"Raw ARP sweep on {interface} failed: {e}")
+        return await self._kernel_arp_sweep(interface, targets)
+
+    async def _ws_discovery(self, address) -> dict:
+        message_id = str(uuid.uuid4())
+        loop = asyncio.get_running_loop()
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            sock.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_IF, address.ip.packed)
+            sock.bind((str(address.ip), 0))
+            transport, protocol = await loop.create_datagram_endpoint(
+                lambda: WSDiscoveryProtocol(message_id), sock=sock
+            )
+        except BaseException:
+            sock.close()  # Once the endpoint exists its transport closes the socket
+            raise
+        try:
+            transport.sendto(WSD_PROBE.format(message_id=message_id).encode(), WSD_ADDRESS)
+            await asyncio.sleep(DISCOVERY_WINDOW)
+        finally:
+            transport.close()
+        return protocol.matches
+
+    async def discover_interface(self, interface: str) -> set:
+        """ARP sweep and WS-Discovery probe in one window; returns changed MACs."""
+        address = interface_address(interface)
+        if address is None:
+            return set()
+
+        arp, onvif = await asyncio.gather(
+            self._arp_sweep(interface, address),
+            self._ws_discovery(address),
+            return_exceptions=True,
+        )
+        if isinstance(arp, BaseException):
+            print(f"ARP sweep on {interface} failed: {arp}")
+            arp = {}
+        if isinstance(onvif, BaseException):
+            print(f"WS-Discovery on {interface} failed: {onvif}")
+            onvif = {}
+
+        changed = {mac for mac, ip in arp.items() if self._bind(mac, ip, interface, "arp-sweep")}
+        if onvif:
+            # ONVIF answers carry no MAC; the camera ARPed us to reply, so the kernel knows it
+            by_ip = {ip: mac for mac, (ip, device) in read_arp_table().items()}
+            for ip, xaddrs in onvif.items():
+                mac = by_ip.get(ip)
+                if mac and self._bind(mac, ip, interface, "ws-discovery", xaddrs):
+                    changed.add(mac)
+        return changed
+
+    async def discover(self, interfaces=None) -> set:
+        interfaces = list(interfaces or self.interfaces)
+        start = time.monotonic()
+        results = await asyncio.gather(*(self.discover_interface(i) for i in interfaces))
+        changed = set().union(*results) if results else set()
+        self.sweeps += 1
+        self.last_sweep = start
+        self.last_duration = round(time.monotonic() - start, 3)
+        print(f"Camera discovery on {', '.join(interfaces) or 'no interfaces'}: "
+              f"{len(changed)} new binding(s) in {self.last_duration}s")
+        if changed and self.on_update:
+            try:
+                await self.on_update(changed)
+            except Exception as e:
+                print(f"Error reporting discovered cameras: {e}")
+        return changed
+
+    def request(self):
+        """Start a sweep in the background unless one ran or is running recently."""
+        if self._sweep_task is not None and not self._sweep_task.done():
+            return self._sweep_task
+        if self.last_sweep is not None and time.monotonic() - self.last_sweep < MIN_REDISCOVERY_INTERVAL:
+            return None
+        self._sweep_task = asyncio.create_task(self.discover())
+        return self._sweep_task
+
+    def start(self, interfaces):
+        self.interfaces = list(interfaces)
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        for task in (self._task, self._sweep_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._task = self._sweep_task = None
+
+    async def _run(self):
+        while True:
+            try:
+                task = self.request()
+                if task is not None:
+                    await asyncio.shield(task)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Camera discovery failed: {e}")
+            await asyncio.sleep(DISCOVERY_INTERVAL)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        return {
+            "interfaces": self.interfaces,
+            "sweeps": self.sweeps,
+            "last_duration": self.last_duration,
+            "raw_arp": self.raw_arp,
+            "bindings": {
+                mac: {
+                    "ip": b["ip"],
+                    "interface": b["interface"],
+                    "source": b["source"],
+                    "seen": b["seen"],
+                    "expires_in": round(b["expires"] - now, 1),
+                    "xaddrs": b["xaddrs"],
+                }
+                for mac, b in self.bindings.items()
+            },
+        }
+
+
+# Global instance
+camera_discovery = CameraDiscovery()
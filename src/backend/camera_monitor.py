@@ -0,0 +1,174 @@
+"""Background camera health monitor.
+
+Probes the cameras on a schedule and whenever the kernel reports a link
+change on a camera interface (rtnetlink), keeps the latest result for
+``GET /system/camera`` and reports transitions through ``on_change`` so
+clients can stop polling.
+"""
+import asyncio
+import socket
+import struct
+import time
+
+from snapshot_cache import SingleFlightCache
+
+CAMERA_PROBE_INTERVAL = 10.0  # Seconds between scheduled probes
+LINK_SETTLE_DELAY = 3.0  # Re-probe after a link event once ARP has had time to resolve
+
+# rtnetlink constants (linux/rtnetlink.h)
+RTMGRP_LINK = 0x1
+RTM_NEWLINK = 16
+RTM_DELLINK = 17
+NLMSG_HEADER = struct.Struct("=IHHII")  # len, type, flags, seq, pid
+IFINFOMSG = struct.Struct("=BxHiII")  # family, type, index, flags, change
+
+
+def state_key(status: dict) -> tuple:
+    """Fields whose change is worth telling clients about."""
+    return (
+        status.get("connected"),
+        status.get("status"),
+        tuple((d.get("device"), d.get("active")) for d in status.get("devices", [])),
+    )
+
+
+class CameraMonitor:
+    """Keeps a fresh camera status and pushes changes."""
+
+    def __init__(self, probe, interfaces, on_change=None, interval: float = CAMERA_PROBE_INTERVAL):
+        self.probe = probe  # async () -> status dict
+        self.interfaces = list(interfaces)
+        self.on_change = on_change  # async (status dict) -> None
+        self.interval = interval
+        # Readers get the cached result; it only expires if the monitor stops
+        self.cache = SingleFlightCache(self._probe, ttl=interval * 2, name="camera")
+        self.link_events = 0
+        self._previous_key = None
+        self._wake = asyncio.Event()
+        self._task = None
+        self._netlink = None
+
+    async def _probe(self) -> dict:
+        status = await self.probe()
+        status = {**status, "timestamp": time.time()}
+        key = state_key(status)
+        if key != self._previous_key:
+            changed = self._previous_key is not None
+            self._previous_key = key
+            if changed:
+                print(f"Camera state changed: {status['status']}")
+                if self.on_change:
+                    try:
+                        await self.on_change(status)
+                    except Exception as e:
+                        print(f"Error reporting camera change: {e}")
+        return status
+
+    async def get(self) -> dict:
+        """Latest status, probing only if nothing recent is cached."""
+        status = await self.cache.get()
+        return {**status, "age": round(time.time() - status["timestamp"], 3)}
+
+    def poke(self):
+        """Probe now, e.g. after discovery found a camera's address."""
+        self._wake.set()
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._open_netlink()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        self._close_netlink()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                await self.cache.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Camera monitor probe failed: {e}")
+
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=self.interval)
+            except asyncio.TimeoutError:
+                continue
+            # Link changed: probe now, and again once the neighbour entry has settled
+            self._wake.clear()
+            try:
+                await self.cache.refresh()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Camera monitor probe failed: {e}")
+            await asyncio.sleep(LINK_SETTLE_DELAY)
+            self._wake.clear()
+
+    # --------------------------
+    # rtnetlink link events
+    # --------------------------
+
+    def _open_netlink(self):
+        try:
+            sock = socket.socket(socket.AF_NETLINK, socket.SOCK_RAW, socket.NETLINK_ROUTE)
+            sock.bind((0, RTMGRP_LINK))
+            sock.setblocking(False)
+            asyncio.get_running_loop().add_reader(sock.fileno(), self._on_netlink)
+        except (AttributeError, OSError, NotImplementedError) as e:
+            print(f"Link events unavailable, camera monitor will only poll: {e}")
+            return
+        self._netlink = sock
+
+    def _close_netlink(self):
+        if self._netlink is not None:
+            try:
+                asyncio.get_running_loop().remove_reader(self._netlink.fileno())
+            except Exception:
+                pass
+            self._netlink.close()
+            self._netlink = None
+
+    def _on_netlink(self):
+        watched = set()
+        for interface in self.interfaces:
+            try:
+                watched.add(socket.if_nametoindex(interface))
+            except OSError:
+                watched = None  # Interface missing: any link event is interesting
+                break
+        while True:
+            try:
+                data = self._netlink.recv(65536)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError as e:
+                print(f"Netlink read failed: {e}")
+                return
+            offset = 0
+            while offset + NLMSG_HEADER.size <= len(data):
+                length, msg_type, _, _, _ = NLMSG_HEADER.unpack_from(data, offset)
+                if length < NLMSG_HEADER.size:
+                    break
+                if msg_type in (RTM_NEWLINK, RTM_DELLINK) and offset + NLMSG_HEADER.size + IFINFOMSG.size <= len(data):
+                    _, _, index, _, _ = IFINFOMSG.unpack_from(data, offset + NLMSG_HEADER.size)
+                    if watched is None or index in watched:
+                        self.link_events += 1
+                        self._wake.set()
+                offset += (length + 3) & ~3  # NLMSG_ALIGN
+
+    def stats(self) -> dict:
+        return {
+            "interval": self.interval,
+            "interfaces": self.interfaces,
+            "link_events": self.link_events,
+            "netlink": self._netlink is not None,
+            "cache": self.cache.stats(),
+        }
@@ -0,0 +1,295 @@
+"""Application-level camera probes: RTSP and HTTP over kept-alive connections.
+
+A TCP connect only proves the port is open. In ``service`` probe mode
+each camera port is asked a real question instead: ``OPTIONS`` and
+``DESCRIBE`` on RTSP ports and ``HEAD /`` on web ports. Connections are
+kept open between probes so a check costs one round trip, and every
+response time is recorded in a per-camera histogram whose p50/p99 are
+reported with the camera status.
+"""
+import asyncio
+import math
+import time
+
+SERVICE_PROBE_TIMEOUT = 2.0  # Seconds for one request, including a (re)connect
+SERVICE_PROBE_DEADLINE = 3.0  # One deadline for all ports of a camera
+RTSP_PORTS = {554, 8554}
+MAX_HEADER_BYTES = 16384
+MAX_BODY_BYTES = 65536
+
+# Histogram buckets: quarter-octave steps from 0.1 ms to ~13 s
+HISTOGRAM_MIN_MS = 0.1
+HISTOGRAM_STEPS_PER_OCTAVE = 4
+HISTOGRAM_BUCKETS = 68
+
+
+class LatencyHistogram:
+    """Log-bucketed response times; percentiles are accurate to one bucket (~19%)."""
+
+    def __init__(self):
+        self.counts = [0] * HISTOGRAM_BUCKETS
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    @staticmethod
+    def bucket(ms: float) -> int:
+        if ms <= HISTOGRAM_MIN_MS:
+            return 0
+        index = int(math.log2(ms / HISTOGRAM_MIN_MS) * HISTOGRAM_STEPS_PER_OCTAVE) + 1
+        return min(index, HISTOGRAM_BUCKETS - 1)
+
+    @staticmethod
+    def upper_bound(index: int) -> float:
+        return HISTOGRAM_MIN_MS * 2 ** (index / HISTOGRAM_STEPS_PER_OCTAVE)
+
+    def record(self, ms: float):
+        self.counts[self.bucket(ms)] += 1
+        self.count += 1
+        self.total += ms
+        self.min = ms if self.min is None else min(self.min, ms)
+        self.max = ms if self.max is None else max(self.max, ms)
+
+    def percentile(self, p: float) -> float | None:
+        if not self.count:
+            return None
+        rank = math.ceil(self.count * p / 100)
+        seen = 0
+        for index, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                # Never report more than was actually observed
+                return min(self.upper_bound(index), self.max)
+        return self.max
+
+    def to_dict(self) -> dict:
+        def ms(value):
+            return round(value, 2) if value is not None else None
+        return {
+            "count": self.count,
+            "p50_ms": ms(self.percentile(50)),
+            "p99_ms": ms(self.percentile(99)),
+            "min_ms": ms(self.min),
+            "max_ms": ms(self.max),
+            "mean_ms": ms(self.total / self.count) if self.count else None,
+        }
+
+
+class ServiceConnection:
+    """One kept-alive RTSP or HTTP connection to a camera port."""
+
+    def __init__(self, ip: str, port: int):
+        self.ip = ip
+        self.port = port
+        self.reader = None
+        self.writer = None
+        self.requests = 0
+        self.connects = 0
+        self._lock = asyncio.Lock()
+
+    @property
+    def open(self) -> bool:
+        return self.writer is not None and not self.writer.is_closing()
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        self.reader = self.writer = None
+
+    async def _connect(self):
+        self.close()
+        self.reader, self.writer = await asyncio.open_connection(self.ip, self.port)
+        self.connects += 1
+
+    async def _attempt(self, request: bytes, read_body: bool, reused: bool) -> tuple[int, dict, float]:
+        if not reused:
+            await self._connect()
+        start = time.perf_counter()
+        status, headers = await self._exchange(request, read_body)
+        return status, headers, (time.perf_counter() - start) * 1000
+
+    async def _exchange(self, request: bytes, read_body: bool) -> tuple[int, dict]:
+        self.writer.write(request)
+        await self.writer.drain()
+        head = await self.reader.readuntil(b"\r\n\r\n")
+        if len(head) > MAX_HEADER_BYTES:
+            raise ValueError("Response header too large")
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ", 2)
+        if len(parts) < 2 or not parts[0].startswith(("RTSP/", "HTTP/")):
+            raise ValueError(f"Not an RTSP/HTTP response: {lines[0][:40]!r}")
+        status = int(parts[1])
+        headers = {}
+        for line in lines[1:]:
+            if ":" in line:
+                name, value = line.split(":", 1)
+                headers[name.strip().lower()] = value.strip()
+        length = int(headers.get("content-length", 0) or 0)
+        if read_body and length:
+            if length > MAX_BODY_BYTES:
+                raise ValueError("Response body too large")
+            await self.reader.readexactly(length)
+        if headers.get("connection", "").lower() == "close":
+            self.close()
+        return status, headers
+
+    async def request(self, request: bytes, read_body: bool = True) -> tuple[int, dict, float]:
+        """Send ``request`` and return ``(status, headers, elapsed_ms)``.
+
+        A kept-alive connection the camera has dropped is reopened once;
+        the reconnect is not counted in the response time.
+        """
+        async with self._lock:
+            for attempt in range(2):
+                reused = self.open
+                try:
+                    # The connect shares the timeout, so a blackholed camera can't hang on SYN retries
+                    result = await asyncio.wait_for(
+                        self._attempt(request, read_body, reused), timeout=SERVICE_PROBE_TIMEOUT
+                    )
+                    self.requests += 1
+                    return result
+                except asyncio.TimeoutError:
+                    self.close()  # A slow camera is not a stale connection: don't retry
+                    raise
+                except (OSError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError):
+                    self.close()
+                    if not reused or attempt:
+                        raise
+                except BaseException:
+                    self.close()  # Cancelled mid-response: the stream is out of sync
+                    raise
+
+
+def rtsp_request(method: str, url: str, cseq: int, extra: str = "") -> bytes:
+    return (
+        f"{method} {url} RTSP/1.0\r\n"
+        f"CSeq: {cseq}\r\n"
+        f"User-Agent: guard-backend\r\n"
+        f"{extra}\r\n"
+    ).encode()
+
+
+def http_head_request(ip: str, port: int) -> bytes:
+    return (
+        f"HEAD / HTTP/1.1\r\n"
+        f"Host: {ip}:{port}\r\n"
+        f"User-Agent: guard-backend\r\n"
+        f"Connection: keep-alive\r\n\r\n"
+    ).encode()
+
+
+class ServiceProber:
+    """Keeps one connection per camera port and a latency histogram per camera."""
+
+    def __init__(self, rtsp_ports=RTSP_PORTS):
+        self.rtsp_ports = set(rtsp_ports)  # Other ports are probed as HTTP
+        self.connections = {}  # (camera name, port) -> ServiceConnection
+        self.histograms = {}  # camera name -> LatencyHistogram
+        self._cseq = 0
+
+    def histogram(self, name: str) -> LatencyHistogram:
+        if name not in self.histograms:
+            self.histograms[name] = LatencyHistogram()
+        return self.histograms[name]
+
+    def _connection(self, name: str, ip: str, port: int) -> ServiceConnection:
+        connection = self.connections.get((name, port))
+        if connection is None or connection.ip != ip:
+            if connection is not None:
+                connection.close()  # Camera moved to a new address
+            connection = ServiceConnection(ip, port)
+            self.connections[(name, port)] = connection
+        return connection
+
+    async def _probe_rtsp(self, connection: ServiceConnection, url: str) -> dict:
+        self._cseq += 1
+        status, headers, options_ms = await connection.request(rtsp_request("OPTIONS", url, self._cseq))
+        methods = headers.get("public", "")
+        result = {"protocol": "rtsp", "status": status, "latencies": [options_ms]}
+        if not methods or "DESCRIBE" in methods.upper():
+            self._cseq += 1
+            status, _, describe_ms = await connection.request(
+                rtsp_request("DESCRIBE", url, self._cseq, "Accept: application/sdp\r\n")
+            )
+            result["describe_status"] = status
+            result["latencies"].append(describe_ms)
+        return result
+
+    async def _probe_http(self, connection: ServiceConnection) -> dict:
+        status, _, head_ms = await connection.request(
+            http_head_request(connection.ip, connection.port), read_body=False
+        )
+        return {"protocol": "http", "status": status, "latencies": [head_ms]}
+
+    def _failed(self, port: int, error: str) -> dict:
+        return {
+            "port": port,
+            "protocol": "rtsp" if port in self.rtsp_ports else "http",
+            "alive": False,
+            "error": error,
+        }
+
+    async def _probe_port(self, camera, ip: str, port: int) -> dict:
+        connection = self._connection(camera.name, ip, port)
+        try:
+            if port in self.rtsp_ports:
+                result = await self._probe_rtsp(connection, f"rtsp://{ip}:{port}{camera.rtsp_path}")
+            else:
+                result = await self._probe_http(connection)
+        except (OSError, asyncio.TimeoutError, asyncio.IncompleteReadError, asyncio.LimitOverrunError, ValueError) as e:
+            return self._failed(port, str(e) or type(e).__name__)
+        latencies = result.pop("latencies")
+        histogram = self.histogram(camera.name)
+        for ms in latencies:
+            histogram.record(ms)
+        # Any well-formed answer (including 401/404) means the service is up
+        return {
+            "port": port,
+            **result,
+            "alive": result["status"] < 500,
+            "latency_ms": round(sum(latencies), 2),
+        }
+
+    async def probe(self, camera, ip: str, deadline: float = SERVICE_PROBE_DEADLINE) -> dict:
+        """Probe every port of ``camera`` at ``ip`` concurrently, all within ``deadline``."""
+        tasks = {asyncio.create_task(self._probe_port(camera, ip, port)): port for port in camera.ports}
+        done, pending = await asyncio.wait(tasks, timeout=deadline)
+        for task in pending:
+            task.cancel()  # request() closes the connection, so the next probe starts clean
+        if pending:
+            await asyncio.gather(*pending, return_exceptions=True)
+        services = [
+            task.result() if task in done else self._failed(port, f"No answer within {deadline:g}s")
+            for task, port in tasks.items()
+        ]
+        return {
+            "services": list(services),
+            "active_ports": sorted(s["port"] for s in services if s["alive"]),
+            "latency": self.histogram(camera.name).to_dict(),
+        }
+
+    def close(self):
+        for connection in self.connections.values():
+            connection.close()
+        self.connections.clear()
+
+    def stats(self) -> dict:
+        return {
+            "connections": {
+                f"{name}:{port}": {
+                    "ip": connection.ip,
+                    "open": connection.open,
+                    "requests": connection.requests,
+                    "connects": connection.connects,
+                }
+                for (name, port), connection in self.connections.items()
+            },
+            "latency": {name: histogram.to_dict() for name, histogram in self.histograms.items()},
+        }
+
+
+# Global instance
+service_prober = ServiceProber()
+
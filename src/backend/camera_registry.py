@@ -0,0 +1,114 @@
+"""Registry of the IP cameras on this robot.
+
+Cameras are listed in ``cameras.json`` next to the backend, or in the
+file named by ``GUARD_CAMERAS_CONFIG``::
+
+    [
+        {"name": "front", "mac": "BC:29:78:41:90:1C", "interface": "enP8p1s0"},
+        {"name": "rear", "mac": "BC:29:78:41:90:2A", "interface": "enP8p1s0",
+         "ports": [554, 80], "probe": "service", "rtsp_path": "/stream1"}
+    ]
+
+``probe`` is ``tcp`` (port is open) or ``service`` (RTSP/HTTP answer,
+with latency); ``GUARD_CAMERA_PROBE`` sets the default.
+
+Without a config file the single camera the backend always used is
+registered, so existing installs keep working.
+"""
+import json
+import os
+
+# Default camera configuration
+CAMERA_MAC = "BC:29:78:41:90:1C"
+CAMERA_INTERFACE = "enP8p1s0"
+CAMERA_PORTS = [80, 554, 8080, 9000]  # Common camera ports
+PROBE_MODES = ("tcp", "service")
+DEFAULT_PROBE_MODE = os.environ.get("GUARD_CAMERA_PROBE", "tcp")
+if DEFAULT_PROBE_MODE not in PROBE_MODES:
+    # A typo here must not stop the backend: every camera would fail to register
+    print(f"Unknown GUARD_CAMERA_PROBE {DEFAULT_PROBE_MODE!r} (expected {' or '.join(PROBE_MODES)}), using tcp")
+    DEFAULT_PROBE_MODE = "tcp"
+
+CAMERAS_CONFIG = os.environ.get(
+    "GUARD_CAMERAS_CONFIG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "cameras.json"),
+)
+
+
+class Camera:
+    """One registered camera."""
+
+    def __init__(self, name: str, mac: str, interface: str = CAMERA_INTERFACE, ports=None,
+                 probe: str = DEFAULT_PROBE_MODE, rtsp_path: str = "/"):
+        if probe not in PROBE_MODES:
+            raise ValueError(f"Unknown probe mode {probe!r} for camera {name}")
+        self.name = name
+        self.mac = mac.upper()
+        self.interface = interface
+        self.ports = list(ports or CAMERA_PORTS)
+        self.probe = probe
+        self.rtsp_path = rtsp_path if rtsp_path.startswith("/") else f"/{rtsp_path}"
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "mac": self.mac,
+            "interface": self.interface,
+            "ports": self.ports,
+            "probe": self.probe,
+            "rtsp_path": self.rtsp_path,
+        }
+
+
+class CameraRegistry:
+    """The configured cameras, loaded from JSON."""
+
+    def __init__(self, path: str = CAMERAS_CONFIG):
+        self.path = path
+        self.cameras = []
+        self.source = None
+
+    def load(self):
+        """(Re)load the registry; falls back to the default camera on any problem."""
+        try:
+            with open(self.path) as f:
+                entries = json.load(f)
+            cameras = []
+            for index, entry in enumerate(entries):
+                cameras.append(Camera(
+                    name=entry.get("name") or f"camera{index + 1}",
+                    mac=entry["mac"],
+                    interface=entry.get("interface", CAMERA_INTERFACE),
+                    ports=entry.get("ports"),
+                    probe=entry.get("probe", DEFAULT_PROBE_MODE),
+                    rtsp_path=entry.get("rtsp_path", "/"),
+                ))
+            self.cameras = cameras
+            self.source = self.path
+        except FileNotFoundError:
+            self.cameras = [Camera("camera", CAMERA_MAC)]
+            self.source = "default"
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            print(f"Invalid camera config {self.path}, using default camera: {e}")
+            self.cameras = [Camera("camera", CAMERA_MAC)]
+            self.source = "default"
+        print(f"Camera registry: {len(self.cameras)} camera(s) from {self.source}")
+        return self.cameras
+
+    @property
+    def interfaces(self) -> list[str]:
+        return sorted({camera.interface for camera in self.cameras})
+
+    def __iter__(self):
+        return iter(self.cameras)
+
+    def __len__(self):
+        return len(self.cameras)
+
+    def to_dict(self) -> dict:
+        return {"source": self.source, "cameras": [camera.to_dict() for camera in self.cameras]}
+
+
+# Global instance
+camera_registry = CameraRegistry()
+camera_registry.load()
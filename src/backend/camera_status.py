@@ -1,145 +1,200 @@
 """Camera status checker for Jetson."""
-import subprocess
-import socket
-import json
-import re
+import asyncio
+import os
 from fastapi import HTTPException
 
-# Camera configuration
-CAMERA_MAC = "BC:29:78:41:90:1C"
-CAMERA_INTERFACE = "enP8p1s0"
-CAMERA_PORTS = [80, 554, 8080, 9000]  # Common camera ports
+from camera_registry import camera_registry, CAMERA_MAC, CAMERA_INTERFACE, CAMERA_PORTS
+from camera_probe import service_prober
+from camera_discovery import camera_discovery, read_arp_table
+from structured_log import logger
 
-def get_camera_ip() -> str:
-    """Get camera IP from ARP table using MAC address."""
+PROBE_TIMEOUT = 0.5  # One deadline shared by all port probes
+MAX_PARALLEL_PROBES = 8  # Cameras probed at the same time
+
+SYS_CLASS_NET = "/sys/class/net"
+
+def read_sysfs(path: str) -> str | None:
+    """Read a small sysfs attribute, or None if it is missing or unreadable."""
     try:
-        result = subprocess.run(
-            ["arp", "-n"],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            for line in result.stdout.splitlines():
-                if CAMERA_MAC.lower() in line.lower():
-                    ip = re.search(r'(\d+\.\d+\.\d+\.\d+)', line)
-                    if ip:
-                        return ip.group(1)
-    except Exception as e:
-        print(f"Error getting camera IP: {e}")
-    return None
+        with open(path) as f:
+            return f.read().strip()
+    except OSError:
+        return None
+
+def get_camera_ip(mac: str = CAMERA_MAC) -> str:
+    """Get camera IP from the discovery cache, falling back to the kernel's ARP table."""
+    ip = camera_discovery.lookup(mac)
+    if ip is None:
+        camera_discovery.observe_arp_table(read_arp_table())
+        ip = camera_discovery.lookup(mac)
+    return ip
 
 def check_interface_status(interface: str) -> dict:
     """Check the ethernet interface status."""
-    try:
-        result = subprocess.run(
-            ["ip", "link", "show", interface],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            output = result.stdout.lower()
-            return {
-                "up": "state up" in output,
-                "status": "up" if "state up" in output else "down",
-                "info": result.stdout.strip()
-            }
-    except Exception as e:
-        print(f"Error checking interface: {e}")
-    return {"up": False, "status": "error", "info": "Failed to check interface"}
+    operstate = read_sysfs(os.path.join(SYS_CLASS_NET, interface, "operstate"))
+    if operstate is None:
+        return {"up": False, "status": "error", "info": "Failed to check interface"}
+    up = operstate == "up"
+    return {
+        "up": up,
+        "status": "up" if up else "down",
+        "info": f"{interface}: operstate {operstate}"
+    }
 
-def check_link_status():
-    """Check ethernet link status using ethtool."""
-    try:
-        result = subprocess.run(
-            ["ethtool", CAMERA_INTERFACE],
-            capture_output=True,
-            text=True
-        )
-        if result.returncode == 0:
-            if "Link detected: yes" in result.stdout:
-                speed = re.search(r'Speed: (\d+\w+)', result.stdout)
-                duplex = re.search(r'Duplex: (\w+)', result.stdout)
-                return {
-                    "linked": True,
-                    "speed": speed.group(1) if speed else "unknown",
-                    "duplex": duplex.group(1) if duplex else "unknown"
-                }
-    except Exception as e:
-        print(f"Error checking link status: {e}")
+def check_link_status(interface: str = CAMERA_INTERFACE):
+    """Check ethernet link status, speed and duplex from sysfs."""
+    base = os.path.join(SYS_CLASS_NET, interface)
+    if read_sysfs(os.path.join(base, "carrier")) == "1":
+        speed = read_sysfs(os.path.join(base, "speed"))
+        duplex = read_sysfs(os.path.join(base, "duplex"))
+        return {
+            "linked": True,
+            # Same format ethtool prints, e.g. "1000Mb/s" and "Full"
+            "speed": f"{speed}Mb/s" if speed and speed.lstrip("-").isdigit() and int(speed) > 0 else "unknown",
+            "duplex": duplex.capitalize() if duplex and duplex != "unknown" else "unknown"
+        }
     return {"linked": False, "speed": "unknown", "duplex": "unknown"}
 
-def check_camera_status():
-    """Check if network camera is connected and responding."""
+async def probe_port(ip: str, port: int) -> bool:
+    """Return True if a TCP connection to ``ip:port`` succeeds."""
     try:
-        print("Checking camera status...")
-        
-        # First check interface status
-        interface_status = check_interface_status(CAMERA_INTERFACE)
-        if not interface_status["up"]:
-            return {
-                "connected": False,
-                "status": "Network interface down",
-                "devices": [{
-                    "device": CAMERA_INTERFACE,
-                    "active": False,
-                    "info": f"Interface status: {interface_status['status']}"
-                }]
+        _, writer = await asyncio.open_connection(ip, port)
+    except OSError:
+        return False
+    writer.close()
+    return True
+
+async def probe_ports(ip: str, ports: list[int], timeout: float = PROBE_TIMEOUT) -> list[int]:
+    """Probe all ``ports`` at once; anything not connected by ``timeout`` counts as closed."""
+    tasks = {asyncio.create_task(probe_port(ip, port)): port for port in ports}
+    done, pending = await asyncio.wait(tasks, timeout=timeout)
+    for task in pending:
+        task.cancel()
+    if pending:
+        await asyncio.gather(*pending, return_exceptions=True)
+    return sorted(
+        port for task, port in tasks.items()
+        if task in done and not task.cancelled() and task.exception() is None and task.result()
+    )
+
+async def probe_camera(camera, interface_status: dict, link_status: dict) -> dict:
+    """Status of one registered camera, as a ``devices`` entry plus details."""
+    result = {
+        "name": camera.name,
+        "mac": camera.mac,
+        "interface": camera.interface,
+        "ip": None,
+        "connected": False,
+        "active": False,
+        "active_ports": [],
+    }
+
+    if not interface_status["up"]:
+        return {
+            **result,
+            "status": "Network interface down",
+            "device": {
+                "device": camera.interface,
+                "active": False,
+                "info": f"Interface status: {interface_status['status']}"
             }
+        }
 
-        # Get link status
-        link_status = check_link_status()
-        
-        # Get camera IP
-        camera_ip = get_camera_ip()
-        if not camera_ip:
-            return {
-                "connected": interface_status["up"] and link_status["linked"],
-                "status": "Camera detected but no IP",
-                "devices": [{
-                    "device": f"MAC: {CAMERA_MAC}",
-                    "active": False,
-                    "info": (
-                        f"Interface: {CAMERA_INTERFACE} ({interface_status['status']}), "
-                        f"Link: {link_status['speed']} {link_status['duplex']}"
-                    )
-                }]
+    camera_ip = get_camera_ip(camera.mac)
+    if not camera_ip:
+        return {
+            **result,
+            "connected": interface_status["up"] and link_status["linked"],
+            "status": "Camera detected but no IP",
+            "device": {
+                "device": f"MAC: {camera.mac}",
+                "active": False,
+                "info": (
+                    f"Interface: {camera.interface} ({interface_status['status']}), "
+                    f"Link: {link_status['speed']} {link_status['duplex']}"
+                )
             }
+        }
 
-        # Check ports
-        active_ports = []
-        for port in CAMERA_PORTS:
-            try:
-                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
-                sock.settimeout(0.5)
-                if sock.connect_ex((camera_ip, port)) == 0:
-                    active_ports.append(port)
-            except:
-                pass
-            finally:
-                sock.close()
-
-        # Build status information
-        is_active = len(active_ports) > 0
-        status_info = (
-            f"IP: {camera_ip}, "
-            f"Interface: {CAMERA_INTERFACE} ({interface_status['status']}), "
-            f"Link: {link_status['speed']} {link_status['duplex']}, "
-            f"Active ports: {', '.join(map(str, active_ports)) if active_ports else 'none'}"
-        )
+    if camera.probe == "service":
+        # RTSP/HTTP answers over kept-alive connections, with latency
+        service = await service_prober.probe(camera, camera_ip)
+        active_ports = service["active_ports"]
+        result["services"] = service["services"]
+        result["latency"] = service["latency"]
+    else:
+        active_ports = await probe_ports(camera_ip, camera.ports)
+    is_active = len(active_ports) > 0
+    status_info = (
+        f"IP: {camera_ip}, "
+        f"Interface: {camera.interface} ({interface_status['status']}), "
+        f"Link: {link_status['speed']} {link_status['duplex']}, "
+        f"Active ports: {', '.join(map(str, active_ports)) if active_ports else 'none'}"
+    )
+    if result.get("latency", {}).get("count"):
+        status_info += f", Latency p50/p99: {result['latency']['p50_ms']}/{result['latency']['p99_ms']} ms"
+    return {
+        **result,
+        "ip": camera_ip,
+        "connected": True,
+        "active": is_active,
+        "active_ports": active_ports,
+        "status": "Active" if is_active else "Connected but not responding",
+        "device": {
+            "device": f"Camera {camera.mac}",
+            "active": is_active,
+            "info": status_info
+        }
+    }
+
+def summarize(cameras: list[dict]) -> str:
+    """One status line for the whole fleet."""
+    if len(cameras) == 1:
+        return cameras[0]["status"]
+    if not cameras:
+        return "No cameras configured"
+    active = sum(1 for camera in cameras if camera["active"])
+    if active == len(cameras):
+        return "Active"
+    if not any(camera["connected"] for camera in cameras):
+        return "No cameras connected"
+    return f"{active} of {len(cameras)} cameras active"
+
+async def check_camera_status(registry=camera_registry):
+    """Check every registered camera; all of them are probed at once."""
+    try:
+        logger.debug("Checking camera status", cameras=len(registry))
+
+        # Shared inputs are read once per check, not once per camera
+        if any(camera_discovery.lookup(camera.mac) is None for camera in registry):
+            camera_discovery.observe_arp_table(read_arp_table())
+        interfaces = {camera.interface for camera in registry}
+        interface_status = {name: check_interface_status(name) for name in interfaces}
+        link_status = {name: check_link_status(name) for name in interfaces}
+
+        limit = asyncio.Semaphore(MAX_PARALLEL_PROBES)
+
+        async def bounded(camera):
+            async with limit:
+                return await probe_camera(
+                    camera, interface_status[camera.interface], link_status[camera.interface]
+                )
+
+        cameras = await asyncio.gather(*(bounded(camera) for camera in registry))
+        if any(camera["ip"] is None and camera["connected"] for camera in cameras):
+            # Link is up but the camera hasn't been heard from: go and look for it
+            camera_discovery.request()
 
         return {
-            "connected": True,
-            "status": "Active" if is_active else "Connected but not responding",
-            "devices": [{
-                "device": f"Camera {CAMERA_MAC}",
-                "active": is_active,
-                "info": status_info
-            }]
+            "connected": any(camera["connected"] for camera in cameras),
+            "status": summarize(cameras),
+            "devices": [camera.pop("device") for camera in cameras],
+            "cameras": cameras,
         }
-        
+
     except Exception as e:
         print(f"Error in check_camera_status: {str(e)}")
         raise HTTPException(
             status_code=500,
             detail=f"Failed to check camera status: {str(e)}"
-        )
\ No newline at end of file
+        )
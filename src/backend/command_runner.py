@@ -0,0 +1,168 @@
+"""Async subprocess runner shared by the backend's shell-outs.
+
+Every call goes through one bounded pool so a hung ``nmcli`` or ``amixer``
+can never stall the event loop (and with it the voice relay).
+"""
+import asyncio
+import subprocess
+import time
+
+# Runner configuration
+DEFAULT_TIMEOUT = 10.0  # Seconds before a command is killed
+MAX_CONCURRENT_COMMANDS = 8  # Processes allowed to run at the same time
+
+
+class CommandResult:
+    """Structured outcome of a single command."""
+
+    def __init__(self, args, returncode, stdout="", stderr="", duration=0.0, timed_out=False):
+        self.args = list(args)
+        self.returncode = returncode
+        self.stdout = stdout
+        self.stderr = stderr
+        self.duration = duration
+        self.timed_out = timed_out
+
+    @property
+    def ok(self) -> bool:
+        return self.returncode == 0 and not self.timed_out
+
+    def check_returncode(self):
+        """Raise the same errors ``subprocess.run(check=True)`` would."""
+        if self.timed_out:
+            raise subprocess.TimeoutExpired(self.args, self.duration, self.stdout, self.stderr)
+        if self.returncode != 0:
+            raise subprocess.CalledProcessError(self.returncode, self.args, self.stdout, self.stderr)
+        return self
+
+    def to_dict(self) -> dict:
+        return {
+            "args": self.args,
+            "returncode": self.returncode,
+            "stdout": self.stdout,
+            "stderr": self.stderr,
+            "duration": round(self.duration, 4),
+            "timed_out": self.timed_out,
+        }
+
+    def __repr__(self):
+        return (
+            f"CommandResult(args={self.args!r}, returncode={self.returncode!r}, "
+            f"timed_out={self.timed_out!r}, duration={self.duration:.3f})"
+        )
+
+
+class CommandRunner:
+    """Run commands as asyncio subprocesses with timeouts and a concurrency cap."""
+
+    def __init__(self, max_concurrency: int = MAX_CONCURRENT_COMMANDS, default_timeout: float = DEFAULT_TIMEOUT):
+        self.max_concurrency = max_concurrency
+        self.default_timeout = default_timeout
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self.running = 0
+        self.waiting = 0
+        self.total = 0
+        self.failures = 0
+        self.timeouts = 0
+        self.cancelled = 0
+
+    async def run(self, cmd, timeout: float | None = None, check: bool = False, input: str | None = None) -> CommandResult:
+        """Run ``cmd`` and return a :class:`CommandResult`.
+
+        A command that outlives ``timeout`` is killed and reported with
+        ``timed_out=True``. Cancelling the awaiting task kills the process too.
+        With ``check=True`` failures raise like ``subprocess.run`` does.
+        """
+        timeout = self.default_timeout if timeout is None else timeout
+        self.waiting += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.waiting -= 1
+
+        self.running += 1
+        self.total += 1
+        started = time.monotonic()
+        try:
+            result = await self._execute(cmd, timeout, input, started)
+        finally:
+            self.running -= 1
+            self._semaphore.release()
+
+        if result.timed_out:
+            self.timeouts += 1
+            print(f"Command timed out after {timeout}s: {' '.join(result.args)}")
+        elif result.returncode != 0:
+            self.failures += 1
+
+        if check:
+            result.check_returncode()
+        return result
+
+    async def run_sudo(self, cmd, **kwargs) -> CommandResult:
+        """Run ``cmd`` through non-interactive sudo."""
+        return await self.run(["sudo", "-n"] + list(cmd), **kwargs)
+
+    async def _execute(self, cmd, timeout, input, started) -> CommandResult:
+        try:
+            process = await asyncio.create_subprocess_exec(
+                *cmd,
+                stdin=subprocess.PIPE if input is not None else subprocess.DEVNULL,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.PIPE,
+            )
+        except (FileNotFoundError, PermissionError) as e:
+            return CommandResult(cmd, 127, "", str(e), time.monotonic() - started)
+
+        try:
+            stdout, stderr = await asyncio.wait_for(
+                process.communicate(input.encode() if input is not None else None),
+                timeout=timeout,
+            )
+        except asyncio.TimeoutError:
+            await self._kill(process)
+            return CommandResult(cmd, None, "", "", time.monotonic() - started, timed_out=True)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            await self._kill(process)
+            raise
+
+        return CommandResult(
+            cmd,
+            process.returncode,
+            stdout.decode(errors="replace"),
+            stderr.decode(errors="replace"),
+            time.monotonic() - started,
+        )
+
+    @staticmethod
+    async def _kill(process):
+        if process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+        try:
+            await process.wait()
+        except Exception:
+            pass
+
+    def stats(self) -> dict:
+        return {
+            "max_concurrency": self.max_concurrency,
+            "running": self.running,
+            "waiting": self.waiting,
+            "total": self.total,
+            "failures": self.failures,
+            "timeouts": self.timeouts,
+            "cancelled": self.cancelled,
+        }
+
+
+# Global instance
+command_runner = CommandRunner()
+
+
+async def run_command(cmd, timeout: float | None = None, check: bool = False, input: str | None = None) -> CommandResult:
+    """Run ``cmd`` on the shared runner."""
+    return await command_runner.run(cmd, timeout=timeout, check=check, input=input)
@@ -5,9 +5,9 @@ import subprocess
 import asyncio
 import time
 import os
-import re
-import shutil
 import sys
+import re
+from urllib.parse import parse_qs
 from contextlib import asynccontextmanager
 # import screen_brightness_control as sbc
 # import alsaaudio
@@ -23,13 +23,40 @@ sys.path.insert(0, BASE_DIR)
 
 # Import local modules after path setup
 from camera_status import check_camera_status
+from camera_registry import camera_registry
+from camera_monitor import CameraMonitor
+from camera_probe import service_prober
+from camera_discovery import camera_discovery
+from thermal_sampler import thermal_sampler
+from telemetry import telemetry_sampler, TelemetryStream
+from timeseries_store import TimeSeriesStore, RECORD_INTERVAL
+from voice_relay import VoiceRelay, frame_payload, DEFAULT_TALKGROUP
+from structured_log import logger
+from command_runner import command_runner, run_command
+from audio_control import audio_control
+from value_queue import CoalescingWriter
+from backlight import backlight
+from nm_dbus import nm_dbus, NetworkBackendError, NetworkBackendUnavailable
+from wifi_watcher import wifi_watcher
+from snapshot_cache import SingleFlightCache
+from network_supervisor import NetworkSupervisor, HARD_BLOCKED, NM_NOT_RESPONDING, NM_NOT_RUNNING
 # Don't import voice_chat as separate app, we'll integrate it directly
 
 # Context manager for lifespan events
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     # Startup
+    await audio_control.detect()
+    backlight.detect()
+    thermal_sampler.start()
+    telemetry_sampler.start()
+    history_store.open()
+    history_task = asyncio.create_task(record_history())
     print("Starting WiFi monitoring task...")
+    wifi_watcher.start()
+    network_supervisor.start()
+    camera_discovery.start(camera_registry.interfaces)
+    camera_monitor.start()
     monitor_task = asyncio.create_task(monitor_wifi_status())
     yield
     # Shutdown
@@ -39,6 +66,20 @@ async def lifespan(app: FastAPI):
         await monitor_task
     except asyncio.CancelledError:
         pass
+    await wifi_watcher.stop()
+    await network_supervisor.stop()
+    await camera_monitor.stop()
+    await camera_discovery.stop()
+    await thermal_sampler.stop()
+    await telemetry_sampler.stop()
+    history_task.cancel()
+    try:
+        await history_task
+    except asyncio.CancelledError:
+        pass
+    history_store.close()
+    await voice_relay.close()
+    service_prober.close()
 
 # --------------------------
 # Setup: Socket.IO + FastAPI
@@ -86,194 +127,36 @@ class VolumeRequest(BaseModel):
 # Audio
 # --------------------------
 
-def get_mixer():
-    """Try to return an ALSA mixer object if python-alsaaudio is available.
-    Raises ImportError if module is missing so callers can fallback.
-    """
-    import alsaaudio  # may raise ImportError
-    try:
-        return alsaaudio.Mixer('PCM', cardindex=0)
-    except Exception:
-        try:
-            return alsaaudio.Mixer('Master', cardindex=0)
-        except Exception:
-            mixers = alsaaudio.mixers()
-            if mixers:
-                return alsaaudio.Mixer(mixers[0])
-            raise Exception("No audio mixers found")
-
-
-def amixer_try_controls() -> list[str]:
-    return [
-        "PCM",
-        "Master",
-        "Speaker",
-        "Headphone",
-        "Digital",
-    ]
-
-
-def amixer_get_volume() -> tuple[int | None, str | None]:
-    """Return (volume_percent, control_used) using amixer if available."""
-    if shutil.which("amixer") is None:
-        return (None, None)
-    percent_re = re.compile(r"(\d+)%")
-    for control in amixer_try_controls():
-        try:
-            result = subprocess.run(
-                ["amixer", "get", control],
-                capture_output=True,
-                text=True,
-            )
-            if result.returncode == 0:
-                match = percent_re.search(result.stdout)
-                if match:
-                    return (int(match.group(1)), control)
-        except Exception:
-            continue
-    return (None, None)
-
-
-def amixer_set_volume(level: int) -> bool:
-    if shutil.which("amixer") is None:
-        return False
-    for control in amixer_try_controls():
-        try:
-            result = subprocess.run(
-                ["amixer", "set", control, f"{level}%"],
-                capture_output=True,
-                text=True,
-            )
-            if result.returncode == 0:
-                return True
-        except Exception:
-            continue
-    return False
-
-
-def pactl_get_volume() -> tuple[int | None, str | None]:
-    if shutil.which("pactl") is None:
-        return (None, None)
-    try:
-        result = subprocess.run(
-            ["pactl", "get-sink-volume", "@DEFAULT_SINK@"],
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode == 0:
-            # Example: Volume: front-left: 32768 /  50% / -18.06 dB, ...
-            m = re.search(r"(\d+)%", result.stdout)
-            if m:
-                return (int(m.group(1)), "pactl")
-    except Exception:
-        pass
-    return (None, None)
-
-
-def pactl_set_volume(level: int) -> bool:
-    if shutil.which("pactl") is None:
-        return False
-    try:
-        result = subprocess.run(
-            ["pactl", "set-sink-volume", "@DEFAULT_SINK@", f"{level}%"],
-            capture_output=True,
-            text=True,
-        )
-        return result.returncode == 0
-    except Exception:
-        return False
-
-
-def wpctl_get_volume() -> tuple[int | None, str | None]:
-    if shutil.which("wpctl") is None:
-        return (None, None)
-    try:
-        # wpctl get-volume @DEFAULT_AUDIO_SINK@
-        result = subprocess.run(
-            ["wpctl", "get-volume", "@DEFAULT_AUDIO_SINK@"],
-            capture_output=True,
-            text=True,
-        )
-        if result.returncode == 0:
-            # Output like: Volume: 0.50 [50%]
-            m = re.search(r"(\d+)%", result.stdout)
-            if m:
-                return (int(m.group(1)), "wpctl")
-    except Exception:
-        pass
-    return (None, None)
-
-
-def wpctl_set_volume(level: int) -> bool:
-    if shutil.which("wpctl") is None:
-        return False
-    try:
-        # wpctl set-volume @DEFAULT_AUDIO_SINK@ 0.50
-        vol_float = max(0.0, min(1.0, level / 100.0))
-        result = subprocess.run(
-            ["wpctl", "set-volume", "@DEFAULT_AUDIO_SINK@", str(vol_float)],
-            capture_output=True,
-            text=True,
-        )
-        return result.returncode == 0
-    except Exception:
-        return False
-
 @fastapi_app.get("/volume")
 async def get_volume():
     try:
-        # Prefer userland tools that exist in most desktops first
-        vol, control = pactl_get_volume()
-        if vol is None:
-            vol, control = wpctl_get_volume()
-        if vol is None:
-            vol, control = amixer_get_volume()
-        if vol is not None:
-            return {
-                "volume": int(vol),
-                "mixer": control or "system",
-                "card": "system",
-            }
-
-        # Last resort: python-alsaaudio if present
-        try:
-            mixer = get_mixer()
-            try:
-                volumes = mixer.getvolume()
-            except AttributeError:
-                volumes = [mixer.getvol()[0]]
-            mixer_name = getattr(mixer, "mixer", lambda: "unknown")()
-            card_name = getattr(mixer, "cardname", lambda: "unknown")()
-            return {
-                "volume": int(volumes[0]),
-                "mixer": mixer_name,
-                "card": card_name,
-            }
-        except ImportError:
-            raise Exception("No audio control available (pactl/wpctl/amixer/alsaaudio missing)")
+        return await audio_control.get_volume()
     except Exception as e:
         return {"error": str(e), "volume": 50}
 
+async def confirm_volume(volume, result):
+    if result["success"]:
+        await sio.emit('volume_change', {"volume": volume})
+
+# Slider bursts collapse to the latest value
+volume_writer = CoalescingWriter("volume", audio_control.set_volume, on_applied=confirm_volume)
+
 @fastapi_app.post("/volume")
 async def set_volume(request: VolumeRequest):
     try:
         volume = max(0, min(100, request.volume))
-        # Prefer pactl/wpctl/amixer first
-        if pactl_set_volume(volume) or wpctl_set_volume(volume) or amixer_set_volume(volume):
-            return {"success": True, "volume": volume}
-        # Last resort: python-alsaaudio if installed
-        try:
-            mixer = get_mixer()
-            try:
-                mixer.setvolume(volume)
-            except AttributeError:
-                mixer.setvol(volume)
-            return {"success": True, "volume": volume}
-        except ImportError:
-            return {"success": False, "error": "No system volume tool available (pactl/wpctl/amixer/alsaaudio)"}
+        result = await volume_writer.submit(volume)
+        if result["success"]:
+            return {"success": True, "volume": result["value"], "superseded": result["superseded"]}
+        return {"success": False, "error": result["error"]}
     except Exception as e:
         return {"success": False, "error": str(e)}
 
+@fastapi_app.get("/volume/backend")
+async def volume_backend():
+    """Which audio control backend is in use and how often it was re-detected."""
+    return audio_control.stats()
+
 # --------------------------
 # Voice Chat
 # --------------------------
@@ -282,87 +165,92 @@ async def set_volume(request: VolumeRequest):
 # Brightness
 # --------------------------
 
+async def confirm_brightness(level, result):
+    if result["success"]:
+        await sio.emit('brightness_change', {"brightness": level})
+
+brightness_writer = CoalescingWriter("brightness", backlight.set_percent, on_applied=confirm_brightness)
+
 @fastapi_app.post("/display/brightness/{level}")
-def set_brightness(level: int):
+async def set_brightness(level: int):
     try:
         if not 0 <= level <= 100:
             return {"error": "Brightness must be 0-100"}
         
-        # Try to import and use screen_brightness_control
-        try:
-            import screen_brightness_control as sbc
-            sbc.set_brightness(level)
-            return {"status": "success", "brightness": level}
-        except ImportError:
-            # Fallback: brightnessctl if available
-            if shutil.which("brightnessctl"):
-                result = subprocess.run([
-                    "brightnessctl", "set", f"{level}%"
-                ], capture_output=True, text=True)
-                if result.returncode == 0:
-                    return {"status": "success", "brightness": level}
-                return {"status": "failed", "error": result.stderr or "brightnessctl failed"}
-            return {"status": "failed", "error": "screen_brightness_control and brightnessctl not available"}
+        result = await brightness_writer.submit(level)
+        if result["success"]:
+            return {"status": "success", "brightness": result["value"], "superseded": result["superseded"]}
+        return {"status": "failed", "error": result["error"]}
     except Exception as e:
         return {"status": "failed", "error": str(e)}
 
 @fastapi_app.get("/display/brightness")
-def get_brightness():
+async def get_brightness():
     try:
-        # Try to import and use screen_brightness_control
-        try:
-            import screen_brightness_control as sbc
-            current = sbc.get_brightness(display=0)[0]
-            return {"brightness": current}
-        except ImportError:
-            # Fallback: brightnessctl if available
-            if shutil.which("brightnessctl"):
-                result = subprocess.run(["brightnessctl", "get"], capture_output=True, text=True)
-                if result.returncode == 0:
-                    # brightnessctl outputs current value and requires max to compute percent
-                    cur = int(result.stdout.strip() or 0)
-                    max_res = subprocess.run(["brightnessctl", "max"], capture_output=True, text=True)
-                    max_v = int(max_res.stdout.strip() or 1)
-                    percent = int(round(cur * 100 / max_v))
-                    return {"brightness": percent}
-            return {"brightness": 50, "error": "screen_brightness_control/brightnessctl not available"}
+        return {"brightness": await backlight.get_percent()}
+    except LookupError as e:
+        return {"brightness": 50, "error": str(e)}
     except Exception as e:
         return {"status": "failed", "error": str(e)}
 
+@fastapi_app.get("/display/backlight")
+async def backlight_status():
+    """Which backlight device is driven directly through sysfs."""
+    return backlight.stats()
+
 # --------------------------
 # System Monitoring
 # --------------------------
 
+async def emit_camera_change(status):
+    await sio.emit('camera_state_change', status)
+
+camera_monitor = CameraMonitor(check_camera_status, camera_registry.interfaces, on_change=emit_camera_change)
+
+async def camera_discovered(macs):
+    camera_monitor.poke()
+
+camera_discovery.on_update = camera_discovered
+
 @fastapi_app.get("/system/camera")
 async def camera_status():
-    """Get the status of connected cameras."""
-    return check_camera_status()
+    """Get the status of every registered camera (served from the background monitor)."""
+    return await camera_monitor.get()
+
+@fastapi_app.get("/system/cameras")
+async def registered_cameras():
+    """Cameras from the registry config."""
+    return camera_registry.to_dict()
+
+@fastapi_app.get("/system/camera/discovery")
+async def camera_discovery_status():
+    """MAC -> IP bindings found by ARP sweeps and ONVIF WS-Discovery."""
+    return camera_discovery.stats()
+
+@fastapi_app.post("/system/camera/discover")
+async def discover_cameras():
+    """Sweep the camera interfaces now and return what changed."""
+    changed = await camera_discovery.discover()
+    return {"changed": sorted(changed), **camera_discovery.stats()}
+
+@fastapi_app.get("/system/camera/monitor")
+async def camera_monitor_status():
+    """Probe schedule, link events seen, cache hit rate and service probe latency."""
+    return {**camera_monitor.stats(), "service_probes": service_prober.stats()}
 
 def get_temperatures():
     try:
-        # We know exact zones for Jetson:
-        # thermal_zone0 is cpu-thermal
-        # thermal_zone1 is gpu-thermal
-        cpu_temp = None
-        gpu_temp = None
-        
-        # Read CPU temperature (thermal_zone0)
-        try:
-            with open('/sys/class/thermal/thermal_zone0/temp', 'r') as f:
-                cpu_temp = round(int(f.read().strip()) / 1000.0, 1)
-        except Exception as e:
-            print(f"Error reading CPU temperature: {e}")
-            
-        # Read GPU temperature (thermal_zone1)
-        try:
-            with open('/sys/class/thermal/thermal_zone1/temp', 'r') as f:
-                gpu_temp = round(int(f.read().strip()) / 1000.0, 1)
-        except Exception as e:
-            print(f"Error reading GPU temperature: {e}")
-                
+        # Latest sample from the thermal sampler; zones are found by their type
+        sample = thermal_sampler.latest()
+        if sample is None:
+            return None
+        cpu_temp = sample.get("cpu")
+        gpu_temp = sample.get("gpu")
         return {
             "cpu": cpu_temp if cpu_temp is not None else 0.0,
-            "gpu": gpu_temp if gpu_temp is not None else 0.0
+            "gpu": gpu_temp if gpu_temp is not None else 0.0,
+            "zones": sample["zones"],
+            "timestamp": sample["timestamp"]
         }
     except Exception as e:
         print(f"Error reading temperatures: {e}")
@@ -375,6 +263,93 @@ async def system_temperature():
         raise HTTPException(status_code=500, detail="Could not read system temperatures")
     return temps
 
+@fastapi_app.get("/system/temperature/history")
+async def temperature_history(seconds: float = 600, points: int = 120):
+    """Temperature history per zone, averaged down to at most ``points`` samples."""
+    if seconds <= 0 or not 1 <= points <= 3600:
+        raise HTTPException(status_code=400, detail="seconds must be positive and points 1-3600")
+    return thermal_sampler.history(seconds, points)
+
+async def emit_telemetry(payload, sid):
+    await sio.emit('telemetry', payload, to=sid)
+
+telemetry_stream = TelemetryStream(telemetry_sampler, emit_telemetry)
+
+@fastapi_app.get("/system/telemetry")
+async def system_telemetry():
+    """Latest CPU, memory, network and GPU sample, plus sampler cost."""
+    return {
+        "latest": telemetry_sampler.latest(),
+        "sampler": telemetry_sampler.stats(),
+        "stream": telemetry_stream.stats()
+    }
+
+@sio.event
+async def telemetry_subscribe(sid, data=None):
+    """Start streaming 'telemetry' to this client every ``data["interval"]`` seconds."""
+    interval = telemetry_stream.subscribe(sid, data.get("interval") if isinstance(data, dict) else None)
+    print(f"Telemetry subscriber {sid} every {interval}s")
+    return {"interval": interval, "columns": telemetry_sampler.columns}
+
+@sio.event
+async def telemetry_unsubscribe(sid, data=None):
+    telemetry_stream.unsubscribe(sid)
+
+# History of what the status endpoints report, kept on disk
+HISTORY_FIELDS = ["cpu_temp", "gpu_temp", "wifi_connected", "wifi_signal", "camera_connected", "camera_active"]
+history_store = TimeSeriesStore(HISTORY_FIELDS)
+
+def history_sample() -> dict:
+    """Current values from the samplers and caches; never probes anything itself."""
+    values = {}
+    temps = get_temperatures()
+    if temps:
+        values["cpu_temp"] = temps.get("cpu")
+        values["gpu_temp"] = temps.get("gpu")
+    wifi = wifi_snapshot.peek()
+    if wifi:
+        connection = wifi["connection"]
+        values["wifi_connected"] = 1 if connection.get("connected") else 0
+        values["wifi_signal"] = connection.get("signal")
+    camera = camera_monitor.cache.peek()
+    if camera:
+        values["camera_connected"] = 1 if camera.get("connected") else 0
+        values["camera_active"] = sum(1 for device in camera.get("devices", []) if device.get("active"))
+    return values
+
+async def record_history():
+    loop = asyncio.get_running_loop()
+    next_at = loop.time()
+    while True:
+        try:
+            history_store.record(time.time(), history_sample())
+        except Exception as e:
+            print(f"Error recording history: {e}")
+        next_at = max(next_at + RECORD_INTERVAL, loop.time())
+        await asyncio.sleep(next_at - loop.time())
+
+@fastapi_app.get("/system/history")
+async def system_history(seconds: float = 3600, start: float | None = None, end: float | None = None,
+                         fields: str | None = None, resolution: str | None = None):
+    """Recorded temperature, Wi-Fi and camera values between ``start`` and ``end``.
+
+    Without ``start`` the last ``seconds`` are returned. ``resolution`` is
+    1s, 1m or 1h; by default the finest one with at most 2000 points.
+    """
+    end = end if end is not None else time.time()
+    start = start if start is not None else end - seconds
+    if start >= end:
+        raise HTTPException(status_code=400, detail="start must be before end")
+    try:
+        return history_store.query(start, end, fields.split(",") if fields else None, resolution)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+@fastapi_app.get("/system/history/stats")
+async def system_history_stats():
+    """Records held and disk used per tier."""
+    return history_store.stats()
+
 # --------------------------
 # Wi-Fi
 # --------------------------
@@ -384,30 +359,92 @@ class WifiConnectRequest(BaseModel):
     password: str | None = None
     rememberNetwork: bool = True
 
+# Timeouts for NetworkManager tooling (seconds)
+NMCLI_TIMEOUT = 10.0
+WIFI_CONNECT_TIMEOUT = 45.0
+WIFI_SNAPSHOT_TTL = 2.0  # Seconds a WiFi state snapshot is served from cache
+
+# Last reason the D-Bus backend was skipped, so the fallback is logged once
+dbus_fallback_reason = None
+
+def note_dbus_fallback(err):
+    global dbus_fallback_reason
+    if str(err) != dbus_fallback_reason:
+        dbus_fallback_reason = str(err)
+        print(f"NetworkManager D-Bus backend unavailable, falling back to nmcli: {err}")
+
+async def dbus_wifi_state():
+    """Read Wi-Fi state from NetworkManager over D-Bus, or None to use nmcli."""
+    try:
+        state = await nm_dbus.wifi_state()
+    except (NetworkBackendUnavailable, NetworkBackendError) as e:
+        note_dbus_fallback(e)
+        return None
+    global dbus_fallback_reason
+    dbus_fallback_reason = None
+    return state
+
+def connection_from_dbus_state(state):
+    """Shape a D-Bus Wi-Fi state the same way the nmcli path does."""
+    if state["connected"]:
+        return {
+            "connected": True,
+            "ssid": state["ssid"],
+            "signal": state["signal"],
+            "security": state["security"] or "--",
+            "device": state["device"],
+            "state": "activated"
+        }
+    if state["device_state"] == "disconnected":
+        return {
+            "connected": False,
+            "ssid": None,
+            "status": "disconnected",
+            "device": state["device"]
+        }
+    return {"connected": False, "ssid": None}
+
 @fastapi_app.get("/wifi/scan")
-def wifi_scan():
+async def wifi_scan():
     try:
         # Check WiFi status first
-        status = wifi_status()
+        status = await wifi_status()
         if status["status"] == "off":
             return {"networks": [], "status": "off"}
 
+        try:
+            access_points = await nm_dbus.access_points()
+            known_connections = set(await nm_dbus.saved_connections())
+            current = await current_wifi()
+            networks = []
+            for ap in access_points:
+                network = {
+                    "ssid": ap["ssid"],
+                    "security": ap["security"],
+                    "known": ap["ssid"] in known_connections
+                }
+                if current.get("connected") and current.get("ssid") == ap["ssid"]:
+                    network["connected"] = True
+                networks.append(network)
+            return {"networks": networks, "status": "on"}
+        except (NetworkBackendUnavailable, NetworkBackendError) as e:
+            note_dbus_fallback(e)
+
         # Get network info including security
-        result = subprocess.run(
+        result = await run_command(
             ["nmcli", "-t", "-f", "SSID,SECURITY", "dev", "wifi", "list"],
-            capture_output=True,
-            text=True,
+            timeout=NMCLI_TIMEOUT,
             check=True
         )
         
         networks = []
-        current = current_wifi()
+        current = await current_wifi()
         # Get list of known/saved connections
         known_connections = set()
         try:
-            known_result = subprocess.run([
+            known_result = await run_command([
                 "nmcli", "-t", "-f", "NAME,TYPE", "connection", "show"
-            ], capture_output=True, text=True, check=True)
+            ], timeout=NMCLI_TIMEOUT, check=True)
             for line in known_result.stdout.strip().split('\n'):
                 if line:
                     name, typ = line.split(":", 1)
@@ -437,72 +474,33 @@ def wifi_scan():
         raise HTTPException(status_code=500, detail=str(e))
 
 # Helper function to run commands with sudo (no password required)
-def run_sudo_command(cmd):
+async def run_sudo_command(cmd, timeout=NMCLI_TIMEOUT):
     try:
-        sudo_cmd = ["sudo", "-n"] + cmd  # -n flag for non-interactive mode
-        process = subprocess.run(
-            sudo_cmd,
-            capture_output=True,
-            text=True,
-            check=True
-        )
-        return process.stdout
+        result = await command_runner.run_sudo(cmd, timeout=timeout, check=True)  # -n flag for non-interactive mode
+        return result.stdout
     except Exception as e:
         print(f"Failed to run sudo command: {e}")
         raise
 
-def ensure_network_manager():
-    """Ensure NetworkManager is running and responding"""
+async def read_current_wifi(wifi_state, dbus_state):
+    """Query the active WiFi connection, given an already-read radio status."""
     try:
-        # Check if NetworkManager is running
-        nm_status = subprocess.run(
-            ["systemctl", "is-active", "NetworkManager"],
-            capture_output=True,
-            text=True
-        )
-        
-        if nm_status.stdout.strip() != "active":
-            print("NetworkManager is not running, attempting to start...")
-            subprocess.run(["sudo", "systemctl", "start", "NetworkManager"], check=True)
-            time.sleep(2)  # Give it time to start
-            
-        # Verify NetworkManager is responding
-        test_cmd = subprocess.run(
-            ["nmcli", "general", "status"],
-            capture_output=True,
-            text=True
-        )
-        
-        if test_cmd.returncode != 0:
-            print("NetworkManager not responding, attempting to restart...")
-            subprocess.run(["sudo", "systemctl", "restart", "NetworkManager"], check=True)
-            time.sleep(3)  # Give it time to restart
-            
-        return True
-    except Exception as e:
-        print(f"Failed to ensure NetworkManager is running: {e}")
-        return False
-
-@fastapi_app.get("/wifi/connection")
-def current_wifi():
-    try:
-        # First ensure NetworkManager is running
-        if not ensure_network_manager():
+        if wifi_state.get("reason") in (NM_NOT_RUNNING, NM_NOT_RESPONDING):
             return {"connected": False, "ssid": None, "signal": None, "error": "NetworkManager not available"}
         
-        # Get current WiFi status
-        wifi_state = wifi_status()
         if wifi_state["status"] != "on":
             return {"connected": False, "ssid": None, "signal": None, "status": wifi_state["status"]}
         
+        if dbus_state is not None:
+            return connection_from_dbus_state(dbus_state)
+        
         # Get all active connections with detailed info
-        connection_result = subprocess.run(
+        connection_result = await run_command(
             ["nmcli", "-t", "-f", "TYPE,NAME,DEVICE,STATE", "connection", "show", "--active"],
-            capture_output=True,
-            text=True
+            timeout=NMCLI_TIMEOUT
         )
         
-        if connection_result.returncode != 0:
+        if not connection_result.ok:
             print("Error getting active connections:", connection_result.stderr)
             return {"connected": False, "ssid": None, "signal": None, "error": "Failed to get connections"}
         
@@ -528,13 +526,9 @@ def current_wifi():
         if not wifi_connection:
             # No active WiFi connection found
             # Check if WiFi is enabled but not connected
-            device_status = subprocess.run(
-                ["nmcli", "device", "status"],
-                capture_output=True,
-                text=True
-            )
+            device_status = await run_command(["nmcli", "device", "status"], timeout=NMCLI_TIMEOUT)
             
-            if device_status.returncode == 0:
+            if device_status.ok:
                 for line in device_status.stdout.split('\n'):
                     if 'wifi' in line.lower():
                         status_parts = line.split()
@@ -550,13 +544,12 @@ def current_wifi():
             return {"connected": False, "ssid": None}
         
         # Get detailed info about the current connection
-        detail_result = subprocess.run(
+        detail_result = await run_command(
             ["nmcli", "-t", "-f", "SSID,SIGNAL,SECURITY", "device", "wifi", "list"],
-            capture_output=True,
-            text=True
+            timeout=NMCLI_TIMEOUT
         )
         
-        if detail_result.returncode == 0:
+        if detail_result.ok:
             current_details = None
             for line in detail_result.stdout.strip().split('\n'):
                 fields = line.strip().split(':')
@@ -564,6 +557,7 @@ def current_wifi():
                     current_details = {
                         "connected": True,
                         "ssid": fields[0],
+                        "signal": int(fields[1]) if fields[1].isdigit() else None,
                         "security": fields[2] if len(fields) > 2 else "--",
                         "device": wifi_device,
                         "state": connection_state
@@ -589,111 +583,94 @@ def current_wifi():
             "error": str(e)
         }
 
-@fastapi_app.get("/wifi/status")
-def wifi_status():
+async def read_wifi_status(dbus_state):
+    """Report the WiFi radio status without changing anything.
+
+    Repairs (starting NetworkManager, unblocking rfkill, enabling the
+    radio) are left to the network supervisor.
+    """
     try:
-        # First check if NetworkManager is running
-        nm_status = subprocess.run(
-            ["systemctl", "is-active", "NetworkManager"],
-            capture_output=True,
-            text=True
-        )
+        # Fast path: read NetworkManager's properties over D-Bus
+        if dbus_state is not None:
+            if not dbus_state["running"]:
+                return {"status": "error", "reason": NM_NOT_RUNNING}
+            if not dbus_state["hardware"]:
+                return {"status": "off", "reason": HARD_BLOCKED}
+            return {"status": "on" if dbus_state["radio"] else "off"}
         
+        # First check if NetworkManager is running
+        nm_status = await run_command(["systemctl", "is-active", "NetworkManager"], timeout=NMCLI_TIMEOUT)
         if nm_status.stdout.strip() != "active":
-            print("NetworkManager is not running, attempting to start...")
-            try:
-                run_sudo_command(["systemctl", "start", "NetworkManager"])
-                time.sleep(2)  # Give it time to start
-            except Exception as start_err:
-                print(f"Failed to start NetworkManager: {start_err}")
-                return {"status": "error", "reason": "NetworkManager failed to start"}
-            try:
-                # Try to start NetworkManager
-                subprocess.run(["sudo", "systemctl", "start", "NetworkManager"], check=True)
-                print("Started NetworkManager")
-                # Give it a moment to initialize
-                time.sleep(2)
-            except Exception as nm_err:
-                print(f"Failed to start NetworkManager: {nm_err}")
-                return {"status": "error", "reason": "NetworkManager not running"}
+            return {"status": "error", "reason": NM_NOT_RUNNING}
                 
         # Check if the wifi hardware is blocked
-        rfkill = subprocess.run(
-            ["rfkill", "list", "wifi"],
-            capture_output=True,
-            text=True
-        )
-        
+        rfkill = await run_command(["rfkill", "list", "wifi"], timeout=NMCLI_TIMEOUT)
+        if "Hard blocked: yes" in rfkill.stdout:
+            return {"status": "off", "reason": HARD_BLOCKED}
         if "Soft blocked: yes" in rfkill.stdout:
-            print("WiFi is soft blocked, attempting to unblock...")
-            try:
-                subprocess.run(["rfkill", "unblock", "wifi"], check=True)
-                time.sleep(1)  # Give it a moment
-            except Exception as unblock_err:
-                print(f"Failed to unblock WiFi: {unblock_err}")
-                return {"status": "off", "reason": "blocked"}
+            return {"status": "off", "reason": "blocked"}
             
         # Then check nmcli status
-        result = subprocess.run(
-            ["nmcli", "radio", "wifi"],
-            capture_output=True,
-            text=True
-        )
-        
-        if result.returncode == 0:
+        result = await run_command(["nmcli", "radio", "wifi"], timeout=NMCLI_TIMEOUT)
+        if result.ok:
             status = result.stdout.strip().lower()
-            if status != "enabled":
-                print("WiFi radio is disabled, attempting to enable...")
-                try:
-                    subprocess.run(["nmcli", "radio", "wifi", "on"], check=True)
-                    time.sleep(1)  # Give it a moment
-                    return {"status": "on", "message": "WiFi radio enabled"}
-                except Exception as radio_err:
-                    print(f"Failed to enable WiFi radio: {radio_err}")
-                    
             return {"status": "on" if status == "enabled" else "off"}
             
         # If nmcli command failed, check device status directly
-        dev_status = subprocess.run(
-            ["nmcli", "device", "status"],
-            capture_output=True,
-            text=True
-        )
-        
-        if dev_status.returncode == 0:
-            wifi_found = False
+        dev_status = await run_command(["nmcli", "device", "status"], timeout=NMCLI_TIMEOUT)
+        if dev_status.ok:
             for line in dev_status.stdout.split('\n'):
                 if 'wifi' in line.lower():
-                    wifi_found = True
                     if 'unavailable' in line.lower():
-                        print("WiFi device is unavailable, checking hardware...")
-                        # Try to bring up the WiFi interface
-                        try:
-                            interfaces = subprocess.run(
-                                ["ip", "link", "show"],
-                                capture_output=True,
-                                text=True
-                            )
-                            for iface_line in interfaces.stdout.split('\n'):
-                                if 'wlan' in iface_line.lower() or 'wifi' in iface_line.lower():
-                                    iface_name = iface_line.split(':')[1].strip()
-                                    subprocess.run(["sudo", "ip", "link", "set", iface_name, "up"], check=True)
-                                    time.sleep(2)  # Give interface time to come up
-                                    return {"status": "on", "message": f"Enabled interface {iface_name}"}
-                        except Exception as iface_err:
-                            print(f"Failed to bring up WiFi interface: {iface_err}")
-                    else:
-                        return {"status": "on"}
-                        
-            if not wifi_found:
-                return {"status": "error", "reason": "No WiFi device found"}
+                        return {"status": "off", "reason": "unavailable"}
+                    return {"status": "on"}
+            return {"status": "error", "reason": "No WiFi device found"}
                     
-        return {"status": "off", "reason": "unavailable"}
+        return {"status": "error", "reason": NM_NOT_RESPONDING}
         
     except Exception as e:
         print(f"Error checking WiFi status: {str(e)}")
         return {"status": "error", "reason": str(e)}
 
+async def read_wifi_snapshot():
+    """Read radio status and current connection together, sharing one D-Bus read."""
+    dbus_state = await dbus_wifi_state()
+    status = await read_wifi_status(dbus_state)
+    connection = await read_current_wifi(status, dbus_state)
+    return {"status": status, "connection": connection}
+
+# Every WiFi reader shares one snapshot; mutating endpoints invalidate it
+wifi_snapshot = SingleFlightCache(read_wifi_snapshot, ttl=WIFI_SNAPSHOT_TTL, name="wifi")
+
+@fastapi_app.get("/wifi/status")
+async def wifi_status():
+    return (await wifi_snapshot.get())["status"]
+
+@fastapi_app.get("/wifi/connection")
+async def current_wifi():
+    return (await wifi_snapshot.get())["connection"]
+
+@fastapi_app.get("/wifi/snapshot")
+async def wifi_snapshot_stats():
+    """Hit rate and age of the shared WiFi state snapshot."""
+    return wifi_snapshot.stats()
+
+async def emit_network_repair(event):
+    if len(connected_clients) > 0:
+        await sio.emit('network_repair', event)
+
+# Repairs run in the background instead of inside status reads
+network_supervisor = NetworkSupervisor(
+    read_status=wifi_status,
+    emit=emit_network_repair,
+    on_change=wifi_snapshot.invalidate
+)
+
+@fastapi_app.get("/wifi/supervisor")
+async def wifi_supervisor_status():
+    """Recent self-healing actions and pending retries."""
+    return network_supervisor.stats()
+
 @fastapi_app.post("/wifi/toggle")
 async def toggle_wifi(req: ToggleRequest):
     print(f"Received toggle request with state: {req.state}")
@@ -701,17 +678,19 @@ async def toggle_wifi(req: ToggleRequest):
     if req.state not in ["on", "off"]:
         raise HTTPException(status_code=400, detail="Invalid state. Use 'on' or 'off'")
 
+    # Keep the supervisor from undoing an intentional "off"
+    network_supervisor.set_desired_radio(req.state == "on")
+
     try:
         if req.state == "off":
             # First, disconnect from any active WiFi connections
             try:
-                current = current_wifi()
+                current = await current_wifi()
                 if current.get("connected") and current.get("device"):
                     print(f"Disconnecting from current network on device {current['device']}")
-                    subprocess.run(
+                    await run_command(
                         ["sudo", "nmcli", "device", "disconnect", current["device"]],
-                        capture_output=True,
-                        text=True,
+                        timeout=NMCLI_TIMEOUT,
                         check=True
                     )
             except Exception as e:
@@ -722,25 +701,23 @@ async def toggle_wifi(req: ToggleRequest):
                         # First, use rfkill to block WiFi at hardware level
             print("Blocking WiFi at hardware level...")
             try:
-                run_sudo_command(["rfkill", "block", "wifi"])
+                await run_sudo_command(["rfkill", "block", "wifi"])
                 # Then disable WiFi in NetworkManager
-                run_sudo_command(["nmcli", "radio", "wifi", "off"])
+                await run_sudo_command(["nmcli", "radio", "wifi", "off"])
             except Exception as block_err:
                 print(f"Error blocking WiFi: {block_err}")
                 raise HTTPException(status_code=500, detail=f"Failed to block WiFi: {str(block_err)}")
-            subprocess.run(
+            await run_command(
                 ["sudo", "rfkill", "block", "wifi"],
-                capture_output=True,
-                text=True,
+                timeout=NMCLI_TIMEOUT,
                 check=True
             )
 
             # Then disable in NetworkManager
             print("Disabling NetworkManager WiFi...")
-            subprocess.run(
+            await run_command(
                 ["sudo", "nmcli", "radio", "wifi", "off"],
-                capture_output=True,
-                text=True,
+                timeout=NMCLI_TIMEOUT,
                 check=True
             )
 
@@ -748,23 +725,22 @@ async def toggle_wifi(req: ToggleRequest):
             print("Enabling WiFi...")
             try:
                 # First unblock WiFi at hardware level
-                run_sudo_command(["rfkill", "unblock", "wifi"])
+                await run_sudo_command(["rfkill", "unblock", "wifi"])
                 await asyncio.sleep(1)
                 
                 # Then enable WiFi in NetworkManager
-                run_sudo_command(["nmcli", "radio", "wifi", "on"])
+                await run_sudo_command(["nmcli", "radio", "wifi", "on"])
                 await asyncio.sleep(2)
                 
                 # Ensure WiFi device is managed by NetworkManager
-                run_sudo_command(["nmcli", "device", "set", "wlan0", "managed", "yes"])
+                await run_sudo_command(["nmcli", "device", "set", "wlan0", "managed", "yes"])
             except Exception as enable_err:
                 print(f"Error enabling WiFi: {enable_err}")
                 raise HTTPException(status_code=500, detail=f"Failed to enable WiFi: {str(enable_err)}")
             print("Unblocking WiFi at hardware level...")
-            subprocess.run(
+            await run_command(
                 ["sudo", "rfkill", "unblock", "wifi"],
-                capture_output=True,
-                text=True,
+                timeout=NMCLI_TIMEOUT,
                 check=True
             )
 
@@ -772,10 +748,9 @@ async def toggle_wifi(req: ToggleRequest):
 
             # Then enable in NetworkManager
             print("Enabling WiFi in NetworkManager...")
-            subprocess.run(
+            await run_command(
                 ["sudo", "nmcli", "radio", "wifi", "on"],
-                capture_output=True,
-                text=True,
+                timeout=NMCLI_TIMEOUT,
                 check=True
             )
 
@@ -783,13 +758,14 @@ async def toggle_wifi(req: ToggleRequest):
         
         # Wait for changes to take effect
         await asyncio.sleep(3)
+        wifi_snapshot.invalidate()
         
         # Get the updated status
-        status = wifi_status()
+        status = await wifi_status()
         current = None
         if status["status"] == "on":
             try:
-                current = current_wifi()
+                current = await current_wifi()
             except Exception as e:
                 print(f"Error getting current WiFi status: {e}")
         
@@ -797,10 +773,11 @@ async def toggle_wifi(req: ToggleRequest):
         if req.state == "off" and status["status"] == "on":
             # Try one more time with more aggressive approach
             try:
-                subprocess.run(["sudo", "rfkill", "block", "all"], check=True)
-                subprocess.run(["sudo", "nmcli", "radio", "all", "off"], check=True)
+                await run_command(["sudo", "rfkill", "block", "all"], timeout=NMCLI_TIMEOUT, check=True)
+                await run_command(["sudo", "nmcli", "radio", "all", "off"], timeout=NMCLI_TIMEOUT, check=True)
                 await asyncio.sleep(1)
-                status = wifi_status()
+                wifi_snapshot.invalidate()
+                status = await wifi_status()
             except Exception as e:
                 print(f"Warning: Error during aggressive WiFi disable: {e}")
 
@@ -813,7 +790,7 @@ async def toggle_wifi(req: ToggleRequest):
         
         return {"status": status["status"]}
         
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
         error_msg = f"Failed to toggle WiFi: {str(e)}"
         print(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
@@ -822,79 +799,101 @@ async def toggle_wifi(req: ToggleRequest):
         print(error_msg)
         raise HTTPException(status_code=500, detail=error_msg)
 
+async def nmcli_connect(req: WifiConnectRequest, current: dict):
+    """Connect with nmcli; used when the D-Bus backend is unavailable."""
+    if current["connected"]:
+        # Disconnect from current network first
+        try:
+            await run_command(
+                ["nmcli", "device", "disconnect", current["device"]],
+                timeout=NMCLI_TIMEOUT,
+                check=True
+            )
+            # Wait for disconnection
+            await asyncio.sleep(2)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            print(f"Warning: Failed to disconnect from current network: {str(e)}")
+
+    # Force a rescan of available networks
+    try:
+        await run_command(["nmcli", "device", "wifi", "rescan"], timeout=NMCLI_TIMEOUT, check=True)
+        await asyncio.sleep(1)  # Give time for the scan to complete
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+        print(f"Warning: Failed to rescan networks: {str(e)}")
+
+    # Check if this is a known/saved network (no password required)
+    known_result = await run_command([
+        "nmcli", "-t", "-f", "NAME,TYPE", "connection", "show"
+    ], timeout=NMCLI_TIMEOUT)
+    known_connections = set()
+    for line in known_result.stdout.strip().split('\n'):
+        if line:
+            name, typ = line.split(":", 1)
+            if typ == "802-11-wireless":
+                known_connections.add(name)
+
+    if req.ssid in known_connections:
+        # Just bring up the saved connection, no password needed
+        cmd = ["nmcli", "connection", "up", req.ssid]
+    elif req.password:
+        if req.rememberNetwork:
+            # Save the connection for auto-connect
+            cmd = ["nmcli", "device", "wifi", "connect", req.ssid, 
+                  "password", req.password, 
+                  "private", "yes",  # Save only for this user
+                  "hidden", "no"]
+        else:
+            # Connect without saving
+            cmd = ["nmcli", "--ask", "device", "wifi", "connect", req.ssid,
+                  "password", req.password]
+    else:
+        if req.rememberNetwork:
+            cmd = ["nmcli", "device", "wifi", "connect", req.ssid,
+                  "private", "yes",
+                  "hidden", "no"]
+        else:
+            cmd = ["nmcli", "device", "wifi", "connect", req.ssid]
+
+    result = await run_command(cmd, timeout=WIFI_CONNECT_TIMEOUT)
+    
+    if result.timed_out:
+        raise HTTPException(status_code=504, detail=f"Timed out connecting to {req.ssid}")
+    if result.returncode != 0:
+        raise HTTPException(status_code=400, detail=f"Failed to connect: {result.stderr}")
+
 @fastapi_app.post("/wifi/connect")
 async def connect_wifi(req: WifiConnectRequest):
     try:
         # Check if we're currently connected to a network
-        current = current_wifi()
+        current = await current_wifi()
         if current["connected"]:
             # If we're already connected to the requested network, return early
             if current["ssid"] == req.ssid:
                 return {"status": "connected", "connection": current}
-            
-            # Disconnect from current network first
-            try:
-                disconnect_result = subprocess.run(
-                    ["nmcli", "device", "disconnect", current["device"]],
-                    capture_output=True,
-                    text=True,
-                    check=True
-                )
-                # Wait for disconnection
-                await asyncio.sleep(2)
-            except subprocess.CalledProcessError as e:
-                print(f"Warning: Failed to disconnect from current network: {str(e)}")
 
-        # Force a rescan of available networks
+        # NetworkManager switches the device over itself when activating over D-Bus
         try:
-            subprocess.run(["nmcli", "device", "wifi", "rescan"], check=True)
-            await asyncio.sleep(1)  # Give time for the scan to complete
-        except subprocess.CalledProcessError as e:
-            print(f"Warning: Failed to rescan networks: {str(e)}")
-
-        # Check if this is a known/saved network (no password required)
-        known_result = subprocess.run([
-            "nmcli", "-t", "-f", "NAME,TYPE", "connection", "show"
-        ], capture_output=True, text=True)
-        known_connections = set()
-        for line in known_result.stdout.strip().split('\n'):
-            if line:
-                name, typ = line.split(":", 1)
-                if typ == "802-11-wireless":
-                    known_connections.add(name)
-
-        if req.ssid in known_connections:
-            # Just bring up the saved connection, no password needed
-            cmd = ["nmcli", "connection", "up", req.ssid]
-        elif req.password:
-            if req.rememberNetwork:
-                # Save the connection for auto-connect
-                cmd = ["nmcli", "device", "wifi", "connect", req.ssid, 
-                      "password", req.password, 
-                      "private", "yes",  # Save only for this user
-                      "hidden", "no"]
-            else:
-                # Connect without saving
-                cmd = ["nmcli", "--ask", "device", "wifi", "connect", req.ssid,
-                      "password", req.password]
-        else:
-            if req.rememberNetwork:
-                cmd = ["nmcli", "device", "wifi", "connect", req.ssid,
-                      "private", "yes",
-                      "hidden", "no"]
-            else:
-                cmd = ["nmcli", "device", "wifi", "connect", req.ssid]
-
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        
-        if result.returncode != 0:
-            raise HTTPException(status_code=400, detail=f"Failed to connect: {result.stderr}")
+            # Force a rescan of available networks
+            try:
+                await nm_dbus.request_scan()
+                await asyncio.sleep(1)  # Give time for the scan to complete
+            except NetworkBackendError as e:
+                print(f"Warning: Failed to rescan networks: {str(e)}")
+            await nm_dbus.activate(req.ssid, req.password, req.rememberNetwork)
+        except NetworkBackendUnavailable as e:
+            note_dbus_fallback(e)
+            await nmcli_connect(req, current)
+        except NetworkBackendError as e:
+            raise HTTPException(status_code=400, detail=f"Failed to connect: {e}")
+        finally:
+            wifi_snapshot.invalidate()
             
         # Wait for connection to establish
         await asyncio.sleep(3)
+        wifi_snapshot.invalidate()
         
         # Get current connection status
-        current = current_wifi()
+        current = await current_wifi()
         if current["connected"] and current["ssid"] == req.ssid:
             # Notify all clients about the new connection
             await sio.emit('wifi_state_change', {
@@ -905,20 +904,33 @@ async def connect_wifi(req: WifiConnectRequest):
         else:
             raise HTTPException(status_code=400, detail="Connection failed to establish")
             
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
         raise HTTPException(status_code=500, detail=f"Connection failed: {str(e)}")
+
+async def disconnect_device(current: dict):
+    """Disconnect the Wi-Fi device over D-Bus, falling back to nmcli."""
+    try:
+        await nm_dbus.disconnect()
+        return
+    except NetworkBackendUnavailable as e:
+        note_dbus_fallback(e)
+    except NetworkBackendError as e:
+        raise subprocess.CalledProcessError(1, ["Device.Disconnect"], stderr=str(e))
+    device = current.get("device")
+    await run_command(
+        ["nmcli", "device", "disconnect", device] if device else ["nmcli", "connection", "down", current["ssid"]],
+        timeout=NMCLI_TIMEOUT,
+        check=True
+    )
         
 @fastapi_app.post("/wifi/disconnect")
 async def disconnect_wifi():
     try:
         # Get current connection first
-        current = current_wifi()
+        current = await current_wifi()
         if not current["connected"]:
             return {"status": "not_connected"}
             
-        # Store device info for reconnection
-        device = current.get("device")
-        
         # Try to notify clients before disconnecting
         try:
             await sio.emit('wifi_state_change', {
@@ -929,12 +941,10 @@ async def disconnect_wifi():
             print(f"Warning: Could not notify clients before disconnect: {notify_err}")
             
         # Disconnect from WiFi
-        result = subprocess.run(
-            ["nmcli", "device", "disconnect", device] if device else ["nmcli", "connection", "down", current["ssid"]],
-            capture_output=True,
-            text=True,
-            check=True
-        )
+        try:
+            await disconnect_device(current)
+        finally:
+            wifi_snapshot.invalidate()
         
         # Brief pause to let the disconnection take effect
         await asyncio.sleep(1)
@@ -945,19 +955,15 @@ async def disconnect_wifi():
         while retry_count < max_retries:
             try:
                 # Check if actually disconnected
-                current_check = current_wifi()
+                wifi_snapshot.invalidate()
+                current_check = await current_wifi()
                 if not current_check["connected"]:
                     return {"status": "disconnected"}
                     
                 # If still connected, try again
                 if retry_count < max_retries - 1:
                     print(f"Still connected after disconnect attempt {retry_count + 1}, retrying...")
-                    subprocess.run(
-                        ["nmcli", "device", "disconnect", device] if device else ["nmcli", "connection", "down", current["ssid"]],
-                        capture_output=True,
-                        text=True,
-                        check=True
-                    )
+                    await disconnect_device(current)
                     await asyncio.sleep(1)
                     
             except Exception as check_err:
@@ -970,7 +976,7 @@ async def disconnect_wifi():
             detail="Failed to confirm disconnection after multiple attempts"
         )
             
-    except subprocess.CalledProcessError as e:
+    except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
         raise HTTPException(status_code=500, detail=f"Failed to disconnect: {str(e)}")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Unexpected error during disconnect: {str(e)}")
@@ -987,14 +993,56 @@ async def disconnect_wifi():
 voice_connected_clients = set()
 voice_connections = {}
 
+async def send_voice_frame(sid, frame):
+    await sio.emit('voice_data', frame_payload(frame), room=sid, namespace='/voice')
+
+# Socket.IO and /ws/voice clients share one relay; each client gets its own
+# bounded queue, so a slow one only delays itself
+voice_relay = VoiceRelay(send_voice_frame)
+
+# Talkgroups: frames only reach members of the sender's group
+TALKGROUP_RE = re.compile(r"^[A-Za-z0-9_-]{1,32}$")
+
+def talkgroup_room(name):
+    return f"talkgroup:{name}"
+
+def requested_talkgroup(query_string):
+    """Talkgroup from a ``?talkgroup=`` query parameter, or the default one."""
+    name = parse_qs(query_string or "").get("talkgroup", [DEFAULT_TALKGROUP])[0]
+    return name if TALKGROUP_RE.match(name) else DEFAULT_TALKGROUP
+
+async def notify_talkgroup(event, sid, name):
+    """Send ``talkgroup_joined`` / ``talkgroup_left`` to the members of ``name``."""
+    await sio.emit(event, {
+        'sid': sid, 'talkgroup': name, 'members': len(voice_relay.members(name))
+    }, room=talkgroup_room(name), skip_sid=sid if event == 'talkgroup_left' else None, namespace='/voice')
+
+async def move_to_talkgroup(sid, name):
+    """Move a client between talkgroups and tell both groups."""
+    previous = voice_relay.move(sid, name)
+    if previous is None or previous == name:
+        return previous
+    if not sid.startswith("ws-"):
+        await sio.leave_room(sid, talkgroup_room(previous), namespace='/voice')
+        await sio.enter_room(sid, talkgroup_room(name), namespace='/voice')
+    print(f"📻 {sid} moved from talkgroup {previous} to {name}")
+    await notify_talkgroup('talkgroup_left', sid, previous)
+    await notify_talkgroup('talkgroup_joined', sid, name)
+    await notify_voice_status_update()
+    return previous
+
 @sio.event(namespace='/voice')
 async def connect(sid, environ):
     """Handle voice chat client connection."""
-    print(f"🔗 Voice chat client connected: {sid}")
+    talkgroup = requested_talkgroup(environ.get('QUERY_STRING'))
+    print(f"🔗 Voice chat client connected: {sid} (talkgroup {talkgroup})")
     voice_connected_clients.add(sid)
     voice_connections[sid] = True  # Automatically enable voice for connected clients
+    voice_relay.add(sid, group=talkgroup)
+    await sio.enter_room(sid, talkgroup_room(talkgroup), namespace='/voice')
     
     # Notify other clients
+    await notify_talkgroup('talkgroup_joined', sid, talkgroup)
     await notify_voice_status_update()
 
 @sio.event(namespace='/voice')
@@ -1003,28 +1051,42 @@ async def disconnect(sid):
     print(f"❌ Voice chat client disconnected: {sid}")
     voice_connected_clients.discard(sid)
     voice_connections.pop(sid, None)
+    talkgroup = voice_relay.group_of(sid)
+    voice_relay.remove(sid)
     
     # Notify other clients
+    if talkgroup is not None:
+        await notify_talkgroup('talkgroup_left', sid, talkgroup)
     await notify_voice_status_update()
 
 @sio.event(namespace='/voice')
 async def voice_data(sid, data):
     """Handle incoming voice data and broadcast to other clients."""
     data_size = len(data) if data else 0
-    print(f"🎤 RECEIVED voice data from {sid}, size: {data_size} bytes")
-    
-    # Broadcast to all other connected clients in the voice namespace
-    forwarded_count = 0
-    for client_sid in voice_connected_clients:
-        if client_sid != sid:  # Don't send back to sender
-            try:
-                await sio.emit('voice_data', data, room=client_sid, namespace='/voice')
-                forwarded_count += 1
-                print(f"📤 Forwarded voice data to {client_sid}")
-            except Exception as e:
-                print(f"❌ Error forwarding voice data to {client_sid}: {e}")
     
-    print(f"📊 Voice data forwarded to {forwarded_count} clients")
+    # Queue for all other connected clients; their senders run concurrently
+    forwarded_count = voice_relay.publish(sid, data)
+
+    # No per-packet output: counters are summarised by the log writer
+    logger.count("voice.received")
+    logger.count("voice.received_bytes", data_size)
+    logger.count("voice.forwarded", forwarded_count)
+    logger.debug("🎤 RECEIVED voice data", rate=1, sid=sid, size=data_size, forwarded=forwarded_count)
+
+@sio.event(namespace='/voice')
+async def join_talkgroup(sid, data):
+    """Switch this client to ``data["talkgroup"]``."""
+    name = (data or {}).get('talkgroup') if isinstance(data, dict) else data
+    if not isinstance(name, str) or not TALKGROUP_RE.match(name):
+        return {'error': 'Talkgroup names are 1-32 letters, digits, _ or -'}
+    await move_to_talkgroup(sid, name)
+    return {'talkgroup': name, 'members': voice_relay.members(name)}
+
+@sio.event(namespace='/voice')
+async def leave_talkgroup(sid, data=None):
+    """Go back to the default talkgroup."""
+    await move_to_talkgroup(sid, DEFAULT_TALKGROUP)
+    return {'talkgroup': DEFAULT_TALKGROUP, 'members': voice_relay.members(DEFAULT_TALKGROUP)}
 
 @sio.event(namespace='/voice')
 async def start_voice(sid):
@@ -1044,7 +1106,14 @@ async def notify_voice_status_update():
     """Notify all voice clients about current connection status."""
     status = {
         'connected_clients': len(voice_connected_clients),
-        'active_voice': sum(1 for v in voice_connections.values() if v)
+        'active_voice': sum(1 for v in voice_connections.values() if v),
+        'talkgroups': {
+            name: {
+                'members': len(members),
+                'active_voice': sum(1 for member in members if voice_connections.get(member))
+            }
+            for name, members in voice_relay.groups.items()
+        }
     }
     await sio.emit('status_update', status, namespace='/voice')
 
@@ -1058,31 +1127,62 @@ async def voice_chat_status():
     """Check voice chat server status."""
     return {"status": "ok", "message": "Voice chat server is running"}
 
+@fastapi_app.get("/voice-chat/relay")
+async def voice_relay_status():
+    """Per-client queue depth, drops and send errors, and talkgroup membership."""
+    return voice_relay.stats()
+
+@fastapi_app.get("/system/logging")
+async def logging_status():
+    """Log queue, drops and the aggregate counters behind the periodic summaries."""
+    return logger.stats()
+
 @fastapi_app.websocket("/ws/voice")
 async def voice_websocket(websocket):
     """WebSocket endpoint for voice data."""
     await websocket.accept()
     
-    # Add this connection to the voice namespace
-    sid = str(id(websocket))  # Use object id as session id
+    # Register with the relay next to the Socket.IO clients
+    sid = f"ws-{id(websocket)}"  # Use object id as session id
     voice_connected_clients.add(sid)
+
+    async def send_frame(_, frame):
+        payload = frame_payload(frame)
+        if isinstance(payload, (bytes, bytearray)):
+            await websocket.send_bytes(payload)
+        else:
+            await websocket.send_json(payload)  # Non-binary message from a Socket.IO client
+
+    talkgroup = requested_talkgroup(websocket.scope.get("query_string", b"").decode())
+    voice_relay.add(sid, send_frame, transport="websocket", group=talkgroup)
+    voice_connections[sid] = True
+    await notify_talkgroup('talkgroup_joined', sid, talkgroup)
+    await notify_voice_status_update()
     
     try:
         while True:
             # Receive voice data from this client
             data = await websocket.receive_bytes()
             
-            # Broadcast to other clients via Socket.IO
-            await sio.emit('voice_data', data, namespace='/voice')
-            
-            # Also broadcast to other WebSocket clients if any
-            # (This would need a registry of WebSocket connections)
+            # Forward to every other participant, Socket.IO or WebSocket
+            forwarded_count = voice_relay.publish(sid, data)
+            logger.count("voice.received")
+            logger.count("voice.received_bytes", len(data))
+            logger.count("voice.forwarded", forwarded_count)
             
     except Exception as e:
         print(f"WebSocket error: {e}")
     finally:
+        talkgroup = voice_relay.group_of(sid)
+        voice_relay.remove(sid)
         voice_connected_clients.discard(sid)
-        await websocket.close()
+        voice_connections.pop(sid, None)
+        await notify_talkgroup('talkgroup_left', sid, talkgroup)
+        await notify_voice_status_update()
+        try:
+            await websocket.close()
+        except Exception:
+            pass  # Already closed by the client
 
 # --------------------------
 # Socket.IO
@@ -1091,39 +1191,46 @@ async def voice_websocket(websocket):
 # Store connected clients
 connected_clients = set()
 
+# Monitor cadence (seconds)
+WIFI_SAFETY_POLL_INTERVAL = 30.0  # Re-check even without notifications
+WIFI_SIGNAL_BUCKET = 25  # Signal changes within a bucket are not transitions
+
+def wifi_transition_key(status, current):
+    """Reduce a WiFi reading to the fields whose change clients care about."""
+    if current is None:
+        return (status, None)
+    signal = current.get("signal")
+    return (
+        status,
+        current.get("connected"),
+        current.get("ssid"),
+        current.get("device"),
+        current.get("error"),
+        signal // WIFI_SIGNAL_BUCKET if isinstance(signal, int) else None,
+    )
+
 # Background task to monitor WiFi status
 async def monitor_wifi_status():
-    previous_status = None
-    previous_connection = None
+    previous_key = None
     consecutive_errors = 0
     max_consecutive_errors = 3
     
     while True:
         try:
-            # Always force a NetworkManager check
-            ensure_network_manager()
-            
-            wifi_state = wifi_status()
+            wifi_state = await wifi_status()
             current = None
             
             # Always try to get current connection info, even if status appears off
             try:
-                current = current_wifi()
+                current = await current_wifi()
             except Exception as conn_err:
                 print(f"Error getting current connection: {conn_err}")
                 
-            # More comprehensive status change detection
-            status_changed = (
-                previous_status != wifi_state["status"] or
-                previous_connection is None or current is None or
-                (current is not None and previous_connection is not None and
-                 (current.get("connected") != previous_connection.get("connected") or
-                  current.get("ssid") != previous_connection.get("ssid") or
-                  current.get("signal") != previous_connection.get("signal") or
-                  current.get("error") != previous_connection.get("error")))
-            )
+            network_supervisor.observe(wifi_state)
             
-            if status_changed or consecutive_errors >= max_consecutive_errors:
+            # Only real transitions are broadcast
+            key = wifi_transition_key(wifi_state["status"], current)
+            if key != previous_key or consecutive_errors >= max_consecutive_errors:
                 print(f"WiFi status changed: {wifi_state['status']}, Connection: {current}")
                 
                 # Broadcast to all connected clients
@@ -1134,9 +1241,8 @@ async def monitor_wifi_status():
                         'timestamp': time.time()
                     })
                 
-                previous_status = wifi_state["status"]
-                previous_connection = current
-                consecutive_errors = 0  # Reset error counter on successful update
+                previous_key = key
+            consecutive_errors = 0  # Reset error counter on successful update
                 
         except Exception as e:
             consecutive_errors += 1
@@ -1159,24 +1265,27 @@ async def monitor_wifi_status():
                 # Wait longer between retries after repeated errors
                 await asyncio.sleep(5)
             
-        # Adaptive sleep: shorter interval if there are clients connected
-        await asyncio.sleep(1 if connected_clients else 3)
+        if wifi_watcher.subscribed:
+            # Sleep until NetworkManager reports a change, with a slow safety-net poll
+            changed = await wifi_watcher.wait_for_change(WIFI_SAFETY_POLL_INTERVAL)
+        else:
+            # No change notifications available: adaptive polling as before
+            changed = await wifi_watcher.wait_for_change(1 if connected_clients else 3)
+        if changed:
+            wifi_snapshot.invalidate()
 
 @sio.event
 async def connect(sid, environ):
     print(f"Socket.IO client connected: {sid}")
     connected_clients.add(sid)
     try:
-        # Ensure NetworkManager is running
-        ensure_network_manager()
-        
         # Get current WiFi status
-        wifi_state = wifi_status()
+        wifi_state = await wifi_status()
         current = None
         
         # Always try to get current connection info
         try:
-            current = current_wifi()
+            current = await current_wifi()
         except Exception as conn_err:
             print(f"Error getting initial connection state: {conn_err}")
             current = {
@@ -1209,10 +1318,16 @@ async def connect(sid, environ):
             'timestamp': time.time()
         }, to=sid)
 
+    # Last known camera state, if the monitor has probed already
+    camera_state = camera_monitor.cache.peek()
+    if camera_state is not None:
+        await sio.emit('camera_state_change', camera_state, to=sid)
+
 @sio.event
 async def disconnect(sid):
     print(f"Socket.IO client disconnected: {sid}")
     connected_clients.discard(sid)  # Remove from connected clients set
+    telemetry_stream.unsubscribe(sid)
 
 # --------------------------
 # CLI Entry Point
@@ -6,7 +6,7 @@ a = Analysis(
     pathex=['src/backend'],
     binaries=[],
     datas=[],
-    hiddenimports=['camera_status', 'voice_chat', 'audio_stream_receiver', 'mic_stream_sender', 'process_manager'],
+    hiddenimports=['camera_status', 'voice_chat', 'audio_stream_receiver', 'mic_stream_sender', 'process_manager', 'command_runner', 'nm_dbus', 'wifi_watcher', 'snapshot_cache', 'network_supervisor', 'audio_control', 'value_queue', 'backlight', 'camera_monitor', 'camera_registry', 'camera_probe', 'camera_discovery', 'ring_buffer', 'thermal_sampler', 'telemetry', 'timeseries_store', 'voice_relay', 'structured_log', 'audio_codec', 'audio_udp', 'audio_mixer', 'audio_playback', 'audio_capture'],
     hookspath=[],
     hooksconfig={},
     runtime_hooks=[],
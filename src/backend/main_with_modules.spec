@@ -12,6 +12,29 @@ a = Analysis(
         ('audio_stream_receiver.py', '.'),
         ('mic_stream_sender.py', '.'),
         ('process_manager.py', '.'),
+        ('command_runner.py', '.'),
+        ('nm_dbus.py', '.'),
+        ('wifi_watcher.py', '.'),
+        ('snapshot_cache.py', '.'),
+        ('network_supervisor.py', '.'),
+        ('audio_control.py', '.'),
+        ('value_queue.py', '.'),
+        ('backlight.py', '.'),
+        ('camera_monitor.py', '.'),
+        ('camera_registry.py', '.'),
+        ('camera_probe.py', '.'),
+        ('camera_discovery.py', '.'),
+        ('ring_buffer.py', '.'),
+        ('thermal_sampler.py', '.'),
+        ('telemetry.py', '.'),
+        ('timeseries_store.py', '.'),
+        ('voice_relay.py', '.'),
+        ('structured_log.py', '.'),
+        ('audio_codec.py', '.'),
+        ('audio_udp.py', '.'),
+        ('audio_mixer.py', '.'),
+        ('audio_playback.py', '.'),
+        ('audio_capture.py', '.'),
         ('wifi_control.sh', '.'),
         ('no-wifi-auto.conf', '.'),
     ],
@@ -20,7 +43,30 @@ a = Analysis(
         'voice_chat', 
         'audio_stream_receiver',
         'mic_stream_sender',
-        'process_manager'
+        'process_manager',
+        'command_runner',
+        'nm_dbus',
+        'wifi_watcher',
+        'snapshot_cache',
+        'network_supervisor',
+        'audio_control',
+        'value_queue',
+        'backlight',
+        'camera_monitor',
+        'camera_registry',
+        'camera_probe',
+        'camera_discovery',
+        'ring_buffer',
+        'thermal_sampler',
+        'telemetry',
+        'timeseries_store',
+        'voice_relay',
+        'structured_log',
+        'audio_codec',
+        'audio_udp',
+        'audio_mixer',
+        'audio_playback',
+        'audio_capture'
     ],
     hookspath=[],
     hooksconfig={},
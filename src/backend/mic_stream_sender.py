@@ -1,5 +1,11 @@
+import os
 import pyaudio
 import socket
+import time
+
+import audio_codec
+import audio_udp
+from audio_capture import Capture
 
 # Audio Config
 CHUNK = 1024
@@ -10,25 +16,45 @@ RATE = 44100
 # Receiver IP and Port
 RECEIVER_IP = "192.168.0.103"  # Update this to the receiver Jetson's IP
 PORT = 12345
+TRANSPORT = os.environ.get("GUARD_AUDIO_TRANSPORT", "tcp")  # "udp": datagrams + receiver jitter buffer
 
 # Setup socket
-sock = socket.socket()
-sock.connect((RECEIVER_IP, PORT))
+if TRANSPORT == "udp":
+    sender = audio_udp.UdpSender((RECEIVER_IP, PORT), RATE)
+    sender.negotiate()
+    encoder = sender.encoder
+    send = sender.send
+    sock = sender.sock
+else:
+    sock = socket.socket()
+    sock.connect((RECEIVER_IP, PORT))
+    encoder = audio_codec.offer(sock, RATE)
+
+    def send(data):
+        for packet in encoder.encode(data):
+            audio_codec.send_packet(sock, packet)
 
-# Setup audio input
+# Setup audio input: PortAudio fills the capture ring, a separate thread sends it
+capture = Capture(RATE, CHUNK, send)
 p = pyaudio.PyAudio()
-stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK)
+stream = p.open(format=FORMAT, channels=CHANNELS, rate=RATE, input=True, frames_per_buffer=CHUNK,
+                stream_callback=capture.callback)
 
-print("🔴 Sending audio stream... Press Ctrl+C to stop.")
+print(f"🔴 Sending audio stream ({encoder.codec.name} over {TRANSPORT})... Press Ctrl+C to stop.")
 
 try:
-    while True:
-        data = stream.read(CHUNK)
-        sock.sendall(data)
+    capture.start()
+    stream.start_stream()
+    while capture.running:
+        time.sleep(0.5)
 except KeyboardInterrupt:
     print("🛑 Stopped.")
 finally:
     stream.stop_stream()
+    capture.stop()
+    stats = encoder.stats()
+    print(f"📉 {stats['codec']}: {stats['input_kbps']} kbps captured, {stats['output_kbps']} kbps sent")
+    print(f"📊 {capture.stats()}")
     stream.close()
     p.terminate()
     sock.close()
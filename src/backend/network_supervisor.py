@@ -0,0 +1,203 @@
+"""Background self-healing for the Wi-Fi stack.
+
+Status reads only report what they see. Repairs that used to happen
+inside ``/wifi/status`` (starting NetworkManager, unblocking rfkill,
+turning the radio on, bringing the interface up) run here instead, off
+the request path, with exponential backoff per problem. Every attempt is
+reported through the ``emit`` callback.
+"""
+import asyncio
+import time
+from collections import deque
+
+from command_runner import command_runner, run_command
+
+# Status reasons produced by the read path
+NM_NOT_RUNNING = "NetworkManager not running"
+NM_NOT_RESPONDING = "NetworkManager not responding"
+HARD_BLOCKED = "hard_blocked"  # Hardware kill switch: nothing in software can clear it
+
+# Supervisor timing (seconds)
+CHECK_INTERVAL = 60.0  # Re-check even when nobody reports a problem
+SETTLE_DELAY = 2.0  # Give the system time to react before re-reading
+BACKOFF_BASE = 5.0
+BACKOFF_MAX = 300.0
+REPAIR_TIMEOUT = 15.0
+HISTORY_SIZE = 50
+
+
+class NetworkSupervisor:
+    """Watches Wi-Fi status and repairs it with backoff."""
+
+    def __init__(self, read_status, emit=None, on_change=None):
+        self.read_status = read_status  # async () -> status dict, must not repair
+        self.emit = emit  # async (event dict) -> None
+        self.on_change = on_change  # () -> None, called after every repair attempt
+        self.desired_radio = True  # Cleared when an operator turns WiFi off
+        self.history = deque(maxlen=HISTORY_SIZE)
+        self._failures = {}  # problem -> consecutive failed attempts
+        self._next_attempt = {}  # problem -> loop time of the next allowed attempt
+        self._wake = asyncio.Event()
+        self._task = None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def set_desired_radio(self, enabled: bool):
+        """Record the operator's choice so an intentional 'off' is not undone."""
+        self.desired_radio = enabled
+        self._failures.clear()
+        self._next_attempt.clear()
+
+    def observe(self, status: dict):
+        """Feed a status reading; wakes the supervisor if it needs repair."""
+        if self.diagnose(status) is not None:
+            self._wake.set()
+
+    def diagnose(self, status: dict) -> str | None:
+        """Map a status reading to the problem the supervisor can fix, if any."""
+        state = status.get("status")
+        reason = status.get("reason")
+        if state == "error" and reason == NM_NOT_RUNNING:
+            return "networkmanager"
+        if state == "error" and reason == NM_NOT_RESPONDING:
+            return "networkmanager_hung"
+        if state == "off" and self.desired_radio:
+            if reason == HARD_BLOCKED:
+                return None
+            if reason == "blocked":
+                return "rfkill"
+            if reason == "unavailable":
+                return "interface"
+            return "radio"
+        return None
+
+    async def _run(self):
+        while True:
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout=CHECK_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+            try:
+                await self._check()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Network supervisor error: {e}")
+
+    async def _check(self):
+        status = await self.read_status()
+        problem = self.diagnose(status)
+        if problem is None:
+            if self._failures:
+                print("Network supervisor: WiFi healthy again")
+            self._failures.clear()
+            self._next_attempt.clear()
+            return
+
+        loop = asyncio.get_running_loop()
+        wait = self._next_attempt.get(problem, 0) - loop.time()
+        if wait > 0:
+            loop.call_later(wait, self._wake.set)
+            return
+
+        await self._repair(problem, status)
+
+    async def _repair(self, problem: str, status: dict):
+        loop = asyncio.get_running_loop()
+        attempt = self._failures.get(problem, 0) + 1
+        print(f"Network supervisor: repairing {problem} (attempt {attempt})")
+
+        action, error = await self._run_repair(problem)
+        await asyncio.sleep(SETTLE_DELAY)
+        if self.on_change:
+            self.on_change()
+
+        after = await self.read_status()
+        healed = self.diagnose(after) != problem
+        if healed:
+            self._failures.pop(problem, None)
+            self._next_attempt.pop(problem, None)
+            if self.diagnose(after) is not None:
+                self._wake.set()  # Next problem in the chain, e.g. radio after NetworkManager
+            retry_in = None
+        else:
+            self._failures[problem] = attempt
+            retry_in = min(BACKOFF_BASE * 2 ** (attempt - 1), BACKOFF_MAX)
+            self._next_attempt[problem] = loop.time() + retry_in
+            loop.call_later(retry_in, self._wake.set)
+
+        event = {
+            "problem": problem,
+            "action": action,
+            "attempt": attempt,
+            "success": healed,
+            "error": error,
+            "status_before": status,
+            "status_after": after,
+            "retry_in": retry_in,
+            "timestamp": time.time(),
+        }
+        self.history.append(event)
+        print(f"Network supervisor: {action} -> {'healed' if healed else 'still ' + problem}")
+        if self.emit:
+            try:
+                await self.emit(event)
+            except Exception as e:
+                print(f"Network supervisor: could not report repair: {e}")
+
+    async def _run_repair(self, problem: str) -> tuple[str, str | None]:
+        """Run the repair for ``problem``; returns (action, error)."""
+        if problem == "networkmanager":
+            result = await command_runner.run_sudo(["systemctl", "start", "NetworkManager"], timeout=REPAIR_TIMEOUT)
+            return "start NetworkManager", None if result.ok else (result.stderr.strip() or "failed")
+
+        if problem == "networkmanager_hung":
+            result = await command_runner.run_sudo(["systemctl", "restart", "NetworkManager"], timeout=REPAIR_TIMEOUT)
+            return "restart NetworkManager", None if result.ok else (result.stderr.strip() or "failed")
+
+        if problem == "rfkill":
+            result = await run_command(["rfkill", "unblock", "wifi"], timeout=REPAIR_TIMEOUT)
+            if not result.ok:
+                result = await command_runner.run_sudo(["rfkill", "unblock", "wifi"], timeout=REPAIR_TIMEOUT)
+            return "unblock WiFi (rfkill)", None if result.ok else (result.stderr.strip() or "failed")
+
+        if problem == "radio":
+            result = await run_command(["nmcli", "radio", "wifi", "on"], timeout=REPAIR_TIMEOUT)
+            if not result.ok:
+                result = await command_runner.run_sudo(["nmcli", "radio", "wifi", "on"], timeout=REPAIR_TIMEOUT)
+            return "enable WiFi radio", None if result.ok else (result.stderr.strip() or "failed")
+
+        if problem == "interface":
+            interfaces = await run_command(["ip", "link", "show"], timeout=REPAIR_TIMEOUT)
+            for iface_line in interfaces.stdout.split('\n'):
+                if 'wlan' in iface_line.lower() or 'wifi' in iface_line.lower():
+                    iface_name = iface_line.split(':')[1].strip()
+                    result = await command_runner.run_sudo(["ip", "link", "set", iface_name, "up"], timeout=REPAIR_TIMEOUT)
+                    return f"bring up {iface_name}", None if result.ok else (result.stderr.strip() or "failed")
+            return "bring up WiFi interface", "No WiFi interface found"
+
+        return f"no repair for {problem}", "unknown problem"
+
+    def stats(self) -> dict:
+        loop = asyncio.get_running_loop()
+        return {
+            "desired_radio": self.desired_radio,
+            "failures": dict(self._failures),
+            "next_attempt_in": {
+                problem: round(max(0.0, when - loop.time()), 1)
+                for problem, when in self._next_attempt.items()
+            },
+            "history": list(self.history),
+        }
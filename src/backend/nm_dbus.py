@@ -0,0 +1,387 @@
+"""NetworkManager access over D-Bus.
+
+Keeps one bus connection open and reads NetworkManager's properties
+directly instead of forking ``nmcli`` and parsing its text output.
+Callers fall back to the nmcli path when this backend is unavailable
+(``dbus-next`` missing, no system bus, NetworkManager not on the bus).
+
+Set ``NM_DBUS_ADDRESS`` to point the backend at another bus, e.g. a
+private bus running the mock NetworkManager service in ``tests/nm_mock.py``.
+"""
+import asyncio
+import getpass
+import os
+
+try:
+    from dbus_next import BusType, Message, MessageType, Variant
+    from dbus_next.aio import MessageBus
+except ImportError:  # Optional dependency, nmcli fallback is used instead
+    MessageBus = None
+
+NM_SERVICE = "org.freedesktop.NetworkManager"
+NM_PATH = "/org/freedesktop/NetworkManager"
+NM_SETTINGS_PATH = "/org/freedesktop/NetworkManager/Settings"
+NM_IFACE = "org.freedesktop.NetworkManager"
+DEVICE_IFACE = "org.freedesktop.NetworkManager.Device"
+WIRELESS_IFACE = "org.freedesktop.NetworkManager.Device.Wireless"
+AP_IFACE = "org.freedesktop.NetworkManager.AccessPoint"
+ACTIVE_IFACE = "org.freedesktop.NetworkManager.Connection.Active"
+SETTINGS_IFACE = "org.freedesktop.NetworkManager.Settings"
+CONNECTION_IFACE = "org.freedesktop.NetworkManager.Settings.Connection"
+PROPS_IFACE = "org.freedesktop.DBus.Properties"
+
+DEVICE_TYPE_WIFI = 2
+NO_OBJECT = "/"
+
+# NMDeviceState values mapped to the words nmcli prints
+DEVICE_STATES = {
+    0: "unknown",
+    10: "unmanaged",
+    20: "unavailable",
+    30: "disconnected",
+    40: "connecting",
+    50: "connecting",
+    60: "connecting",
+    70: "connecting",
+    80: "connecting",
+    90: "connecting",
+    100: "connected",
+    110: "deactivating",
+    120: "failed",
+}
+ACTIVE_STATE_ACTIVATED = 2
+
+# NM80211ApFlags / NM80211ApSecurityFlags bits used to describe security
+AP_FLAG_PRIVACY = 0x1
+AP_SEC_KEY_MGMT_PSK = 0x100
+AP_SEC_KEY_MGMT_802_1X = 0x200
+AP_SEC_KEY_MGMT_SAE = 0x400
+
+CALL_TIMEOUT = 5.0  # Seconds to wait for a single D-Bus reply
+
+# Signals that mean the Wi-Fi state may have changed
+MATCH_RULES = [
+    f"type='signal',sender='{NM_SERVICE}'",
+    f"type='signal',sender='org.freedesktop.DBus',member='NameOwnerChanged',arg0='{NM_SERVICE}'",
+]
+# Interfaces whose property updates are too chatty to count as transitions
+# (access point strength, traffic counters); the safety-net poll picks them up
+NOISY_INTERFACES = {AP_IFACE, "org.freedesktop.NetworkManager.Device.Statistics"}
+
+
+class NetworkBackendUnavailable(Exception):
+    """The D-Bus backend cannot be used; callers should fall back to nmcli."""
+
+
+class NetworkBackendError(Exception):
+    """NetworkManager rejected a request made over D-Bus."""
+
+
+def describe_security(flags: int, wpa_flags: int, rsn_flags: int) -> str:
+    """Return a security summary in the same style as ``nmcli -f SECURITY``."""
+    parts = []
+    if flags & AP_FLAG_PRIVACY and not wpa_flags and not rsn_flags:
+        parts.append("WEP")
+    if wpa_flags:
+        parts.append("WPA1")
+    if rsn_flags & (AP_SEC_KEY_MGMT_PSK | AP_SEC_KEY_MGMT_802_1X):
+        parts.append("WPA2")
+    if rsn_flags & AP_SEC_KEY_MGMT_SAE:
+        parts.append("WPA3")
+    if (wpa_flags | rsn_flags) & AP_SEC_KEY_MGMT_802_1X:
+        parts.append("802.1X")
+    return " ".join(parts) if parts else "--"
+
+
+def decode_ssid(raw) -> str:
+    return bytes(raw).decode("utf-8", errors="replace") if raw else ""
+
+
+class NetworkManagerDBus:
+    """Persistent D-Bus client for the NetworkManager properties the Wi-Fi API needs."""
+
+    def __init__(self, bus_address: str | None = None):
+        self.bus_address = bus_address or os.environ.get("NM_DBUS_ADDRESS")
+        self.bus = None
+        self._connect_lock = asyncio.Lock()
+        self._wifi_device = None  # Cached object path of the Wi-Fi device
+
+    @property
+    def available(self) -> bool:
+        return MessageBus is not None
+
+    async def connect(self):
+        """Open the bus connection once and reuse it for every call."""
+        if MessageBus is None:
+            raise NetworkBackendUnavailable("dbus-next is not installed")
+        if self.bus is not None and self.bus.connected:
+            return self.bus
+        async with self._connect_lock:
+            if self.bus is not None and self.bus.connected:
+                return self.bus
+            try:
+                if self.bus_address:
+                    bus = MessageBus(bus_address=self.bus_address)
+                else:
+                    bus = MessageBus(bus_type=BusType.SYSTEM)
+                self.bus = await asyncio.wait_for(bus.connect(), timeout=CALL_TIMEOUT)
+                self._wifi_device = None
+            except Exception as e:
+                self.bus = None
+                raise NetworkBackendUnavailable(f"Cannot connect to D-Bus: {e}")
+        return self.bus
+
+    def close(self):
+        if self.bus is not None:
+            self.bus.disconnect()
+            self.bus = None
+
+    # --------------------------
+    # Low-level helpers
+    # --------------------------
+
+    async def _call(self, path, interface, member, signature="", body=None, destination=NM_SERVICE):
+        bus = await self.connect()
+        message = Message(
+            destination=destination,
+            path=path,
+            interface=interface,
+            member=member,
+            signature=signature,
+            body=body or [],
+        )
+        try:
+            reply = await asyncio.wait_for(bus.call(message), timeout=CALL_TIMEOUT)
+        except asyncio.TimeoutError:
+            raise NetworkBackendUnavailable(f"D-Bus call {interface}.{member} timed out")
+        except Exception as e:
+            if not bus.connected:
+                self.bus = None
+            raise NetworkBackendUnavailable(f"D-Bus call {interface}.{member} failed: {e}")
+        if reply.message_type == MessageType.ERROR:
+            raise NetworkBackendError(f"{reply.error_name}: {reply.body[0] if reply.body else ''}")
+        return reply.body
+
+    async def _get_all(self, path, interface) -> dict:
+        body = await self._call(path, PROPS_IFACE, "GetAll", "s", [interface])
+        return {key: variant.value for key, variant in body[0].items()}
+
+    async def subscribe(self, callback):
+        """Call ``callback()`` whenever NetworkManager signals a relevant change.
+
+        Returns the bus so the caller can wait for it to disconnect and
+        subscribe again.
+        """
+        bus = await self.connect()
+
+        def handler(message):
+            if message.message_type != MessageType.SIGNAL:
+                return None
+            if message.member == "NameOwnerChanged":
+                if not message.body or message.body[0] != NM_SERVICE:
+                    return None
+                self._wifi_device = None  # NetworkManager restarted
+            elif message.sender == "org.freedesktop.DBus":
+                return None
+            elif message.interface in NOISY_INTERFACES:
+                return None
+            elif message.member == "PropertiesChanged" and message.body and message.body[0] in NOISY_INTERFACES:
+                return None
+            elif message.member in ("DeviceAdded", "DeviceRemoved"):
+                self._wifi_device = None
+            callback()
+            return None
+
+        bus.add_message_handler(handler)
+        try:
+            for rule in MATCH_RULES:
+                await self._call(
+                    "/org/freedesktop/DBus", "org.freedesktop.DBus", "AddMatch", "s", [rule],
+                    destination="org.freedesktop.DBus",
+                )
+        except Exception:
+            bus.remove_message_handler(handler)
+            raise
+        return bus
+
+    async def nm_running(self) -> bool:
+        body = await self._call(
+            "/org/freedesktop/DBus", "org.freedesktop.DBus", "NameHasOwner", "s", [NM_SERVICE],
+            destination="org.freedesktop.DBus",
+        )
+        return bool(body[0])
+
+    async def _find_wifi_device(self):
+        if self._wifi_device is not None:
+            return self._wifi_device
+        devices = (await self._call(NM_PATH, NM_IFACE, "GetDevices"))[0]
+        for path in devices:
+            props = await self._get_all(path, DEVICE_IFACE)
+            if props.get("DeviceType") == DEVICE_TYPE_WIFI:
+                self._wifi_device = path
+                return path
+        return None
+
+    async def _access_point(self, path) -> dict | None:
+        if not path or path == NO_OBJECT:
+            return None
+        props = await self._get_all(path, AP_IFACE)
+        return {
+            "path": path,
+            "ssid": decode_ssid(props.get("Ssid")),
+            "signal": int(props.get("Strength", 0)),
+            "security": describe_security(
+                props.get("Flags", 0), props.get("WpaFlags", 0), props.get("RsnFlags", 0)
+            ),
+        }
+
+    # --------------------------
+    # Read API
+    # --------------------------
+
+    async def wifi_state(self) -> dict:
+        """Read radio, device and active-connection state in one pass."""
+        if not await self.nm_running():
+            return {"running": False, "radio": False, "hardware": False, "device": None,
+                    "device_state": None, "connected": False, "ssid": None, "signal": None,
+                    "security": None, "connection": None}
+
+        nm_props = await self._get_all(NM_PATH, NM_IFACE)
+        state = {
+            "running": True,
+            "radio": bool(nm_props.get("WirelessEnabled")),
+            "hardware": bool(nm_props.get("WirelessHardwareEnabled")),
+            "device": None,
+            "device_path": None,
+            "device_state": None,
+            "connected": False,
+            "ssid": None,
+            "signal": None,
+            "security": None,
+            "connection": None,
+        }
+
+        try:
+            device_path = await self._find_wifi_device()
+            if device_path is None:
+                return state
+            device = await self._get_all(device_path, DEVICE_IFACE)
+        except NetworkBackendError:
+            # Device went away (e.g. USB adapter unplugged); rediscover next time
+            self._wifi_device = None
+            return state
+
+        state["device"] = device.get("Interface")
+        state["device_path"] = device_path
+        state["device_state"] = DEVICE_STATES.get(device.get("State", 0), "unknown")
+
+        active_path = device.get("ActiveConnection", NO_OBJECT)
+        if active_path and active_path != NO_OBJECT:
+            active = await self._get_all(active_path, ACTIVE_IFACE)
+            if active.get("State") == ACTIVE_STATE_ACTIVATED:
+                state["connected"] = True
+                state["connection"] = active.get("Id")
+                state["ssid"] = active.get("Id")
+
+        if state["connected"]:
+            wireless = await self._get_all(device_path, WIRELESS_IFACE)
+            ap = await self._access_point(wireless.get("ActiveAccessPoint"))
+            if ap:
+                state["ssid"] = ap["ssid"] or state["ssid"]
+                state["signal"] = ap["signal"]
+                state["security"] = ap["security"]
+
+        return state
+
+    async def access_points(self) -> list[dict]:
+        """Return visible access points, strongest first, one entry per SSID."""
+        device_path = await self._find_wifi_device()
+        if device_path is None:
+            return []
+        paths = (await self._call(device_path, WIRELESS_IFACE, "GetAllAccessPoints"))[0]
+        best = {}
+        for path in paths:
+            try:
+                ap = await self._access_point(path)
+            except NetworkBackendError:
+                continue  # AP vanished between listing and reading it
+            if ap and ap["ssid"] and (ap["ssid"] not in best or ap["signal"] > best[ap["ssid"]]["signal"]):
+                best[ap["ssid"]] = ap
+        return sorted(best.values(), key=lambda ap: ap["signal"], reverse=True)
+
+    async def saved_connections(self) -> dict:
+        """Return saved Wi-Fi connections as ``{id: object_path}``."""
+        paths = (await self._call(NM_SETTINGS_PATH, SETTINGS_IFACE, "ListConnections"))[0]
+        saved = {}
+        for path in paths:
+            try:
+                settings = (await self._call(path, CONNECTION_IFACE, "GetSettings"))[0]
+            except NetworkBackendError:
+                continue
+            connection = settings.get("connection", {})
+            if connection.get("type") and connection["type"].value == "802-11-wireless":
+                saved[connection["id"].value] = path
+        return saved
+
+    # --------------------------
+    # Write API
+    # --------------------------
+
+    async def request_scan(self):
+        device_path = await self._find_wifi_device()
+        if device_path is None:
+            raise NetworkBackendError("No WiFi device found")
+        await self._call(device_path, WIRELESS_IFACE, "RequestScan", "a{sv}", [{}])
+
+    async def activate(self, ssid: str, password: str | None = None, remember: bool = True) -> str:
+        """Bring up a saved connection or create one for ``ssid``.
+
+        Returns the active connection's object path.
+        """
+        device_path = await self._find_wifi_device()
+        if device_path is None:
+            raise NetworkBackendError("No WiFi device found")
+
+        saved = await self.saved_connections()
+        if ssid in saved:
+            body = await self._call(
+                NM_PATH, NM_IFACE, "ActivateConnection", "ooo", [saved[ssid], device_path, NO_OBJECT]
+            )
+            return body[0]
+
+        ap = next((ap for ap in await self.access_points() if ap["ssid"] == ssid), None)
+        settings = {
+            "connection": {
+                "id": Variant("s", ssid),
+                "type": Variant("s", "802-11-wireless"),
+            },
+            "802-11-wireless": {
+                "ssid": Variant("ay", ssid.encode()),
+                "hidden": Variant("b", False),
+            },
+        }
+        if remember:
+            # Same as nmcli's "private yes": only visible to this user
+            settings["connection"]["permissions"] = Variant("as", [f"user:{getpass.getuser()}:"])
+        if password:
+            key_mgmt = "sae" if ap and ap["security"] == "WPA3" else "wpa-psk"
+            settings["802-11-wireless-security"] = {
+                "key-mgmt": Variant("s", key_mgmt),
+                "psk": Variant("s", password),
+            }
+        options = {"persist": Variant("s", "disk" if remember else "volatile")}
+        body = await self._call(
+            NM_PATH, NM_IFACE, "AddAndActivateConnection2", "a{sa{sv}}ooa{sv}",
+            [settings, device_path, ap["path"] if ap else NO_OBJECT, options],
+        )
+        return body[1]
+
+    async def disconnect(self):
+        device_path = await self._find_wifi_device()
+        if device_path is None:
+            raise NetworkBackendError("No WiFi device found")
+        await self._call(device_path, DEVICE_IFACE, "Disconnect")
+
+
+# Global instance
+nm_dbus = NetworkManagerDBus()
@@ -0,0 +1,88 @@
+"""Fixed-size numeric ring buffer for sampled metrics.
+
+Samples are rows of floats stored in one preallocated ``array('d')``
+(row-major, ``capacity * columns``) next to an array of timestamps, so
+recording a sample never allocates and memory use is known up front.
+Missing values are stored as NaN.
+"""
+import math
+from array import array
+
+NAN = float("nan")
+
+
+class SampleRing:
+    """Last ``capacity`` samples of ``len(columns)`` numeric values."""
+
+    def __init__(self, columns: list[str], capacity: int):
+        self.columns = list(columns)
+        self.width = len(self.columns)
+        self.capacity = capacity
+        self.values = array("d", [NAN]) * (capacity * self.width)
+        self.timestamps = array("d", [0.0]) * capacity
+        self.count = 0  # Samples ever appended; the next row is count % capacity
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def append(self, timestamp: float, row):
+        slot = self.count % self.capacity
+        base = slot * self.width
+        for i, value in enumerate(row):
+            self.values[base + i] = NAN if value is None else value
+        self.timestamps[slot] = timestamp
+        self.count += 1
+
+    def row(self, index: int) -> list[float]:
+        """Sample ``index`` counted from the oldest one still held."""
+        slot = (self.count - len(self) + index) % self.capacity
+        base = slot * self.width
+        return self.values[base:base + self.width].tolist()
+
+    def latest(self) -> tuple[float, list[float]] | None:
+        if not self.count:
+            return None
+        slot = (self.count - 1) % self.capacity
+        return self.timestamps[slot], self.row(len(self) - 1)
+
+    def _first_since(self, since: float) -> int:
+        """Index of the first held sample at or after ``since`` (binary search)."""
+        low, high = 0, len(self)
+        oldest = self.count - len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self.timestamps[(oldest + mid) % self.capacity] < since:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def window(self, since: float = 0.0) -> tuple[list[float], list[list[float]]]:
+        """All held samples taken at or after ``since``, oldest first."""
+        oldest = self.count - len(self)
+        indices = range(self._first_since(since), len(self))
+        return (
+            [self.timestamps[(oldest + i) % self.capacity] for i in indices],
+            [self.row(i) for i in indices],
+        )
+
+    def downsample(self, since: float = 0.0, points: int = 120) -> tuple[list[float], list[list[float | None]]]:
+        """Average samples since ``since`` into at most ``points`` buckets.
+
+        Each bucket reports its mean timestamp and the mean of each column,
+        ignoring NaN; a column with no values in a bucket is None.
+        """
+        timestamps, rows = self.window(since)
+        if not rows or points <= 0:
+            return [], []
+        size = max(1, math.ceil(len(rows) / points))
+        out_timestamps, out_rows = [], []
+        for start in range(0, len(rows), size):
+            chunk = rows[start:start + size]
+            out_timestamps.append(sum(timestamps[start:start + size]) / len(chunk))
+            means = []
+            for column in range(self.width):
+                values = [row[column] for row in chunk if not math.isnan(row[column])]
+                means.append(sum(values) / len(values) if values else None)
+            out_rows.append(means)
+        return out_timestamps, out_rows
@@ -0,0 +1,106 @@
+"""Single-flight, TTL-cached snapshots of expensive system state.
+
+Concurrent readers share one in-flight refresh instead of each running
+the same queries, and writers invalidate the snapshot after changing the
+underlying state.
+"""
+import asyncio
+import time
+
+
+class SingleFlightCache:
+    """Cache the result of an async loader for ``ttl`` seconds.
+
+    Readers that arrive while a refresh is running await that refresh.
+    The refresh runs in a task owned by the cache, so a reader that is
+    cancelled only stops waiting; the others still get the value.
+    ``invalidate()`` bumps a generation counter so a refresh started
+    before a mutation is neither reused nor stored afterwards.
+    """
+
+    def __init__(self, loader, ttl: float, name: str = "snapshot"):
+        self.loader = loader
+        self.ttl = ttl
+        self.name = name
+        self._value = None
+        self._loaded_at = None  # time.monotonic() of the stored value
+        self._generation = 0
+        self._inflight = None  # (generation, task) of the running refresh
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.refreshes = 0
+        self.errors = 0
+        self.invalidations = 0
+
+    @property
+    def age(self) -> float | None:
+        if self._loaded_at is None:
+            return None
+        return time.monotonic() - self._loaded_at
+
+    def _fresh(self, max_age: float) -> bool:
+        age = self.age
+        return age is not None and age < max_age
+
+    async def get(self, max_age: float | None = None):
+        """Return the cached value if younger than ``max_age`` (default: ttl)."""
+        if self._fresh(self.ttl if max_age is None else max_age):
+            self.hits += 1
+            return self._value
+        return await self.refresh()
+
+    async def refresh(self):
+        """Load a new value, joining a refresh already running for this generation."""
+        if self._inflight is not None and self._inflight[0] == self._generation:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+            task = asyncio.create_task(self._load(self._generation), name=f"{self.name}-refresh")
+            task.add_done_callback(self._finished)
+            self._inflight = (self._generation, task)
+        return await asyncio.shield(self._inflight[1])
+
+    async def _load(self, generation: int):
+        try:
+            value = await self.loader()
+        except Exception:
+            self.errors += 1
+            raise
+        self.refreshes += 1
+        if generation == self._generation:
+            self._value = value
+            self._loaded_at = time.monotonic()
+        return value
+
+    def _finished(self, task: asyncio.Task):
+        if self._inflight is not None and self._inflight[1] is task:
+            self._inflight = None
+        if not task.cancelled():
+            task.exception()  # Mark retrieved when every reader gave up
+
+    def invalidate(self):
+        """Forget the cached value; the next reader triggers a fresh load."""
+        self._generation += 1
+        self._loaded_at = None
+        self.invalidations += 1
+
+    def peek(self):
+        """Return the cached value without refreshing (may be stale or None)."""
+        return self._value
+
+    def stats(self) -> dict:
+        reads = self.hits + self.misses + self.coalesced
+        age = self.age
+        return {
+            "name": self.name,
+            "ttl": self.ttl,
+            "age": round(age, 3) if age is not None else None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "refreshes": self.refreshes,
+            "errors": self.errors,
+            "invalidations": self.invalidations,
+            "hit_rate": round((self.hits + self.coalesced) / reads, 3) if reads else None,
+        }
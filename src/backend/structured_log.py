@@ -0,0 +1,186 @@
+"""Queue-backed structured logging for hot paths.
+
+``print()`` on the event loop is a synchronous write to stdout, and when
+Electron pipes stdout a slow reader blocks the whole backend. Log calls
+here only put a tuple on a bounded queue; a daemon thread formats and
+writes the lines. On top of that:
+
+* levels, with the threshold from ``GUARD_LOG_LEVEL`` (default INFO)
+* ``rate=`` limits a call site to that many lines per second; lines it
+  suppressed are reported on its next line
+* ``sample=`` keeps one call in N
+* ``count()`` keeps aggregate counters that the writer prints as one
+  summary line every ``SUMMARY_INTERVAL`` seconds
+
+``GUARD_LOG_FORMAT=json`` writes JSON lines instead of text.
+"""
+import atexit
+import json
+import os
+import queue
+import sys
+import threading
+import time
+
+DEBUG, INFO, WARNING, ERROR = 10, 20, 30, 40
+LEVEL_NAMES = {DEBUG: "DEBUG", INFO: "INFO", WARNING: "WARNING", ERROR: "ERROR"}
+LEVELS = {name: level for level, name in LEVEL_NAMES.items()}
+
+LOG_QUEUE_SIZE = 10000  # Lines waiting for the writer before new ones are dropped
+SUMMARY_INTERVAL = 10.0  # Seconds between counter summaries
+
+
+class StructuredLogger:
+    """Non-blocking logger; formatting and I/O happen on a writer thread."""
+
+    def __init__(self, stream=None, level: int | None = None, json_lines: bool | None = None):
+        self.stream = stream
+        self.level = level if level is not None else LEVELS.get(os.environ.get("GUARD_LOG_LEVEL", "INFO").upper(), INFO)
+        self.json_lines = json_lines if json_lines is not None else os.environ.get("GUARD_LOG_FORMAT") == "json"
+        self.queue = queue.Queue(maxsize=LOG_QUEUE_SIZE)
+        self.dropped = 0  # Queue full
+        self.written = 0
+        self._buckets = {}  # call site -> [tokens, last refill, suppressed]
+        self._samples = {}  # call site -> calls seen
+        self._counters = {}
+        self._reported = {}  # Counter values at the last summary
+        self._reported_dropped = 0
+        self._lock = threading.Lock()  # Counters are read by the writer thread
+        self._thread = None
+
+    # --------------------------
+    # Logging calls (event loop side)
+    # --------------------------
+
+    def log(self, level: int, message: str, rate: float | None = None, sample: int | None = None, **fields):
+        if level < self.level:
+            return
+        suppressed = 0
+        if rate is not None or sample is not None:
+            caller = sys._getframe(2)  # Past debug()/info()/... to the call site
+            site = caller.f_code, caller.f_lineno
+            if sample is not None and sample > 1:
+                seen = self._samples.get(site, 0)
+                self._samples[site] = seen + 1
+                if seen % sample:
+                    return
+            if rate is not None:
+                now = time.monotonic()
+                bucket = self._buckets.get(site)
+                if bucket is None:
+                    bucket = self._buckets[site] = [rate, now, 0]
+                # Refill, with a burst of at most one second's worth
+                bucket[0] = min(rate, bucket[0] + (now - bucket[1]) * rate)
+                bucket[1] = now
+                if bucket[0] < 1:
+                    bucket[2] += 1
+                    return
+                bucket[0] -= 1
+                suppressed, bucket[2] = bucket[2], 0
+        self._enqueue((time.time(), level, message, fields, suppressed))
+
+    def debug(self, message: str, **kwargs):
+        self.log(DEBUG, message, **kwargs)
+
+    def info(self, message: str, **kwargs):
+        self.log(INFO, message, **kwargs)
+
+    def warning(self, message: str, **kwargs):
+        self.log(WARNING, message, **kwargs)
+
+    def error(self, message: str, **kwargs):
+        self.log(ERROR, message, **kwargs)
+
+    def count(self, name: str, n: int = 1):
+        """Add ``n`` to an aggregate counter reported in the periodic summary."""
+        if self._thread is None:
+            self._start()  # The writer prints the summaries even if nothing else is logged
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + n
+
+    def _enqueue(self, record):
+        if self._thread is None:
+            self._start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    # --------------------------
+    # Writer thread
+    # --------------------------
+
+    def _start(self):
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._write_loop, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _format(self, record) -> str:
+        timestamp, level, message, fields, suppressed = record
+        if suppressed:
+            fields = {**fields, "suppressed": suppressed}
+        if self.json_lines:
+            return json.dumps({"ts": round(timestamp, 3), "level": LEVEL_NAMES.get(level, level),
+                               "msg": message, **fields}, default=str)
+        clock = time.strftime("%H:%M:%S", time.localtime(timestamp))
+        extra = " ".join(f"{k}={v}" for k, v in fields.items())
+        return f"{clock} {LEVEL_NAMES.get(level, level):<7} {message}{' ' + extra if extra else ''}"
+
+    def _summary(self):
+        with self._lock:
+            deltas = {k: v - self._reported.get(k, 0) for k, v in self._counters.items()}
+            self._reported = dict(self._counters)
+        deltas = {k: v for k, v in deltas.items() if v}
+        dropped, self._reported_dropped = self.dropped - self._reported_dropped, self.dropped
+        if dropped:
+            deltas["log.dropped"] = dropped
+        if deltas:
+            return (time.time(), INFO, f"📊 last {SUMMARY_INTERVAL:g}s", deltas, 0)
+        return None
+
+    def _write_loop(self):
+        next_summary = time.monotonic() + SUMMARY_INTERVAL
+        while True:
+            try:
+                record = self.queue.get(timeout=max(0.0, next_summary - time.monotonic()))
+            except queue.Empty:
+                record = None
+            if time.monotonic() >= next_summary:
+                next_summary = time.monotonic() + SUMMARY_INTERVAL
+                summary = self._summary()
+                if summary is not None:
+                    self._write(summary)
+            if record is not None:
+                self._write(record)
+
+    def _write(self, record):
+        stream = self.stream or sys.stdout
+        try:
+            stream.write(self._format(record) + "\n")
+            stream.flush()
+            self.written += 1
+        except Exception:
+            pass  # Logging must never take the backend down
+
+    def flush(self, timeout: float = 1.0):
+        """Write out whatever is queued (used at exit)."""
+        deadline = time.monotonic() + timeout
+        while not self.queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.01)
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+        return {
+            "level": LEVEL_NAMES.get(self.level, self.level),
+            "queued": self.queue.qsize(),
+            "written": self.written,
+            "dropped": self.dropped,
+            "counters": counters,
+        }
+
+
+# Global instance
+logger = StructuredLogger()
+atexit.register(logger.flush)
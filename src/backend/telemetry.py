@@ -0,0 +1,383 @@
+"""System telemetry: CPU, memory, network throughput and Jetson GPU load.
+
+``TelemetrySampler`` reads ``/proc/stat``, ``/proc/meminfo``,
+``/proc/net/dev`` and the GPU ``load`` node through file descriptors
+opened once, at a fixed rate, into a ``SampleRing``. ``TelemetryStream``
+sends the samples to Socket.IO subscribers, each at the interval it asked
+for, as a key frame followed by integer deltas.
+"""
+import asyncio
+import glob
+import math
+import os
+import time
+
+from ring_buffer import SampleRing
+
+SAMPLE_INTERVAL = 1.0  # Seconds between samples
+HISTORY_SECONDS = 600  # Samples kept in memory
+
+PROC_STAT = "/proc/stat"
+PROC_MEMINFO = "/proc/meminfo"
+PROC_NET_DEV = "/proc/net/dev"
+# Every core that can come online, e.g. "0-5"; /proc/stat only lists the online ones
+CPU_PRESENT = "/sys/devices/system/cpu/present"
+# Load in per mille; the node moved between L4T releases
+GPU_LOAD_PATTERNS = [
+    "/sys/devices/gpu.0/load",
+    "/sys/devices/platform/gpu.0/load",
+    "/sys/devices/platform/*.gpu/load",
+    "/sys/devices/platform/*.ga10b/load",
+    "/sys/devices/platform/bus@0/*.gpu/load",
+]
+
+# Streaming
+MIN_STREAM_INTERVAL = SAMPLE_INTERVAL
+MAX_STREAM_INTERVAL = 60.0
+KEYFRAME_EVERY = 30  # Messages between full key frames, so late joiners resync
+# Fixed-point scale per column kind: percentages in tenths, rates in kB/s, memory in MB
+SCALE = {"percent": 10, "kbps": 1, "mb": 1}
+
+
+def parse_cpu_list(text: str) -> set[int]:
+    """Core indices from a kernel CPU list such as ``0-3,5``."""
+    cpus = set()
+    for part in text.strip().split(","):
+        if not part:
+            continue
+        first, _, last = part.partition("-")
+        cpus.update(range(int(first), int(last or first) + 1))
+    return cpus
+
+
+def present_cpu_count(stat: str) -> int:
+    """Columns needed for every core: from ``CPU_PRESENT``, else the highest online index."""
+    try:
+        with open(CPU_PRESENT) as f:
+            cpus = parse_cpu_list(f.read())
+        if cpus:
+            return max(cpus) + 1
+    except (OSError, ValueError):
+        pass
+    indices = [int(line[3:].split(None, 1)[0]) for line in stat.splitlines() if line[:3] == "cpu" and line[3:4].isdigit()]
+    return max(indices) + 1 if indices else 0
+
+
+def find_gpu_load() -> str | None:
+    for pattern in GPU_LOAD_PATTERNS:
+        matches = sorted(glob.glob(pattern))
+        if matches:
+            return matches[0]
+    return None
+
+
+class TelemetrySampler:
+    """Samples system load at a fixed rate into a ring buffer."""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, history_seconds: float = HISTORY_SECONDS):
+        self.interval = interval
+        self.history_seconds = history_seconds
+        self.columns = []
+        self.kinds = []
+        self.ring = None
+        self.gpu_load_path = None
+        self.on_sample = None  # (timestamp, row) -> None
+        self.sample_time = 0.0  # Seconds spent sampling, in total
+        self.overruns = 0
+        self._fds = {}
+        self._cpu_count = 0
+        self._previous_cpu = {}  # Column index -> (total, idle) jiffies
+        self._previous_net = None
+        self._task = None
+
+    def _open(self, name: str, path: str):
+        try:
+            self._fds[name] = os.open(path, os.O_RDONLY)
+        except OSError as e:
+            print(f"Telemetry source {path} unavailable: {e}")
+
+    def _read(self, name: str) -> str | None:
+        fd = self._fds.get(name)
+        if fd is None:
+            return None
+        try:
+            return os.pread(fd, 65536, 0).decode()
+        except OSError:
+            return None
+
+    def detect(self):
+        """Open the sources once and fix the column layout."""
+        self.close()
+        self._open("stat", PROC_STAT)
+        self._open("meminfo", PROC_MEMINFO)
+        self._open("net", PROC_NET_DEV)
+        self.gpu_load_path = find_gpu_load()
+        if self.gpu_load_path:
+            self._open("gpu", self.gpu_load_path)
+
+        stat = self._read("stat") or ""
+        self._cpu_count = present_cpu_count(stat)
+        columns = [("cpu", "percent")]
+        columns += [(f"cpu{i}", "percent") for i in range(self._cpu_count)]
+        columns += [
+            ("mem_used", "percent"),
+            ("mem_available", "mb"),
+            ("net_rx", "kbps"),
+            ("net_tx", "kbps"),
+            ("gpu", "percent"),
+        ]
+        self.columns = [name for name, _ in columns]
+        self.kinds = [kind for _, kind in columns]
+        self.ring = SampleRing(self.columns, max(1, int(self.history_seconds / self.interval)))
+        self._previous_cpu = {}
+        self._previous_net = None
+        print(f"Telemetry: {self._cpu_count} CPUs, GPU load {'at ' + self.gpu_load_path if self.gpu_load_path else 'unavailable'}")
+
+    def close(self):
+        for fd in self._fds.values():
+            os.close(fd)
+        self._fds = {}
+
+    # --------------------------
+    # Parsers
+    # --------------------------
+
+    def _cpu(self) -> list[float | None]:
+        """Busy percentage for the total and each core since the last sample.
+
+        Columns are matched by the N in each ``cpuN`` line, so a core the
+        kernel takes offline (as Jetson power modes do) reads None while
+        the others keep their place.
+        """
+        usage = [None] * (self._cpu_count + 1)
+        text = self._read("stat")
+        if text is None:
+            return usage
+        counters = {}
+        for line in text.splitlines():
+            if not line.startswith("cpu"):
+                break
+            name, *values = line.split()
+            column = int(name[3:]) + 1 if name[3:].isdigit() else 0  # Column 0 is the total
+            if column >= len(usage):
+                continue
+            fields = [int(v) for v in values]
+            idle = fields[3] + (fields[4] if len(fields) > 4 else 0)  # idle + iowait
+            total = sum(fields[:8])  # guest time is already counted in user
+            counters[column] = (total, idle)
+        previous, self._previous_cpu = self._previous_cpu, counters
+        for column, (total, idle) in counters.items():
+            if column not in previous:
+                continue  # First sample, or the core just came online
+            last_total, last_idle = previous[column]
+            elapsed = total - last_total
+            if elapsed > 0:
+                usage[column] = 100.0 * (elapsed - (idle - last_idle)) / elapsed
+        return usage
+
+    def _memory(self) -> list[float | None]:
+        text = self._read("meminfo")
+        if text is None:
+            return [None, None]
+        values = {}
+        for line in text.splitlines():
+            name, _, rest = line.partition(":")
+            if name in ("MemTotal", "MemAvailable"):
+                values[name] = int(rest.split()[0])  # kB
+                if len(values) == 2:
+                    break
+        total, available = values.get("MemTotal"), values.get("MemAvailable")
+        if not total or available is None:
+            return [None, None]
+        return [100.0 * (total - available) / total, available / 1024.0]
+
+    def _network(self, now: float) -> list[float | None]:
+        """Receive and transmit kB/s over all interfaces except loopback."""
+        text = self._read("net")
+        if text is None:
+            return [None, None]
+        rx = tx = 0
+        for line in text.splitlines()[2:]:
+            name, _, rest = line.partition(":")
+            if name.strip() == "lo":
+                continue
+            fields = rest.split()
+            if len(fields) >= 9:
+                rx += int(fields[0])
+                tx += int(fields[8])
+        previous, self._previous_net = self._previous_net, (now, rx, tx)
+        if previous is None:
+            return [None, None]
+        elapsed = now - previous[0]
+        if elapsed <= 0 or rx < previous[1] or tx < previous[2]:
+            return [None, None]  # Counter reset (interface went away)
+        return [(rx - previous[1]) / elapsed / 1024.0, (tx - previous[2]) / elapsed / 1024.0]
+
+    def _gpu(self) -> float | None:
+        text = self._read("gpu")
+        try:
+            return int(text) / 10.0 if text else None
+        except ValueError:
+            return None
+
+    # --------------------------
+    # Sampling
+    # --------------------------
+
+    def sample(self):
+        start = time.perf_counter()
+        now = time.time()
+        row = self._cpu() + self._memory() + self._network(now) + [self._gpu()]
+        self.ring.append(now, row)
+        self.sample_time += time.perf_counter() - start
+        if self.on_sample:
+            self.on_sample(now, row)
+
+    def start(self):
+        if self.ring is None:
+            self.detect()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while True:
+            try:
+                self.sample()
+            except Exception as e:
+                print(f"Telemetry sample failed: {e}")
+            next_at += self.interval
+            delay = next_at - loop.time()
+            if delay < 0:
+                self.overruns += 1
+                next_at = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def latest(self) -> dict | None:
+        sample = self.ring.latest() if self.ring else None
+        if sample is None:
+            return None
+        timestamp, row = sample
+        return {
+            "timestamp": timestamp,
+            **{name: (round(v, 1) if not math.isnan(v) else None) for name, v in zip(self.columns, row)},
+        }
+
+    def stats(self) -> dict:
+        samples = self.ring.count if self.ring else 0
+        average = self.sample_time / samples if samples else None
+        return {
+            "columns": self.columns,
+            "interval": self.interval,
+            "samples": samples,
+            "gpu_load_path": self.gpu_load_path,
+            "sample_ms": round(average * 1000, 3) if average is not None else None,
+            # Share of one core spent sampling
+            "cpu_share_percent": round(100 * average / self.interval, 4) if average is not None else None,
+            "overruns": self.overruns,
+        }
+
+
+class TelemetryStream:
+    """Per-subscriber delta-encoded telemetry over Socket.IO.
+
+    The first message to a subscriber, and every ``KEYFRAME_EVERY``-th
+    one after, is ``{"type": "key", "t", "columns", "scale", "values"}``
+    with fixed-point integers (value = integer / scale). The rest are
+    ``{"type": "delta", "t", "d"}`` where ``d`` is the difference from
+    the previous message; a column that becomes (un)available forces a
+    key frame.
+    """
+
+    def __init__(self, sampler: TelemetrySampler, emit):
+        self.sampler = sampler
+        self.emit = emit  # async (payload, sid) -> None
+        self.subscribers = {}  # sid -> {"interval", "next_at", "last", "sent"}
+        self.messages = 0
+        self.key_frames = 0
+        self._sending = set()  # Send tasks in flight; held so they aren't garbage collected
+        sampler.on_sample = self._on_sample
+
+    def subscribe(self, sid: str, interval=SAMPLE_INTERVAL) -> float:
+        """Stream to ``sid``; an interval that isn't a finite number falls back to ``SAMPLE_INTERVAL``."""
+        if isinstance(interval, bool) or not isinstance(interval, (int, float)) or not math.isfinite(interval):
+            interval = SAMPLE_INTERVAL
+        interval = max(MIN_STREAM_INTERVAL, min(MAX_STREAM_INTERVAL, float(interval)))
+        self.subscribers[sid] = {"interval": interval, "next_at": 0.0, "last": None, "sent": 0}
+        return interval
+
+    def unsubscribe(self, sid: str):
+        self.subscribers.pop(sid, None)
+
+    def _quantize(self, row) -> list[int | None]:
+        return [
+            None if value is None or math.isnan(value) else int(round(value * SCALE[kind]))
+            for value, kind in zip(row, self.sampler.kinds)
+        ]
+
+    def encode(self, subscriber: dict, timestamp: float, values: list[int | None]) -> dict:
+        last = subscriber["last"]
+        key = (
+            last is None
+            or subscriber["sent"] % KEYFRAME_EVERY == 0
+            or any((a is None) != (b is None) for a, b in zip(values, last))
+        )
+        subscriber["last"] = values
+        subscriber["sent"] += 1
+        t = round(timestamp, 3)
+        if key:
+            self.key_frames += 1
+            return {
+                "type": "key",
+                "t": t,
+                "columns": self.sampler.columns,
+                "scale": [SCALE[kind] for kind in self.sampler.kinds],
+                "values": values,
+            }
+        return {"type": "delta", "t": t, "d": [None if a is None else a - b for a, b in zip(values, last)]}
+
+    def _on_sample(self, timestamp: float, row):
+        if not self.subscribers:
+            return
+        values = None
+        sends = []
+        for sid, subscriber in self.subscribers.items():
+            # Half a sample of slack so a 2 s subscriber isn't pushed to 3 s by jitter
+            if timestamp + self.sampler.interval / 2 < subscriber["next_at"]:
+                continue
+            subscriber["next_at"] = timestamp + subscriber["interval"]
+            if values is None:
+                values = self._quantize(row)
+            sends.append(self.emit(self.encode(subscriber, timestamp, values), sid))
+        if sends:
+            self.messages += len(sends)
+            task = asyncio.ensure_future(self._send(sends))
+            self._sending.add(task)
+            task.add_done_callback(self._sending.discard)
+
+    async def _send(self, sends):
+        for result in await asyncio.gather(*sends, return_exceptions=True):
+            if isinstance(result, Exception):
+                print(f"Error sending telemetry: {result}")
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": {sid: s["interval"] for sid, s in self.subscribers.items()},
+            "messages": self.messages,
+            "key_frames": self.key_frames,
+        }
+
+
+# Global instance
+telemetry_sampler = TelemetrySampler()
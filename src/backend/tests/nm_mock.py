@@ -0,0 +1,263 @@
+"""Minimal mock NetworkManager service for exercising ``nm_dbus`` off-device.
+
+Exports just the objects and members the backend uses: the manager, one
+Wi-Fi device, a few access points, saved connections and a single active
+connection. Scans, activations and disconnects update the mock state and
+emit ``PropertiesChanged`` so the Wi-Fi watcher sees them too.
+
+``test_nm_dbus.py`` runs the backend against it on a private bus. To try
+the whole backend without NetworkManager, run ``python -m tests.nm_mock``
+from ``src/backend`` (it starts a private bus unless ``NM_DBUS_ADDRESS``
+is set) and point the backend at the printed address::
+
+    NM_DBUS_ADDRESS=<printed address> python main.py
+"""
+import asyncio
+import os
+import subprocess
+
+from dbus_next import Variant
+from dbus_next.aio import MessageBus
+from dbus_next.service import ServiceInterface, PropertyAccess, method, dbus_property
+
+from nm_dbus import (
+    NM_SERVICE, NM_PATH, NM_SETTINGS_PATH, NM_IFACE, DEVICE_IFACE, WIRELESS_IFACE, AP_IFACE,
+    ACTIVE_IFACE, SETTINGS_IFACE, CONNECTION_IFACE, DEVICE_TYPE_WIFI, NO_OBJECT, ACTIVE_STATE_ACTIVATED,
+    AP_FLAG_PRIVACY, AP_SEC_KEY_MGMT_PSK,
+)
+
+DEVICE_PATH = f"{NM_PATH}/Devices/1"
+ACTIVE_PATH = f"{NM_PATH}/ActiveConnection/1"
+DEVICE_STATE_DISCONNECTED = 30
+DEVICE_STATE_ACTIVATED = 100
+
+# (ssid, strength, secured)
+ACCESS_POINTS = [
+    ("GuardNet", 82, True),
+    ("Workshop", 54, False),
+    ("Neighbour", 31, True),
+]
+SAVED = ["Workshop"]
+
+
+class MockNetwork:
+    """Shared state behind the exported interfaces."""
+
+    def __init__(self):
+        self.aps = {f"{NM_PATH}/AccessPoint/{i}": ap for i, ap in enumerate(ACCESS_POINTS, 1)}
+        self.saved = {}  # object path -> connection id
+        self.active = None  # (id, access point path)
+        self.scans = 0
+        self.device = None
+        self.bus = None
+        for ssid in SAVED:
+            self.save(ssid)
+
+    def save(self, ssid: str) -> str:
+        path = f"{NM_SETTINGS_PATH}/{len(self.saved) + 1}"
+        self.saved[path] = ssid
+        return path
+
+    def ap_for(self, ssid: str) -> str:
+        return next((path for path, ap in self.aps.items() if ap[0] == ssid), NO_OBJECT)
+
+    def set_active(self, ssid: str | None):
+        self.active = (ssid, self.ap_for(ssid)) if ssid else None
+        self.device.emit_properties_changed({
+            "State": self.device.State,
+            "ActiveConnection": self.device.ActiveConnection,
+        })
+
+
+class Manager(ServiceInterface):
+    def __init__(self, net: MockNetwork):
+        super().__init__(NM_IFACE)
+        self.net = net
+
+    @dbus_property(access=PropertyAccess.READ)
+    def WirelessEnabled(self) -> "b":
+        return True
+
+    @dbus_property(access=PropertyAccess.READ)
+    def WirelessHardwareEnabled(self) -> "b":
+        return True
+
+    @method()
+    def GetDevices(self) -> "ao":
+        return [DEVICE_PATH]
+
+    @method()
+    def ActivateConnection(self, connection: "o", device: "o", specific: "o") -> "o":
+        self.net.set_active(self.net.saved.get(connection))
+        return ACTIVE_PATH
+
+    @method()
+    def AddAndActivateConnection2(self, settings: "a{sa{sv}}", device: "o", specific: "o",
+                                  options: "a{sv}") -> "ooa{sv}":
+        ssid = settings["connection"]["id"].value
+        path = self.net.save(ssid)
+        self.net.bus.export(path, SavedConnection(self.net, path))
+        self.net.set_active(ssid)
+        return [path, ACTIVE_PATH, {}]
+
+
+class Device(ServiceInterface):
+    def __init__(self, net: MockNetwork):
+        super().__init__(DEVICE_IFACE)
+        self.net = net
+
+    @dbus_property(access=PropertyAccess.READ)
+    def DeviceType(self) -> "u":
+        return DEVICE_TYPE_WIFI
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Interface(self) -> "s":
+        return "wlan0"
+
+    @dbus_property(access=PropertyAccess.READ)
+    def State(self) -> "u":
+        return DEVICE_STATE_ACTIVATED if self.net.active else DEVICE_STATE_DISCONNECTED
+
+    @dbus_property(access=PropertyAccess.READ)
+    def ActiveConnection(self) -> "o":
+        return ACTIVE_PATH if self.net.active else NO_OBJECT
+
+    @method()
+    def Disconnect(self):
+        self.net.set_active(None)
+
+
+class Wireless(ServiceInterface):
+    def __init__(self, net: MockNetwork):
+        super().__init__(WIRELESS_IFACE)
+        self.net = net
+
+    @dbus_property(access=PropertyAccess.READ)
+    def ActiveAccessPoint(self) -> "o":
+        return self.net.active[1] if self.net.active else NO_OBJECT
+
+    @method()
+    def GetAllAccessPoints(self) -> "ao":
+        return list(self.net.aps)
+
+    @method()
+    def RequestScan(self, options: "a{sv}"):
+        self.net.scans += 1
+
+
+class AccessPoint(ServiceInterface):
+    def __init__(self, ssid: str, strength: int, secured: bool):
+        super().__init__(AP_IFACE)
+        self.ssid = ssid
+        self.strength = strength
+        self.secured = secured
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Ssid(self) -> "ay":
+        return self.ssid.encode()
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Strength(self) -> "y":
+        return self.strength
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Flags(self) -> "u":
+        return AP_FLAG_PRIVACY if self.secured else 0
+
+    @dbus_property(access=PropertyAccess.READ)
+    def WpaFlags(self) -> "u":
+        return 0
+
+    @dbus_property(access=PropertyAccess.READ)
+    def RsnFlags(self) -> "u":
+        return AP_SEC_KEY_MGMT_PSK if self.secured else 0
+
+
+class ActiveConnection(ServiceInterface):
+    def __init__(self, net: MockNetwork):
+        super().__init__(ACTIVE_IFACE)
+        self.net = net
+
+    @dbus_property(access=PropertyAccess.READ)
+    def State(self) -> "u":
+        return ACTIVE_STATE_ACTIVATED if self.net.active else 0
+
+    @dbus_property(access=PropertyAccess.READ)
+    def Id(self) -> "s":
+        return self.net.active[0] if self.net.active else ""
+
+
+class Settings(ServiceInterface):
+    def __init__(self, net: MockNetwork):
+        super().__init__(SETTINGS_IFACE)
+        self.net = net
+
+    @method()
+    def ListConnections(self) -> "ao":
+        return list(self.net.saved)
+
+
+class SavedConnection(ServiceInterface):
+    def __init__(self, net: MockNetwork, path: str):
+        super().__init__(CONNECTION_IFACE)
+        self.net = net
+        self.path = path
+
+    @method()
+    def GetSettings(self) -> "a{sa{sv}}":
+        return {"connection": {
+            "id": Variant("s", self.net.saved[self.path]),
+            "type": Variant("s", "802-11-wireless"),
+        }}
+
+
+async def serve(address: str) -> MockNetwork:
+    """Export the mock on the bus at ``address`` and claim the NetworkManager name."""
+    bus = await MessageBus(bus_address=address).connect()
+    net = MockNetwork()
+    net.bus = bus
+    net.device = Device(net)
+    bus.export(NM_PATH, Manager(net))
+    bus.export(DEVICE_PATH, net.device)
+    bus.export(DEVICE_PATH, Wireless(net))
+    bus.export(ACTIVE_PATH, ActiveConnection(net))
+    bus.export(NM_SETTINGS_PATH, Settings(net))
+    for path, ap in net.aps.items():
+        bus.export(path, AccessPoint(*ap))
+    for path in net.saved:
+        bus.export(path, SavedConnection(net, path))
+    await bus.request_name(NM_SERVICE)
+    return net
+
+
+def start_private_bus() -> tuple[subprocess.Popen, str]:
+    daemon = subprocess.Popen(
+        ["dbus-daemon", "--session", "--nofork", "--print-address"],
+        stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True,
+    )
+    return daemon, daemon.stdout.readline().strip()
+
+
+async def _serve_forever():
+    address = os.environ.get("NM_DBUS_ADDRESS")
+    daemon = None
+    if not address:
+        daemon, address = start_private_bus()
+    net = None
+    try:
+        net = await serve(address)
+        print(f"Mock NetworkManager on {address}")
+        await asyncio.Event().wait()
+    finally:
+        if net is not None:
+            net.bus.disconnect()
+            await net.bus.wait_for_disconnect()
+        if daemon is not None:
+            daemon.terminate()
+
+
+if __name__ == "__main__":
+    try:
+        asyncio.run(_serve_forever())
+    except KeyboardInterrupt:
+        pass
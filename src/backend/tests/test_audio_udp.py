@@ -0,0 +1,159 @@
+"""Jitter buffer behaviour under seeded loss, delay and reordering."""
+import time
+
+import numpy as np
+
+from audio_codec import FRAME_MS
+from audio_udp import (
+    JitterBuffer, LossyChannel, UdpReceiver, UdpSender,
+    MAX_DELAY_MS, MIN_DELAY_MS, TRIM_SLACK_FRAMES,
+)
+
+SEED = 1234
+FRAMES = 1500  # 30 s of 20 ms frames
+
+
+def payload(seq: int) -> bytes:
+    return seq.to_bytes(4, "big")
+
+
+def play(channel: LossyChannel, frames: int = FRAMES, first_seq: int = 0):
+    """Send ``frames`` one frame apart through ``channel``'s impairments and
+    play them out on a simulated device clock.
+
+    Returns the jitter buffer, the sequence numbers played in order, the
+    buffer depth at each slot and the sequence numbers that were sent
+    and arrived.
+    """
+    frame = FRAME_MS / 1000
+    arrivals = []
+    for n in range(frames):
+        delay = channel.impair()
+        if delay is not None:
+            arrivals.append((n * frame + delay, n))
+    survivors = {n for _, n in arrivals}
+    arrivals.sort()
+
+    buffer = JitterBuffer()
+    played, depths = [], []
+    index, now = 0, 0.0
+    end = frames * frame + (channel.delay_ms + channel.jitter_ms + MAX_DELAY_MS) / 1000 + 0.5
+    while now < end:
+        while index < len(arrivals) and arrivals[index][0] <= now:
+            arrival, n = arrivals[index]
+            buffer.push((first_seq + n) & 0xFFFF, n * FRAME_MS, payload(n), arrival)
+            index += 1
+        depths.append(len(buffer.frames))
+        state, data = buffer.pop()
+        if state == "frame":
+            played.append(int.from_bytes(data, "big"))
+        now += frame
+    return buffer, played, depths, survivors
+
+
+def reordered(channel: LossyChannel, frames: int = FRAMES) -> int:
+    """How many datagrams the channel's seeded delays would deliver out of order."""
+    frame = FRAME_MS / 1000
+    arrivals = [(n * frame + d, n) for n in range(frames) if (d := channel.impair()) is not None]
+    order = [n for _, n in sorted(arrivals)]
+    return sum(1 for a, b in zip(order, order[1:]) if b < a)
+
+
+def test_clean_channel_plays_every_frame_in_order():
+    buffer, played, depths, _ = play(LossyChannel(None, seed=SEED))
+    stats = buffer.stats()
+    assert played == list(range(FRAMES))
+    assert stats["received"] == FRAMES
+    assert stats["lost"] == stats["late"] == stats["trimmed"] == stats["duplicates"] == 0
+    assert stats["target_ms"] == MIN_DELAY_MS
+    assert max(depths) <= MIN_DELAY_MS // FRAME_MS
+
+
+def test_seeded_loss_is_repeatable():
+    first = LossyChannel(None, loss=0.1, seed=SEED)
+    second = LossyChannel(None, loss=0.1, seed=SEED)
+    assert [first.impair() for _ in range(500)] == [second.impair() for _ in range(500)]
+    assert first.dropped == second.dropped
+    assert 25 <= first.dropped <= 75
+
+
+def test_loss_is_concealed_without_reordering():
+    channel = LossyChannel(None, loss=0.05, seed=SEED)
+    buffer, played, _, survivors = play(channel)
+    stats = buffer.stats()
+    assert channel.dropped == FRAMES - len(survivors) > 0
+    assert played == sorted(survivors)  # Every frame that arrived, in order
+    assert stats["late"] == stats["trimmed"] == 0
+    # Each missing frame is concealed, either given up on or waited for
+    assert stats["lost"] + stats["underruns"] >= channel.dropped
+    assert stats["lost"] <= channel.dropped
+
+
+def test_jitter_reorders_and_grows_the_playout_delay():
+    assert reordered(LossyChannel(None, delay_ms=20, jitter_ms=40, seed=SEED)) > 100
+
+    channel = LossyChannel(None, loss=0.02, delay_ms=20, jitter_ms=40, seed=SEED)
+    buffer, played, depths, survivors = play(channel)
+    stats = buffer.stats()
+    assert played == sorted(played)  # Reordered arrivals play back in sequence
+    assert len(set(played)) == len(played)
+    assert stats["jitter_ms"] > 5
+    assert MIN_DELAY_MS < stats["target_ms"] <= MAX_DELAY_MS
+    # The adaptive delay keeps nearly every frame in time
+    assert stats["late"] <= 0.02 * len(survivors)
+    assert len(played) >= 0.97 * len(survivors)
+    # Bounded depth: never more than the largest target plus the trim slack
+    assert max(depths) <= MAX_DELAY_MS // FRAME_MS + TRIM_SLACK_FRAMES + 1
+
+
+def test_sequence_numbers_wrap():
+    buffer, played, _, _ = play(LossyChannel(None, jitter_ms=10, seed=SEED), frames=300, first_seq=0xFFFF - 100)
+    assert played == list(range(300))
+    assert buffer.stats()["late"] == 0
+
+
+def test_duplicates_and_late_frames_are_dropped():
+    buffer = JitterBuffer()
+    for seq in range(3):
+        buffer.push(seq, seq * FRAME_MS, payload(seq), arrival=seq * FRAME_MS / 1000)
+    buffer.push(1, FRAME_MS, payload(1), arrival=0.05)
+    assert buffer.stats()["duplicates"] == 1
+    assert [buffer.pop()[0] for _ in range(3)] == ["frame", "frame", "frame"]
+    buffer.push(0, 0, payload(0), arrival=0.1)
+    assert buffer.stats()["late"] == 1
+
+
+def test_burst_is_trimmed_to_the_target():
+    buffer = JitterBuffer()
+    for seq in range(50):
+        buffer.push(seq, seq * FRAME_MS, payload(seq), arrival=0.0)
+    state, _ = buffer.pop()
+    stats = buffer.stats()
+    assert state == "frame"
+    assert stats["trimmed"] == 50 - buffer.target_frames() - TRIM_SLACK_FRAMES
+    assert stats["depth"] <= buffer.target_frames() + TRIM_SLACK_FRAMES
+
+
+def test_loopback_stream_through_a_lossy_channel():
+    rate, chunk = 44100, 1024
+    receiver = UdpReceiver(0, rate, host="127.0.0.1")
+    receiver.start()
+    sender = UdpSender(receiver.sock.getsockname(), rate)
+    try:
+        sender.negotiate()
+        sender.channel = LossyChannel(sender.sock, loss=0.1, delay_ms=5, jitter_ms=10, seed=SEED)
+        tone = (8000 * np.sin(2 * np.pi * 440 * np.arange(rate) / rate)).astype("<i2")
+        for start in range(0, len(tone), chunk):
+            sender.send(tone[start:start + chunk].tobytes())
+        deadline = time.monotonic() + 2.0
+        while receiver.stats()["received"] < sender.seq - sender.channel.dropped and time.monotonic() < deadline:
+            time.sleep(0.02)
+        stats = receiver.stats()
+    finally:
+        receiver.stop()
+        sender.close()
+
+    assert sender.channel.dropped > 0
+    assert stats["received"] == sender.seq - sender.channel.dropped
+    assert stats["ignored"] == 0
+    assert sender.answers >= 1
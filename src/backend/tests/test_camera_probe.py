@@ -0,0 +1,159 @@
+"""Service probes against local RTSP/HTTP stand-ins."""
+import asyncio
+import socket
+from types import SimpleNamespace
+
+import pytest
+
+from camera_probe import LatencyHistogram, ServiceProber, HISTOGRAM_BUCKETS
+
+
+async def serve_standin(silent: bool = False, close_after: int | None = None):
+    """Keep-alive RTSP/HTTP responder on a free local port.
+
+    ``silent`` accepts requests but never answers; ``close_after`` drops
+    the connection after that many answers, like a camera timing out an
+    idle keep-alive.
+    """
+
+    async def handle(reader, writer):
+        answered = 0
+        try:
+            while close_after is None or answered < close_after:
+                head = await reader.readuntil(b"\r\n\r\n")
+                if silent:
+                    continue
+                lines = head.decode("latin-1").split("\r\n")
+                method = lines[0].split(" ", 1)[0]
+                cseq = next((l.split(":", 1)[1].strip() for l in lines if l.lower().startswith("cseq:")), "0")
+                if method == "HEAD":
+                    writer.write(b"HTTP/1.1 200 OK\r\nContent-Length: 0\r\nConnection: keep-alive\r\n\r\n")
+                elif method == "OPTIONS":
+                    writer.write(f"RTSP/1.0 200 OK\r\nCSeq: {cseq}\r\nPublic: OPTIONS, DESCRIBE\r\n\r\n".encode())
+                else:
+                    sdp = b"v=0\r\ns=Guard stand-in\r\n"
+                    writer.write(f"RTSP/1.0 200 OK\r\nCSeq: {cseq}\r\nContent-Type: application/sdp\r\n"
+                                 f"Content-Length: {len(sdp)}\r\n\r\n".encode() + sdp)
+                await writer.drain()
+                answered += 1
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        finally:
+            writer.close()
+
+    server = await asyncio.start_server(handle, "127.0.0.1", 0)
+    return server, server.sockets[0].getsockname()[1]
+
+
+def closed_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def camera(ports):
+    return SimpleNamespace(name="test", ports=ports, rtsp_path="/stream")
+
+
+def test_probe_classifies_each_port():
+    async def run():
+        rtsp, rtsp_port = await serve_standin()
+        http, http_port = await serve_standin()
+        silent, silent_port = await serve_standin(silent=True)
+        refused = closed_port()
+        prober = ServiceProber(rtsp_ports={rtsp_port})
+        try:
+            result = await prober.probe(camera([rtsp_port, http_port, silent_port, refused]), "127.0.0.1",
+                                        deadline=0.5)
+        finally:
+            prober.close()
+            for server in (rtsp, http, silent):
+                server.close()
+        return result, rtsp_port, http_port, silent_port, refused
+
+    result, rtsp_port, http_port, silent_port, refused = asyncio.run(run())
+    services = {s["port"]: s for s in result["services"]}
+    assert services[rtsp_port]["protocol"] == "rtsp"
+    assert services[rtsp_port]["status"] == 200 and services[rtsp_port]["describe_status"] == 200
+    assert services[rtsp_port]["alive"]
+    assert services[http_port]["protocol"] == "http"
+    assert services[http_port]["status"] == 200 and services[http_port]["alive"]
+    assert not services[silent_port]["alive"]
+    assert services[silent_port]["error"] == "No answer within 0.5s"
+    assert not services[refused]["alive"] and services[refused]["protocol"] == "http"
+    assert result["active_ports"] == sorted([rtsp_port, http_port])
+    # OPTIONS + DESCRIBE + HEAD, each well under the deadline
+    assert result["latency"]["count"] == 3
+    assert 0 < result["latency"]["p99_ms"] <= result["latency"]["max_ms"] < 500
+
+
+def test_connections_are_kept_alive_between_probes():
+    async def run():
+        rtsp, rtsp_port = await serve_standin()
+        http, http_port = await serve_standin()
+        prober = ServiceProber(rtsp_ports={rtsp_port})
+        try:
+            for _ in range(5):
+                result = await prober.probe(camera([rtsp_port, http_port]), "127.0.0.1")
+            return result, prober.stats()["connections"], rtsp_port, http_port
+        finally:
+            prober.close()
+            rtsp.close()
+            http.close()
+
+    result, connections, rtsp_port, http_port = asyncio.run(run())
+    assert result["active_ports"] == sorted([rtsp_port, http_port])
+    assert connections[f"test:{rtsp_port}"]["connects"] == 1
+    assert connections[f"test:{rtsp_port}"]["requests"] == 10
+    assert connections[f"test:{http_port}"]["connects"] == 1
+    assert connections[f"test:{http_port}"]["requests"] == 5
+    assert result["latency"]["count"] == 15
+
+
+def test_dropped_keepalive_is_reopened_once():
+    async def run():
+        http, port = await serve_standin(close_after=1)
+        prober = ServiceProber(rtsp_ports=set())
+        try:
+            results = [await prober.probe(camera([port]), "127.0.0.1") for _ in range(3)]
+            return results, prober.stats()["connections"][f"test:{port}"]
+        finally:
+            prober.close()
+            http.close()
+
+    results, connection = asyncio.run(run())
+    assert all(r["services"][0]["alive"] for r in results)
+    assert connection["connects"] == 3
+    assert connection["requests"] == 3
+
+
+def test_rtsp_ports_are_per_prober():
+    default = ServiceProber()
+    custom = ServiceProber(rtsp_ports={9554})
+    assert 9554 in custom.rtsp_ports and 9554 not in default.rtsp_ports
+    assert custom._failed(9554, "x")["protocol"] == "rtsp"
+    assert default._failed(9554, "x")["protocol"] == "http"
+
+
+def test_histogram_buckets_are_quarter_octaves():
+    assert LatencyHistogram.bucket(0.05) == 0
+    assert LatencyHistogram.bucket(0.1) == 0
+    assert LatencyHistogram.bucket(0.2) == 5
+    assert LatencyHistogram.upper_bound(4) == pytest.approx(0.2)  # Bucket 5 starts at 0.2 ms
+    assert LatencyHistogram.bucket(1e9) == HISTOGRAM_BUCKETS - 1
+    for ms in (0.15, 1.0, 7.3, 120.0, 2500.0):
+        index = LatencyHistogram.bucket(ms)
+        assert LatencyHistogram.upper_bound(index - 1) <= ms < LatencyHistogram.upper_bound(index) * 1.0001
+
+
+def test_histogram_percentiles_within_one_bucket():
+    histogram = LatencyHistogram()
+    for ms in range(1, 101):
+        histogram.record(float(ms))
+    stats = histogram.to_dict()
+    assert stats["count"] == 100 and stats["min_ms"] == 1.0 and stats["max_ms"] == 100.0
+    assert stats["mean_ms"] == 50.5
+    # Reported as the bucket's upper bound: at most ~19% above the true value
+    assert 50 <= stats["p50_ms"] <= 50 * 2 ** 0.25
+    assert 99 <= stats["p99_ms"] <= 100
+    assert LatencyHistogram().percentile(50) is None
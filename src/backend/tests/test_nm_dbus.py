@@ -0,0 +1,117 @@
+"""nm_dbus against the mock NetworkManager on a private bus."""
+import asyncio
+import shutil
+
+import pytest
+
+pytest.importorskip("dbus_next")
+if shutil.which("dbus-daemon") is None:
+    pytest.skip("dbus-daemon is not installed", allow_module_level=True)
+
+import nm_mock
+from nm_dbus import NetworkManagerDBus, NetworkBackendUnavailable
+
+
+@pytest.fixture
+def bus_address():
+    daemon, address = nm_mock.start_private_bus()
+    yield address
+    daemon.terminate()
+    daemon.wait()
+    daemon.stdout.close()
+
+
+def run_against_mock(address, check):
+    """Run ``check(client, net)`` with the mock exported on ``address``."""
+    async def main():
+        net = await nm_mock.serve(address)
+        client = NetworkManagerDBus(address)
+        try:
+            await check(client, net)
+        finally:
+            bus = client.bus
+            client.close()
+            for bus in (bus, net.bus):
+                if bus is not None:
+                    bus.disconnect()
+                    await bus.wait_for_disconnect()
+                    bus._sock.close()  # dbus-next 0.2 shuts the socket down but never closes it
+
+    asyncio.run(main())
+
+
+def test_wifi_state_while_disconnected(bus_address):
+    async def check(client, net):
+        state = await client.wifi_state()
+        assert state["running"] and state["radio"] and state["hardware"]
+        assert state["device"] == "wlan0"
+        assert state["device_path"] == nm_mock.DEVICE_PATH
+        assert state["device_state"] == "disconnected"
+        assert not state["connected"] and state["ssid"] is None
+
+    run_against_mock(bus_address, check)
+
+
+def test_access_points_strongest_first_with_security(bus_address):
+    async def check(client, net):
+        aps = await client.access_points()
+        assert [(ap["ssid"], ap["signal"], ap["security"]) for ap in aps] == [
+            ("GuardNet", 82, "WPA2"),
+            ("Workshop", 54, "--"),
+            ("Neighbour", 31, "WPA2"),
+        ]
+
+    run_against_mock(bus_address, check)
+
+
+def test_saved_connections(bus_address):
+    async def check(client, net):
+        assert await client.saved_connections() == {"Workshop": f"{nm_mock.NM_SETTINGS_PATH}/1"}
+
+    run_against_mock(bus_address, check)
+
+
+def test_request_scan_reaches_the_device(bus_address):
+    async def check(client, net):
+        await client.request_scan()
+        await client.request_scan()
+        assert net.scans == 2
+
+    run_against_mock(bus_address, check)
+
+
+def test_activate_new_network_then_disconnect(bus_address):
+    async def check(client, net):
+        active = await client.activate("GuardNet", "secret")
+        assert active == nm_mock.ACTIVE_PATH
+        state = await client.wifi_state()
+        assert state["connected"]
+        assert (state["ssid"], state["signal"], state["security"]) == ("GuardNet", 82, "WPA2")
+        assert state["device_state"] == "connected"
+        assert "GuardNet" in await client.saved_connections()
+
+        await client.disconnect()
+        state = await client.wifi_state()
+        assert not state["connected"]
+        assert state["device_state"] == "disconnected"
+
+    run_against_mock(bus_address, check)
+
+
+def test_activate_saved_network(bus_address):
+    async def check(client, net):
+        await client.activate("Workshop")
+        state = await client.wifi_state()
+        assert state["connected"] and state["ssid"] == "Workshop"
+        assert len(net.saved) == 1  # Reused, not added again
+
+    run_against_mock(bus_address, check)
+
+
+def test_unreachable_bus_is_unavailable():
+    async def check():
+        client = NetworkManagerDBus("unix:path=/nonexistent/guard-test-bus")
+        with pytest.raises(NetworkBackendUnavailable):
+            await client.wifi_state()
+
+    asyncio.run(check())
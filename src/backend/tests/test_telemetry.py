@@ -0,0 +1,69 @@
+"""Per-core CPU columns across cores going offline and back."""
+import pytest
+
+import telemetry
+from telemetry import TelemetrySampler, parse_cpu_list
+
+
+def stat_text(cores: dict[int, tuple[int, int]]) -> str:
+    """A /proc/stat with ``cores`` mapping index -> (busy, idle) jiffies."""
+    def line(name, busy, idle):
+        return f"{name} {busy} 0 0 {idle} 0 0 0 0 0 0"
+    total_busy = sum(busy for busy, _ in cores.values())
+    total_idle = sum(idle for _, idle in cores.values())
+    lines = [line("cpu", total_busy, total_idle)]
+    lines += [line(f"cpu{i}", *cores[i]) for i in sorted(cores)]
+    return "\n".join(lines + ["intr 0", "ctxt 0"]) + "\n"
+
+
+@pytest.fixture
+def sampler(tmp_path, monkeypatch):
+    stat = tmp_path / "stat"
+    present = tmp_path / "present"
+    present.write_text("0-3\n")
+    stat.write_text(stat_text({i: (0, 0) for i in range(4)}))
+    monkeypatch.setattr(telemetry, "PROC_STAT", str(stat))
+    monkeypatch.setattr(telemetry, "CPU_PRESENT", str(present))
+    for name in ("PROC_MEMINFO", "PROC_NET_DEV"):
+        monkeypatch.setattr(telemetry, name, str(tmp_path / "missing"))
+    monkeypatch.setattr(telemetry, "GPU_LOAD_PATTERNS", [])
+    sampler = TelemetrySampler()
+    sampler.detect()
+    sampler.stat = stat
+    yield sampler
+    sampler.close()
+
+
+def test_parse_cpu_list():
+    assert parse_cpu_list("0-5\n") == {0, 1, 2, 3, 4, 5}
+    assert parse_cpu_list("0,2-3,7") == {0, 2, 3, 7}
+    assert parse_cpu_list("0") == {0}
+
+
+def test_columns_cover_every_present_core(sampler):
+    assert sampler.columns[:5] == ["cpu", "cpu0", "cpu1", "cpu2", "cpu3"]
+    assert sampler._cpu() == [None] * 5  # No previous sample yet
+
+
+def test_offline_core_keeps_the_others_in_place(sampler):
+    sampler.stat.write_text(stat_text({0: (10, 90), 1: (20, 80), 2: (30, 70), 3: (40, 60)}))
+    sampler._cpu()
+    # Core 1 goes offline: the kernel drops its line from /proc/stat
+    sampler.stat.write_text(stat_text({0: (20, 180), 2: (80, 120), 3: (140, 60)}))
+    usage = sampler._cpu()
+    assert usage[1:] == [10.0, None, 50.0, 100.0]
+    assert usage[0] is not None
+
+    # Back online: its counters need one sample before it has a rate again
+    sampler.stat.write_text(stat_text({0: (30, 270), 1: (25, 85), 2: (130, 170), 3: (240, 60)}))
+    assert sampler._cpu()[1:] == [10.0, None, 50.0, 100.0]
+    sampler.stat.write_text(stat_text({0: (40, 360), 1: (75, 135), 2: (180, 220), 3: (340, 60)}))
+    assert sampler._cpu()[1:] == [10.0, 50.0, 50.0, 100.0]
+
+
+def test_core_count_falls_back_to_the_highest_index(sampler, monkeypatch):
+    monkeypatch.setattr(telemetry, "CPU_PRESENT", str(sampler.stat.parent / "missing"))
+    # Boot with core 1 already offline
+    sampler.stat.write_text(stat_text({0: (0, 0), 2: (0, 0), 3: (0, 0)}))
+    sampler.detect()
+    assert sampler.columns[:5] == ["cpu", "cpu0", "cpu1", "cpu2", "cpu3"]
@@ -0,0 +1,84 @@
+"""Clock steps against the on-disk time-series store."""
+import struct
+
+import pytest
+
+from timeseries_store import RingFile, TimeSeriesStore
+
+DAY = 24 * 3600.0
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = TimeSeriesStore(["temp"], str(tmp_path))
+    store.open()
+    yield store
+    store.close()
+
+
+def record_run(store, start: float, seconds: int, value: float = 1.0):
+    for i in range(seconds):
+        store.record(start + i, {"temp": value})
+
+
+def test_small_step_back_is_skipped(store):
+    record_run(store, 1000.0, 10)
+    record_run(store, 1005.0, 3)  # NTP stepped back 7 s
+    assert store.skipped_samples == 3
+    assert store.clock_resets == 0
+    assert len(store.tiers["1s"][1]) == 10
+
+
+def test_clock_far_behind_drops_the_future_samples(store):
+    now = 1_700_000_000.0
+    record_run(store, now - 600, 300)
+    # A session with the clock two days ahead
+    record_run(store, now + 2 * DAY, 180, value=5.0)
+    assert store.query(now + 2 * DAY - 1, now + 3 * DAY, resolution="1s")["timestamps"]
+
+    record_run(store, now, 120, value=2.0)
+    assert store.clock_resets == 1
+    assert store.skipped_samples == 0
+    assert store.last_timestamp == now + 119
+    raw = store.query(now - 600, now + 3 * DAY, resolution="1s")
+    assert raw["timestamps"] == [now - 600 + i for i in range(300)] + [now + i for i in range(120)]
+    assert raw["values"]["temp"][-1] == 2.0
+    # Rollups restart on the new timeline, still in order
+    minutes = store.query(now - 600, now + 3 * DAY, resolution="1m")["timestamps"]
+    assert minutes == sorted(minutes) and minutes[-1] < now + 120
+
+
+def test_future_history_from_a_previous_run_is_dropped(tmp_path):
+    now = 1_700_000_000.0
+    first = TimeSeriesStore(["temp"], str(tmp_path))
+    first.open()
+    record_run(first, now + 30 * DAY, 60)
+    first.close()
+
+    second = TimeSeriesStore(["temp"], str(tmp_path))
+    second.open()
+    try:
+        assert second.last_timestamp == now + 30 * DAY + 59
+        second.record(now, {"temp": 3.0})
+        assert second.clock_resets == 1
+        assert len(second.tiers["1s"][1]) == 1
+        assert second.last_timestamp == now
+    finally:
+        second.close()
+
+
+def test_rewind_keeps_a_wrapped_ring_in_order(tmp_path):
+    ring = RingFile(str(tmp_path / "ring.ts"), struct.Struct("<df"), 8, ["v"])
+    ring.open()
+    try:
+        for ts in range(20):
+            ring.append([float(ts), 0.0])
+        assert [r[0] for r in ring.range(0, 100)] == list(range(12, 20))
+        assert ring.discard_from(17.0) == 3
+        assert len(ring) == 5
+        assert [r[0] for r in ring.range(0, 100)] == [12, 13, 14, 15, 16]
+        ring.append([17.5, 0.0])
+        assert ring.last_timestamp() == 17.5
+        assert ring.discard_from(0.0) == 6 and len(ring) == 0
+    finally:
+        ring.close()
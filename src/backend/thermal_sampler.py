@@ -0,0 +1,177 @@
+"""Thermal zone sampler.
+
+Zones are enumerated once from ``/sys/class/thermal/thermal_zone*`` and
+named by their ``type`` file (``cpu-thermal``, ``GPU-therm``, ...), since
+zone numbering differs between Jetson modules. Each ``temp`` file is
+kept open and read with ``pread`` at a fixed rate into a ring buffer, so
+``/system/temperature`` answers from memory.
+"""
+import asyncio
+import math
+import os
+import time
+
+from ring_buffer import SampleRing
+
+THERMAL_ROOT = "/sys/class/thermal"
+SAMPLE_INTERVAL = 1.0  # Seconds between samples
+HISTORY_SECONDS = 3600  # Samples kept in memory
+
+
+def zone_role(zone_type: str) -> str | None:
+    """Map a zone type to the ``cpu``/``gpu`` keys the UI shows."""
+    kind = zone_type.lower()
+    for role in ("cpu", "gpu"):
+        if kind.startswith(role):
+            return role
+    return None
+
+
+class ThermalSampler:
+    """Samples every thermal zone at a fixed rate."""
+
+    def __init__(self, root: str = THERMAL_ROOT, interval: float = SAMPLE_INTERVAL,
+                 history_seconds: float = HISTORY_SECONDS):
+        self.root = root
+        self.interval = interval
+        self.history_seconds = history_seconds
+        self.zones = []  # zone types, in column order
+        self.paths = []
+        self.roles = {}  # "cpu"/"gpu" -> column
+        self.ring = None
+        self.read_errors = 0
+        self.overruns = 0
+        self._fds = []
+        self._task = None
+
+    def detect(self):
+        """Enumerate thermal zones and open their ``temp`` files."""
+        self.close()
+        try:
+            names = sorted(
+                (n for n in os.listdir(self.root) if n.startswith("thermal_zone")),
+                key=lambda n: int(n[len("thermal_zone"):] or 0),
+            )
+        except (OSError, ValueError) as e:
+            print(f"No thermal zones: {e}")
+            names = []
+
+        seen = {}
+        for name in names:
+            path = os.path.join(self.root, name)
+            try:
+                with open(os.path.join(path, "type")) as f:
+                    zone_type = f.read().strip() or name
+                fd = os.open(os.path.join(path, "temp"), os.O_RDONLY)
+            except OSError as e:
+                print(f"Skipping {name}: {e}")
+                continue
+            # Some boards report the same type twice
+            seen[zone_type] = seen.get(zone_type, 0) + 1
+            if seen[zone_type] > 1:
+                zone_type = f"{zone_type}-{seen[zone_type]}"
+            role = zone_role(zone_type)
+            if role and role not in self.roles:
+                self.roles[role] = len(self.zones)
+            self.zones.append(zone_type)
+            self.paths.append(path)
+            self._fds.append(fd)
+
+        self.ring = SampleRing(self.zones, max(1, int(self.history_seconds / self.interval)))
+        print(f"Thermal zones: {', '.join(self.zones) or 'none'}")
+        return self.zones
+
+    def close(self):
+        for fd in self._fds:
+            os.close(fd)
+        self._fds = []
+        self.zones = []
+        self.paths = []
+        self.roles = {}
+
+    def read(self) -> list[float | None]:
+        """Current temperature of every zone in degrees Celsius."""
+        temps = []
+        for fd in self._fds:
+            try:
+                temps.append(int(os.pread(fd, 16, 0)) / 1000.0)
+            except (OSError, ValueError):
+                # Zones can be briefly unreadable, e.g. a powered-down GPU
+                self.read_errors += 1
+                temps.append(None)
+        return temps
+
+    def sample(self):
+        self.ring.append(time.time(), self.read())
+
+    def start(self):
+        if self.ring is None:
+            self.detect()
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        next_at = loop.time()
+        while True:
+            self.sample()
+            # Fixed rate: schedule from the ideal tick, not from when we woke up
+            next_at += self.interval
+            delay = next_at - loop.time()
+            if delay < 0:
+                self.overruns += 1
+                next_at = loop.time()
+                delay = 0
+            await asyncio.sleep(delay)
+
+    def latest(self) -> dict | None:
+        """Latest sample as ``{"cpu", "gpu", "zones", "timestamp"}``."""
+        if self.ring is None:
+            self.detect()
+        if not self._task and len(self.ring) == 0:
+            self.sample()  # Not running yet: read once on demand
+        sample = self.ring.latest()
+        if sample is None:
+            return None
+        timestamp, row = sample
+        zones = {zone: (round(value, 1) if not math.isnan(value) else None) for zone, value in zip(self.zones, row)}
+        result = {role: zones[self.zones[column]] for role, column in self.roles.items()}
+        return {**result, "zones": zones, "timestamp": timestamp}
+
+    def history(self, seconds: float = 600, points: int = 120) -> dict:
+        """Downsampled history of the last ``seconds``."""
+        if self.ring is None:
+            self.detect()
+        timestamps, rows = self.ring.downsample(time.time() - seconds, points)
+        return {
+            "interval": self.interval,
+            "timestamps": [round(t, 3) for t in timestamps],
+            "zones": {
+                zone: [round(row[i], 2) if row[i] is not None else None for row in rows]
+                for i, zone in enumerate(self.zones)
+            },
+            "roles": {role: self.zones[column] for role, column in self.roles.items()},
+        }
+
+    def stats(self) -> dict:
+        return {
+            "zones": dict(zip(self.zones, self.paths)),
+            "interval": self.interval,
+            "samples": self.ring.count if self.ring else 0,
+            "capacity": self.ring.capacity if self.ring else 0,
+            "read_errors": self.read_errors,
+            "overruns": self.overruns,
+        }
+
+
+# Global instance
+thermal_sampler = ThermalSampler()
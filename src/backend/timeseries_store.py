@@ -0,0 +1,386 @@
+"""On-disk time-series history for temperatures, Wi-Fi and camera state.
+
+Each resolution tier is one preallocated file of fixed-width records
+used as a ring, so disk usage is fixed when the file is created (sizes
+for the six fields main.py records):
+
+    1s  raw samples          2 days   ~5.5 MB
+    1m  mean/min/max rollup  30 days  ~3.5 MB
+    1h  mean/min/max rollup  1 year   ~0.7 MB
+
+Records are appended in place through ``mmap`` and the record count in
+the header is only bumped after the record is written, so a crash loses
+at most the sample being written. Reads binary-search the timestamps and
+unpack the matching slice with ``struct.iter_unpack``; queries use the
+finest tier that stays under a point limit, so a range over days
+unpacks hundreds of records rather than hundreds of thousands.
+
+The search needs timestamps in order, but ``time.time()`` can step back
+(NTP correcting a board without an RTC), so samples that are not newer
+than the last one stored are skipped until the clock passes it again.
+A clock more than ``MAX_CLOCK_BEHIND`` behind is taken as the right one:
+the records stored from the future are dropped and recording carries on.
+"""
+import json
+import math
+import mmap
+import os
+import struct
+import time
+
+NAN = float("nan")
+
+STORE_DIR = os.environ.get("GUARD_DATA_DIR", os.path.join(os.path.expanduser("~"), ".guard", "timeseries"))
+RECORD_INTERVAL = 1.0  # Seconds between raw samples
+FLUSH_INTERVAL = 30.0  # Seconds between msync calls
+MAX_QUERY_POINTS = 2000
+# Further behind than this, the stored samples came from a wrong clock (one 1h rollup)
+MAX_CLOCK_BEHIND = 3600.0
+
+# name, seconds per record, records kept (None step = raw samples)
+TIERS = [
+    ("1s", None, 2 * 24 * 3600),
+    ("1m", 60, 30 * 24 * 60),
+    ("1h", 3600, 365 * 24),
+]
+
+MAGIC = b"GTS1"
+VERSION = 1
+HEADER_SIZE = 512
+HEADER = struct.Struct("<4sHHIIQ")  # magic, version, reserved, record size, capacity, count
+COUNT_OFFSET = 16
+COUNT = struct.Struct("<Q")
+TIMESTAMP = struct.Struct("<d")
+
+
+class RingFile:
+    """Fixed-capacity file of fixed-width records, oldest overwritten first."""
+
+    def __init__(self, path: str, record: struct.Struct, capacity: int, fields: list[str]):
+        self.path = path
+        self.record = record
+        self.capacity = capacity
+        self.fields = fields
+        self.count = 0
+        self._file = None
+        self.mm = None
+
+    def _layout(self) -> bytes:
+        return json.dumps({"fields": self.fields, "format": self.record.format}).encode()
+
+    def open(self):
+        size = HEADER_SIZE + self.capacity * self.record.size
+        layout = self._layout()
+        if os.path.exists(self.path):
+            with open(self.path, "rb") as f:
+                header = f.read(HEADER_SIZE)
+            try:
+                magic, version, _, record_size, capacity, count = HEADER.unpack_from(header)
+                stored_layout = header[HEADER.size:].rstrip(b"\0")
+            except struct.error:
+                magic = None
+            if (magic == MAGIC and version == VERSION and record_size == self.record.size
+                    and capacity == self.capacity and stored_layout == layout
+                    and os.path.getsize(self.path) == size):
+                self._map()
+                self.count = count
+                return
+            # Layout changed (new fields, new retention): keep the old file aside
+            os.replace(self.path, self.path + ".old")
+            print(f"Time-series file {self.path} has a different layout, starting a new one")
+
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        with open(self.path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, 0, self.record.size, self.capacity, 0))
+            f.write(layout)
+            f.truncate(size)  # Sparse until written
+        self._map()
+        self.count = 0
+
+    def _map(self):
+        self._file = open(self.path, "r+b")
+        self.mm = mmap.mmap(self._file.fileno(), 0)
+
+    def close(self):
+        if self.mm is not None:
+            self.mm.flush()
+            self.mm.close()
+            self._file.close()
+            self.mm = self._file = None
+
+    def flush(self):
+        if self.mm is not None:
+            self.mm.flush()
+
+    def __len__(self):
+        return min(self.count, self.capacity)
+
+    def _offset(self, index: int) -> int:
+        """Byte offset of record ``index`` counted from the oldest one held."""
+        slot = (self.count - len(self) + index) % self.capacity
+        return HEADER_SIZE + slot * self.record.size
+
+    def append(self, values):
+        slot = self.count % self.capacity
+        self.record.pack_into(self.mm, HEADER_SIZE + slot * self.record.size, *values)
+        self.count += 1
+        COUNT.pack_into(self.mm, COUNT_OFFSET, self.count)
+
+    def timestamp(self, index: int) -> float:
+        return TIMESTAMP.unpack_from(self.mm, self._offset(index))[0]
+
+    def first_timestamp(self) -> float | None:
+        return self.timestamp(0) if len(self) else None
+
+    def last_timestamp(self) -> float | None:
+        return self.timestamp(len(self) - 1) if len(self) else None
+
+    def _search(self, ts: float) -> int:
+        """Index of the first record with timestamp >= ``ts``."""
+        low, high = 0, len(self)
+        while low < high:
+            mid = (low + high) // 2
+            if self.timestamp(mid) < ts:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    def _slices(self, first: int, last: int):
+        """Raw bytes of records ``first`` to ``last``: at most two slices, as the ring may wrap."""
+        index = first
+        while index < last:
+            offset = self._offset(index)
+            run = min(last - index, (HEADER_SIZE + self.capacity * self.record.size - offset) // self.record.size)
+            yield self.mm[offset:offset + run * self.record.size]
+            index += run
+
+    def range(self, start: float, end: float) -> list[tuple]:
+        """Records with ``start <= timestamp < end``, oldest first."""
+        records = []
+        for chunk in self._slices(self._search(start), self._search(end)):
+            records.extend(self.record.iter_unpack(chunk))
+        return records
+
+    def discard_from(self, ts: float) -> int:
+        """Drop the records with timestamp >= ``ts``; returns how many."""
+        keep = self._search(ts)
+        dropped = len(self) - keep
+        if not dropped:
+            return 0
+        if self.count > self.capacity:
+            # Wrapped: move what is kept to the start so the count alone describes it again
+            kept = b"".join(self._slices(0, keep))
+            self.mm[HEADER_SIZE:HEADER_SIZE + len(kept)] = kept
+        self.count = keep
+        COUNT.pack_into(self.mm, COUNT_OFFSET, self.count)
+        return dropped
+
+
+class Rollup:
+    """Running mean/min/max of each field over one bucket."""
+
+    def __init__(self, width: int):
+        self.width = width
+        self.bucket = None
+        self.reset()
+
+    def reset(self):
+        self.sums = [0.0] * self.width
+        self.counts = [0] * self.width
+        self.mins = [NAN] * self.width
+        self.maxs = [NAN] * self.width
+
+    def add(self, means, mins=None, maxs=None):
+        for i, value in enumerate(means):
+            if math.isnan(value):
+                continue
+            low = value if mins is None else mins[i]
+            high = value if maxs is None else maxs[i]
+            self.sums[i] += value
+            self.counts[i] += 1
+            self.mins[i] = low if math.isnan(self.mins[i]) else min(self.mins[i], low)
+            self.maxs[i] = high if math.isnan(self.maxs[i]) else max(self.maxs[i], high)
+
+    def values(self) -> tuple[list[float], list[float], list[float]]:
+        means = [s / c if c else NAN for s, c in zip(self.sums, self.counts)]
+        return means, list(self.mins), list(self.maxs)
+
+
+def clean(value: float, digits: int = 2):
+    return None if math.isnan(value) else round(value, digits)
+
+
+class TimeSeriesStore:
+    """Records a fixed set of numeric fields with 1s/1m/1h tiers."""
+
+    def __init__(self, fields: list[str], directory: str = STORE_DIR):
+        self.fields = list(fields)
+        self.directory = directory
+        width = len(self.fields)
+        self.tiers = {}
+        for name, step, capacity in TIERS:
+            # Raw: timestamp + value per field; rollups: timestamp + mean/min/max per field
+            record = struct.Struct("<d" + "f" * (width if step is None else 3 * width))
+            self.tiers[name] = (step, RingFile(os.path.join(directory, f"{name}.ts"), record, capacity, self.fields))
+        self.rollups = {name: Rollup(width) for name, step, _ in TIERS if step is not None}
+        self.opened = False
+        self.write_errors = 0
+        self.last_timestamp = None  # Newest raw sample stored; later ones must be newer
+        self.skipped_samples = 0  # Dropped because the clock went backwards
+        self.clock_resets = 0  # Times stored samples were dropped for a clock far behind them
+        self._clock_behind = False
+        self._last_flush = time.monotonic()
+
+    def open(self):
+        try:
+            for _, ring in self.tiers.values():
+                ring.open()
+            self.last_timestamp = self.tiers["1s"][1].last_timestamp()
+            self.opened = True
+            print(f"Time-series store at {self.directory} ({self.disk_usage() // 1024} KiB)")
+        except OSError as e:
+            print(f"Time-series store unavailable: {e}")
+            self.close()
+
+    def close(self):
+        for _, ring in self.tiers.values():
+            ring.close()
+        self.opened = False
+
+    def disk_usage(self) -> int:
+        return sum(HEADER_SIZE + ring.capacity * ring.record.size for _, ring in self.tiers.values())
+
+    def record(self, timestamp: float, values: dict):
+        """Append one raw sample; missing or non-numeric values are stored as NaN."""
+        if not self.opened:
+            return
+        if self.last_timestamp is not None and self.last_timestamp - timestamp > MAX_CLOCK_BEHIND:
+            self._rewind(timestamp)
+        if self.last_timestamp is not None and timestamp <= self.last_timestamp:
+            self.skipped_samples += 1
+            if not self._clock_behind:
+                self._clock_behind = True
+                print(f"Clock is {self.last_timestamp - timestamp:.1f}s behind the newest stored sample, "
+                      "skipping samples until it catches up")
+            return
+        self._clock_behind = False
+        row = []
+        for field in self.fields:
+            value = values.get(field)
+            try:
+                row.append(float(value) if value is not None else NAN)
+            except (TypeError, ValueError):
+                row.append(NAN)
+        try:
+            self.tiers["1s"][1].append([timestamp, *row])
+            self.last_timestamp = timestamp
+            self._roll(timestamp, row)
+            if time.monotonic() - self._last_flush >= FLUSH_INTERVAL:
+                for _, ring in self.tiers.values():
+                    ring.flush()
+                self._last_flush = time.monotonic()
+        except (OSError, ValueError) as e:
+            self.write_errors += 1
+            print(f"Time-series write failed: {e}")
+
+    def _rewind(self, timestamp: float):
+        """Accept a clock far behind the stored samples: drop everything from ``timestamp`` on."""
+        try:
+            dropped = {name: ring.discard_from(timestamp) for name, (_, ring) in self.tiers.items()}
+        except (OSError, ValueError) as e:
+            self.write_errors += 1
+            print(f"Time-series rewind failed: {e}")
+            return
+        for rollup in self.rollups.values():
+            rollup.reset()
+            rollup.bucket = None
+        print(f"Clock is {self.last_timestamp - timestamp:.0f}s behind the newest stored sample, "
+              f"dropping the samples stored after it ({dropped['1s']} raw)")
+        self.last_timestamp = self.tiers["1s"][1].last_timestamp()
+        self.clock_resets += 1
+        self._clock_behind = False
+
+    def _roll(self, timestamp: float, row):
+        """Feed raw samples into the 1m rollup and finished minutes into 1h."""
+        means, mins, maxs = row, None, None
+        for name, rollup in self.rollups.items():
+            step, ring = self.tiers[name]
+            bucket = int(timestamp // step) * step
+            if rollup.bucket is None or bucket == rollup.bucket:
+                rollup.bucket = bucket
+                rollup.add(means, mins, maxs)
+                return
+            # Bucket finished: store it, start the next one, pass it up a tier
+            finished, finished_at = rollup.values(), rollup.bucket
+            ring.append([finished_at, *[v for triple in zip(*finished) for v in triple]])
+            rollup.reset()
+            rollup.bucket = bucket
+            rollup.add(means, mins, maxs)
+            timestamp = finished_at
+            means, mins, maxs = finished
+
+    def pick_tier(self, start: float, end: float, max_points: int) -> str:
+        """Finest tier that still holds ``start`` without exceeding ``max_points``."""
+        for name, step, _ in TIERS:
+            _, ring = self.tiers[name]
+            if (end - start) / (step or RECORD_INTERVAL) > max_points:
+                continue
+            # A ring that never wrapped holds everything ever recorded
+            if len(ring) < ring.capacity or ring.first_timestamp() <= start:
+                return name
+        return TIERS[-1][0]
+
+    def query(self, start: float, end: float | None = None, fields=None, resolution: str | None = None,
+              max_points: int = MAX_QUERY_POINTS) -> dict:
+        """Values of ``fields`` between ``start`` and ``end`` at one tier's resolution."""
+        end = time.time() if end is None else end
+        if resolution is None:
+            resolution = self.pick_tier(start, end, max_points)
+        if resolution not in self.tiers:
+            raise ValueError(f"Unknown resolution {resolution!r}; expected one of {', '.join(self.tiers)}")
+        fields = list(fields or self.fields)
+        unknown = [f for f in fields if f not in self.fields]
+        if unknown:
+            raise ValueError(f"Unknown fields: {', '.join(unknown)}")
+
+        step, ring = self.tiers[resolution]
+        records = ring.range(start, end) if self.opened else []
+        columns = [self.fields.index(f) for f in fields]
+        result = {
+            "resolution": resolution,
+            "start": start,
+            "end": end,
+            "timestamps": [round(r[0], 3) for r in records],
+        }
+        if step is None:
+            result["values"] = {f: [clean(r[1 + c]) for r in records] for f, c in zip(fields, columns)}
+        else:
+            result["values"] = {
+                f: {
+                    "mean": [clean(r[1 + 3 * c]) for r in records],
+                    "min": [clean(r[2 + 3 * c]) for r in records],
+                    "max": [clean(r[3 + 3 * c]) for r in records],
+                }
+                for f, c in zip(fields, columns)
+            }
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "opened": self.opened,
+            "fields": self.fields,
+            "disk_bytes": self.disk_usage(),
+            "write_errors": self.write_errors,
+            "skipped_samples": self.skipped_samples,
+            "clock_resets": self.clock_resets,
+            "tiers": {
+                name: {
+                    "records": len(ring),
+                    "capacity": ring.capacity,
+                    "oldest": ring.first_timestamp() if ring.mm is not None else None,
+                }
+                for name, (step, ring) in self.tiers.items()
+            },
+        }
@@ -0,0 +1,84 @@
+"""Last-write-wins command queue for slider-driven device settings.
+
+Dragging a slider sends a burst of writes. Instead of applying each one
+(and racing them against each other), a ``CoalescingWriter`` keeps only
+the newest pending value, applies it at a bounded rate and resolves
+every superseded request with the value that was actually applied.
+"""
+import asyncio
+import time
+
+DEFAULT_MIN_INTERVAL = 0.05  # Seconds between two writes to the same device
+
+
+class CoalescingWriter:
+    """Serialises writes to one device, collapsing pending ones to the latest value."""
+
+    def __init__(self, name: str, apply, on_applied=None, min_interval: float = DEFAULT_MIN_INTERVAL):
+        self.name = name
+        self.apply = apply  # async (value) -> bool; may raise with a message
+        self.on_applied = on_applied  # async (value, result dict) -> None, once a burst settles
+        self.min_interval = min_interval
+        self._pending = None
+        self._waiters = []
+        self._worker = None
+        self._last_applied_at = 0.0
+        self.last_result = None
+        self.submitted = 0
+        self.applied = 0
+        self.coalesced = 0
+
+    async def submit(self, value) -> dict:
+        """Queue ``value`` and wait until it, or a newer value, has been applied.
+
+        Returns ``{"value", "success", "error", "superseded"}`` where
+        ``value`` is what the device was actually set to.
+        """
+        self.submitted += 1
+        if self._pending is not None:
+            self.coalesced += 1
+        self._pending = value
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append(future)
+        if self._worker is None or self._worker.done():
+            self._worker = asyncio.create_task(self._drain())
+        result = await asyncio.shield(future)
+        return {**result, "superseded": result["value"] != value}
+
+    async def _drain(self):
+        while self._waiters:
+            wait = self._last_applied_at + self.min_interval - time.monotonic()
+            if wait > 0:
+                await asyncio.sleep(wait)  # More writes may coalesce meanwhile
+
+            value, waiters = self._pending, self._waiters
+            self._pending, self._waiters = None, []
+            try:
+                ok = bool(await self.apply(value))
+                result = {"value": value, "success": ok, "error": None if ok else f"Failed to set {self.name}"}
+            except Exception as e:
+                result = {"value": value, "success": False, "error": str(e)}
+            self._last_applied_at = time.monotonic()
+            self.applied += 1
+            self.last_result = result
+
+            for waiter in waiters:
+                if not waiter.done():
+                    waiter.set_result(result)
+
+            if not self._waiters and self.on_applied:
+                # Burst settled: confirm the final value
+                try:
+                    await self.on_applied(value, result)
+                except Exception as e:
+                    print(f"Error confirming {self.name} change: {e}")
+
+    def stats(self) -> dict:
+        return {
+            "name": self.name,
+            "submitted": self.submitted,
+            "applied": self.applied,
+            "coalesced": self.coalesced,
+            "pending": self._pending,
+            "last_result": self.last_result,
+        }
@@ -5,6 +5,8 @@ import asyncio
 from typing import Dict, Set
 import socketio
 
+from structured_log import logger
+
 # Initialize Socket.IO server
 sio = socketio.AsyncServer(async_mode='asgi', cors_allowed_origins=['*'])
 
@@ -38,7 +40,9 @@ async def voice_data(sid, data):
     """Handle incoming voice data and broadcast to other clients."""
     # Always allow voice data transmission from connected clients
     data_size = len(data) if data else 0
-    print(f"🎤 RECEIVED voice data from {sid}, size: {data_size} bytes")
+    logger.count("voice.received")
+    logger.count("voice.received_bytes", data_size)
+    logger.debug("🎤 RECEIVED voice data", rate=1, sid=sid, size=data_size)
     
     # Broadcast to all other connected clients
     forwarded_count = 0
@@ -47,11 +51,12 @@ async def voice_data(sid, data):
             try:
                 await sio.emit('voice_data', data, room=client_sid)
                 forwarded_count += 1
-                print(f"📤 Forwarded voice data to {client_sid}")
             except Exception as e:
-                print(f"❌ Error forwarding voice data to {client_sid}: {e}")
+                logger.count("voice.send_errors")
+                logger.warning("❌ Error forwarding voice data", rate=1, sid=client_sid, error=str(e))
     
-    print(f"📊 Voice data forwarded to {forwarded_count} clients")
+    # Per-packet totals appear in the log writer's periodic summary
+    logger.count("voice.forwarded", forwarded_count)
 
 @sio.event
 async def start_voice(sid):
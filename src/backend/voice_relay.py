@@ -0,0 +1,189 @@
+"""Fan-out of voice frames to many subscribers.
+
+Each subscriber has a small bounded queue drained by its own sender
+task. Publishing only appends to the queues, so a slow client delays
+nobody but itself: when its queue is full the oldest frame is dropped
+(late audio is worse than missing audio), and frames that sat queued
+longer than ``MAX_FRAME_AGE`` are skipped rather than played late.
+
+Socket.IO ``/voice`` clients and raw ``/ws/voice`` WebSockets register
+with the same relay, each with its own send function, so frames flow
+between all participants whatever transport they use. A frame is wrapped
+in one ``memoryview`` and that view is queued for every subscriber; it
+is only turned back into ``bytes`` at the transport, which is free when
+the view spans a whole ``bytes`` object.
+
+Every subscriber belongs to one talkgroup and frames only go to the
+sender's group, so fan-out cost follows group size, not fleet size.
+"""
+import asyncio
+import time
+from collections import deque
+
+from structured_log import logger
+
+QUEUE_FRAMES = 8  # Frames buffered per subscriber before dropping the oldest
+MAX_FRAME_AGE = 0.5  # Seconds; older queued frames are dropped instead of sent
+SEND_TIMEOUT = 2.0  # Seconds before a stuck send is abandoned
+DEFAULT_TALKGROUP = "default"
+
+
+def frame_view(data):
+    """Wrap received audio in a memoryview without copying it."""
+    if isinstance(data, memoryview):
+        return data
+    try:
+        return memoryview(data)
+    except TypeError:
+        return data  # Not a buffer (e.g. a JSON message): forward as is
+
+
+def frame_payload(frame):
+    """Bytes for a transport; the original object when the view covers all of it."""
+    if isinstance(frame, memoryview):
+        if isinstance(frame.obj, bytes) and frame.nbytes == len(frame.obj):
+            return frame.obj
+        return frame.tobytes()
+    return frame
+
+
+class Subscriber:
+    """One client's send queue and counters."""
+
+    def __init__(self, sid: str, send, transport: str, group: str):
+        self.sid = sid
+        self.send = send  # async (sid, frame) -> None
+        self.transport = transport
+        self.group = group
+        self.queue = deque(maxlen=QUEUE_FRAMES)  # (enqueued_at, frame)
+        self.ready = asyncio.Event()
+        self.task = None
+        self.sent = 0
+        self.dropped = 0  # Overflow: pushed out by newer frames
+        self.stale = 0  # Too old by the time they could be sent
+        self.errors = 0
+        self.max_depth = 0
+
+    def stats(self) -> dict:
+        return {
+            "transport": self.transport,
+            "talkgroup": self.group,
+            "depth": len(self.queue),
+            "max_depth": self.max_depth,
+            "sent": self.sent,
+            "dropped": self.dropped,
+            "stale": self.stale,
+            "errors": self.errors,
+        }
+
+
+class VoiceRelay:
+    """Forwards every published frame to all other subscribers, concurrently."""
+
+    def __init__(self, send):
+        self.send = send  # Default transport: async (sid, frame) -> None
+        self.subscribers = {}
+        self.groups = {}  # talkgroup -> {sid: Subscriber}
+        self.published = 0
+
+    def add(self, sid: str, send=None, transport: str = "socketio", group: str = DEFAULT_TALKGROUP):
+        if sid in self.subscribers:
+            return
+        subscriber = Subscriber(sid, send or self.send, transport, group)
+        subscriber.task = asyncio.create_task(self._drain(subscriber))
+        self.subscribers[sid] = subscriber
+        self.groups.setdefault(group, {})[sid] = subscriber
+
+    def remove(self, sid: str):
+        subscriber = self.subscribers.pop(sid, None)
+        if subscriber is None:
+            return
+        self._leave(subscriber)
+        if subscriber.task is not None:
+            subscriber.task.cancel()
+
+    def _leave(self, subscriber: Subscriber):
+        members = self.groups.get(subscriber.group)
+        if members is not None:
+            members.pop(subscriber.sid, None)
+            if not members:
+                del self.groups[subscriber.group]
+
+    def move(self, sid: str, group: str) -> str | None:
+        """Put ``sid`` in ``group``; returns the group it left (None if unknown sid)."""
+        subscriber = self.subscribers.get(sid)
+        if subscriber is None:
+            return None
+        previous = subscriber.group
+        if previous != group:
+            self._leave(subscriber)
+            subscriber.group = group
+            subscriber.queue.clear()  # Don't play the old group's audio in the new one
+            self.groups.setdefault(group, {})[sid] = subscriber
+        return previous
+
+    def group_of(self, sid: str) -> str | None:
+        subscriber = self.subscribers.get(sid)
+        return subscriber.group if subscriber else None
+
+    def members(self, group: str) -> list[str]:
+        return list(self.groups.get(group, {}))
+
+    def publish(self, sender: str, data) -> int:
+        """Queue ``data`` for the rest of ``sender``'s talkgroup (no echo); returns how many."""
+        source = self.subscribers.get(sender)
+        if source is None:
+            return 0
+        frame = frame_view(data)
+        self.published += 1
+        now = time.monotonic()
+        queued = 0
+        for sid, subscriber in self.groups.get(source.group, {}).items():
+            if sid == sender:
+                continue
+            if len(subscriber.queue) == subscriber.queue.maxlen:
+                subscriber.dropped += 1  # deque drops the oldest on append
+                logger.count("voice.dropped")
+            subscriber.queue.append((now, frame))
+            subscriber.max_depth = max(subscriber.max_depth, len(subscriber.queue))
+            subscriber.ready.set()
+            queued += 1
+        return queued
+
+    async def _drain(self, subscriber: Subscriber):
+        while True:
+            await subscriber.ready.wait()
+            subscriber.ready.clear()
+            while subscriber.queue:
+                enqueued_at, frame = subscriber.queue.popleft()
+                if time.monotonic() - enqueued_at > MAX_FRAME_AGE:
+                    subscriber.stale += 1
+                    logger.count("voice.stale")
+                    continue
+                try:
+                    await asyncio.wait_for(subscriber.send(subscriber.sid, frame), timeout=SEND_TIMEOUT)
+                    subscriber.sent += 1
+                    logger.count("voice.sent")
+                except asyncio.CancelledError:
+                    raise
+                except Exception as e:
+                    subscriber.errors += 1
+                    logger.count("voice.send_errors")
+                    logger.warning("❌ Error forwarding voice data", rate=1, sid=subscriber.sid, error=str(e) or type(e).__name__)
+
+    async def close(self):
+        tasks = [s.task for s in self.subscribers.values() if s.task is not None]
+        self.subscribers.clear()
+        self.groups.clear()
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "published": self.published,
+            "queue_frames": QUEUE_FRAMES,
+            "talkgroups": {group: list(members) for group, members in self.groups.items()},
+            "max_frame_age": MAX_FRAME_AGE,
+            "clients": {sid: s.stats() for sid, s in self.subscribers.items()},
+        }
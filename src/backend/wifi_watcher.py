@@ -0,0 +1,132 @@
+"""Change notifications that drive the Wi-Fi monitor.
+
+Listens to NetworkManager's D-Bus signals, or to a long-lived
+``nmcli monitor`` process when D-Bus is unavailable, and wakes the
+monitor only when something actually happened.
+"""
+import asyncio
+import shutil
+
+from nm_dbus import nm_dbus, NetworkBackendError, NetworkBackendUnavailable
+
+DEBOUNCE_DELAY = 0.5  # Quiet time that ends a burst of notifications
+DEBOUNCE_MAX = 2.0  # Never hold a burst back for longer than this
+RETRY_DELAY = 10.0  # Wait before re-subscribing after a source goes away
+
+
+class WifiChangeWatcher:
+    """Turns NetworkManager change notifications into a debounced wake-up."""
+
+    def __init__(self):
+        self._changed = asyncio.Event()
+        self._task = None
+        self._nmcli_process = None
+        self.source = None  # "dbus", "nmcli" or None while unsubscribed
+        self.notifications = 0
+
+    @property
+    def subscribed(self) -> bool:
+        return self.source is not None
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        await self._stop_nmcli()
+
+    def notify(self):
+        self.notifications += 1
+        self._changed.set()
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Wait for a burst of notifications to settle.
+
+        Returns False if nothing arrived within ``timeout``.
+        """
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout=timeout)
+        except asyncio.TimeoutError:
+            return False
+
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + DEBOUNCE_MAX
+        while True:
+            self._changed.clear()
+            remaining = deadline - loop.time()
+            if remaining <= 0:
+                break
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout=min(DEBOUNCE_DELAY, remaining))
+            except asyncio.TimeoutError:
+                break
+        return True
+
+    async def _run(self):
+        while True:
+            dbus_error = None
+            try:
+                bus = await nm_dbus.subscribe(self.notify)
+                self.source = "dbus"
+                print("WiFi monitor subscribed to NetworkManager D-Bus signals")
+                self.notify()  # Re-read state that may have changed while unsubscribed
+                await bus.wait_for_disconnect()
+                print("NetworkManager D-Bus connection lost")
+            except (NetworkBackendUnavailable, NetworkBackendError) as e:
+                dbus_error = e
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"WiFi change watcher error: {e}")
+
+            # Outside the handler above, so a failing fallback still reaches the retry below
+            if dbus_error is not None and shutil.which("nmcli"):
+                print(f"D-Bus signals unavailable ({dbus_error}), following 'nmcli monitor'")
+                try:
+                    await self._follow_nmcli_monitor()
+                except Exception as e:
+                    print(f"'nmcli monitor' failed: {e}")
+            self.source = None
+            self.notify()
+            await asyncio.sleep(RETRY_DELAY)
+
+    async def _follow_nmcli_monitor(self):
+        self._nmcli_process = await asyncio.create_subprocess_exec(
+            "nmcli", "monitor",
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.DEVNULL,
+        )
+        self.source = "nmcli"
+        self.notify()
+        try:
+            while True:
+                line = await self._nmcli_process.stdout.readline()
+                if not line:
+                    break
+                self.notify()
+            print("'nmcli monitor' exited")
+        finally:
+            await self._stop_nmcli()
+
+    async def _stop_nmcli(self):
+        process, self._nmcli_process = self._nmcli_process, None
+        if process is not None and process.returncode is None:
+            try:
+                process.kill()
+            except ProcessLookupError:
+                pass
+            await process.wait()
+
+    def stats(self) -> dict:
+        return {"source": self.source, "notifications": self.notifications}
+
+
+# Global instance
+wifi_watcher = WifiChangeWatcher()